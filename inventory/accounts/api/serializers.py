@@ -10,7 +10,8 @@ from django.contrib.auth import get_user_model
 
 from rest_framework import serializers
 
-from inventory.common.api.serializer_mixin import SerializerMixin
+from inventory.common.api.serializer_mixin import (
+    SerializerMixin, DynamicFieldsMixin)
 from inventory.projects.models import Project
 from inventory.regions.models import Region, Country
 
@@ -23,7 +24,7 @@ User = get_user_model()
 #
 # User
 #
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     region = serializers.HyperlinkedRelatedField(
         view_name='region-detail', queryset=Region.objects.all(),
         default=None)
@@ -111,7 +112,7 @@ class UserSerializer(serializers.ModelSerializer):
 #
 # Group
 #
-class GroupSerializer(serializers.ModelSerializer):
+class GroupSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user_set = serializers.HyperlinkedRelatedField(
         many=True, read_only=True, view_name='user-detail')
     uri = serializers.HyperlinkedIdentityField(view_name='group-detail')
@@ -134,7 +135,8 @@ class GroupSerializer(serializers.ModelSerializer):
 #
 # Question
 #
-class QuestionSerializer(SerializerMixin, serializers.ModelSerializer):
+class QuestionSerializer(DynamicFieldsMixin, SerializerMixin,
+                         serializers.ModelSerializer):
     creator = serializers.HyperlinkedRelatedField(
         view_name='user-detail', read_only=True)
     updater = serializers.HyperlinkedRelatedField(
@@ -164,7 +166,8 @@ class QuestionSerializer(SerializerMixin, serializers.ModelSerializer):
 #
 # Answer
 #
-class AnswerSerializer(SerializerMixin, serializers.ModelSerializer):
+class AnswerSerializer(DynamicFieldsMixin, SerializerMixin,
+                       serializers.ModelSerializer):
     owners = serializers.HyperlinkedRelatedField(
         view_name='user-detail', many=True, queryset=User.objects.all())
     question = serializers.HyperlinkedRelatedField(
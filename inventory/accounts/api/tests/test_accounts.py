@@ -9,7 +9,10 @@ from rest_framework.reverse import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from django.contrib.auth.models import Group
+
 from inventory.common.api.tests.base_test import BaseTest
+from inventory.accounts.models import Question, Answer
 
 
 class TestUser(BaseTest):
@@ -204,12 +207,77 @@ class TestUser(BaseTest):
         self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
         self.assertEqual(data.get('name'), 'User Detail', msg)
 
+    def test_user_list_query_budget(self):
+        """
+        Test that the user list with its related objects runs the same
+        number of queries for any number of users.
+        """
+        #self.skipTest("Temporarily skipped")
+        uri = reverse('user-list')
+        count, data = self._assert_query_budget(self.client, uri, 10)
+
+        for num in range(4):
+            user = self._create_user(username='NewUser_{}'.format(num))
+            self._create_application(user, 'Test App {}'.format(num))
+
+        new_count, data = self._assert_query_budget(self.client, uri, 10)
+        msg = "Queries: {} should be {}, content: {}".format(
+            new_count, count, self._clean_data(data))
+        self.assertEqual(data.get('count'), 5, msg)
+        self.assertEqual(new_count, count, msg)
+
+    def test_group_list_query_budget(self):
+        """
+        Test that the group list with its users runs the same number of
+        queries for any number of groups.
+        """
+        #self.skipTest("Temporarily skipped")
+        group = Group.objects.create(name='Test Group')
+        group.user_set.add(self.user)
+        uri = reverse('group-list')
+        count, data = self._assert_query_budget(self.client, uri, 6)
+
+        for num in range(4):
+            group = Group.objects.create(name='Test Group {}'.format(num))
+            group.user_set.add(self.user, self._create_user(
+                username='NewUser_{}'.format(num)))
+
+        new_count, data = self._assert_query_budget(self.client, uri, 6)
+        msg = "Queries: {} should be {}, content: {}".format(
+            new_count, count, self._clean_data(data))
+        self.assertEqual(data.get('count'), 5, msg)
+        self.assertEqual(new_count, count, msg)
+
 
 class TestQuestion(BaseTest):
 
     def __init__(self, name):
         super(TestQuestion, self).__init__(name)
 
+    def test_question_list_query_budget(self):
+        """
+        Test that the question list runs the same number of queries for any
+        number of questions.
+        """
+        #self.skipTest("Temporarily skipped")
+        self._create_question()
+        uri = reverse('question-list')
+        count, data = self._assert_query_budget(self.client, uri, 6)
+
+        for num in range(4):
+            self._create_question(question='Question {}?'.format(num))
+
+        new_count, data = self._assert_query_budget(self.client, uri, 6)
+        msg = "Queries: {} should be {}, content: {}".format(
+            new_count, count, self._clean_data(data))
+        self.assertEqual(data.get('count'), 5, msg)
+        self.assertEqual(new_count, count, msg)
+
+    def _create_question(self, question='What is your favorite color?'):
+        new_data = {'question': question, 'active': True,
+                    'updater': self.user, 'creator': self.user}
+        return Question.objects.create(**new_data)
+
 
 
 class TestAnswer(BaseTest):
@@ -217,3 +285,32 @@ class TestAnswer(BaseTest):
     def __init__(self, name):
         super(TestAnswer, self).__init__(name)
 
+    def test_answer_list_query_budget(self):
+        """
+        Test that the answer list with its owners runs the same number of
+        queries for any number of answers.
+        """
+        #self.skipTest("Temporarily skipped")
+        question = Question.objects.create(
+            question='What is your favorite color?', active=True,
+            updater=self.user, creator=self.user)
+        self._create_answer(question)
+        uri = reverse('answer-list')
+        count, data = self._assert_query_budget(self.client, uri, 6)
+
+        for num in range(4):
+            self._create_answer(question, answer='Color {}'.format(num))
+
+        new_count, data = self._assert_query_budget(self.client, uri, 6)
+        msg = "Queries: {} should be {}, content: {}".format(
+            new_count, count, self._clean_data(data))
+        self.assertEqual(data.get('count'), 5, msg)
+        self.assertEqual(new_count, count, msg)
+
+    def _create_answer(self, question, answer='Blue'):
+        new_data = {'question': question, 'answer': answer,
+                    'updater': self.user, 'creator': self.user}
+        obj = Answer.objects.create(**new_data)
+        obj.process_owner([self.user])
+        return obj
+
@@ -20,6 +20,8 @@ from oauth2_provider.ext.rest_framework import (
 from inventory.common.api.permissions import (
     IsAdminSuperUser, IsAdministrator, IsProjectManager, IsAnyUser)
 from inventory.common.api.pagination import SmallResultsSetPagination
+from inventory.common.api.view_mixins import (
+    RelatedQuerysetMixin, ConditionalGetMixin)
 
 from ..models import Question, Answer
 from .serializers import (
@@ -35,18 +37,17 @@ User = get_user_model()
 class UserAuthorizationMixin(object):
 
     def get_queryset(self):
-        result = []
-
         if (self.request.user.is_superuser or
             self.request.user.role == User.ADMINISTRATOR):
             result = User.objects.all()
         else:
-            result[:] = [self.request.user]
+            result = User.objects.filter(pk=self.request.user.pk)
 
         return result
 
 
-class UserList(UserAuthorizationMixin, ListCreateAPIView):
+class UserList(RelatedQuerysetMixin, UserAuthorizationMixin,
+               ListCreateAPIView):
     """
     User list endpoint.
     """
@@ -80,8 +81,6 @@ user_detail = UserDetail.as_view()
 class GroupAuthorizationMixin(object):
 
     def get_queryset(self):
-        result = []
-
         if (self.request.user.is_superuser or
             self.request.user.role == User.ADMINISTRATOR):
             result = Group.objects.all()
@@ -91,7 +90,8 @@ class GroupAuthorizationMixin(object):
         return result
 
 
-class GroupList(GroupAuthorizationMixin, ListCreateAPIView):
+class GroupList(RelatedQuerysetMixin, GroupAuthorizationMixin,
+                ListCreateAPIView):
     """
     Group list endpoint.
     """
@@ -127,19 +127,18 @@ group_detail = GroupDetail.as_view()
 class QuestionAuthorizationMixin(object):
 
     def get_queryset(self):
-        result = []
-
         if (self.request.user.is_superuser or
             self.request.user.role == User.ADMINISTRATOR):
             result = Question.objects.all()
         else:
-            result = [answer.question
-                      for answer in self.request.user.answers.all()]
+            result = Question.objects.filter(
+                pk__in=self.request.user.answers.values('question'))
 
         return result
 
 
-class QuestionList(QuestionAuthorizationMixin, ListCreateAPIView):
+class QuestionList(RelatedQuerysetMixin, ConditionalGetMixin,
+                   QuestionAuthorizationMixin, ListCreateAPIView):
     """
     Question list endpoint.
     """
@@ -153,7 +152,8 @@ class QuestionList(QuestionAuthorizationMixin, ListCreateAPIView):
 question_list = QuestionList.as_view()
 
 
-class QuestionDetail(QuestionAuthorizationMixin, RetrieveUpdateDestroyAPIView):
+class QuestionDetail(ConditionalGetMixin, QuestionAuthorizationMixin,
+                     RetrieveUpdateDestroyAPIView):
     """
     Question detail endpoint.
     """
@@ -172,8 +172,6 @@ question_detail = QuestionDetail.as_view()
 class AnswerAuthorizationMixin(object):
 
     def get_queryset(self):
-        result = []
-
         if (self.request.user.is_superuser or
             self.request.user.role == User.ADMINISTRATOR):
             result = Answer.objects.all()
@@ -183,7 +181,8 @@ class AnswerAuthorizationMixin(object):
         return result
 
 
-class AnswerList(AnswerAuthorizationMixin, ListCreateAPIView):
+class AnswerList(RelatedQuerysetMixin, AnswerAuthorizationMixin,
+                 ListCreateAPIView):
     """
     Answer list endpoint.
     """
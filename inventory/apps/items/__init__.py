@@ -0,0 +1,5 @@
+#
+# items/__init__.py
+#
+
+default_app_config = 'inventory.apps.items.apps.ItemsConfig'
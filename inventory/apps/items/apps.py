@@ -0,0 +1,43 @@
+#
+# items/apps.py
+#
+
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    post_save, post_delete, post_migrate, m2m_changed)
+
+
+class ItemsConfig(AppConfig):
+    name = 'inventory.apps.items'
+    label = 'items'
+    verbose_name = "Items"
+
+    def ready(self):
+        from inventory.apps.utils.choices import ChoiceCache, invalidateChoices
+        from .fulltext import createTextIndex, registerRankFunction
+        from .models import Item, Cost, Specification, touchItem
+
+        for model in ChoiceCache.getModels():
+            uid = 'search_choices_{}'.format(model._meta.label_lower)
+            post_save.connect(invalidateChoices, sender=model,
+                              dispatch_uid=uid + '_post_save')
+            post_delete.connect(invalidateChoices, sender=model,
+                                dispatch_uid=uid + '_post_delete')
+
+        post_migrate.connect(createTextIndex, sender=self,
+                             dispatch_uid='items_item_text_index')
+        connection_created.connect(registerRankFunction,
+                                   dispatch_uid='items_item_rank_function')
+
+        for model in (Cost, Specification):
+            uid = 'touch_item_{}'.format(model._meta.label_lower)
+            post_save.connect(touchItem, sender=model,
+                              dispatch_uid=uid + '_post_save')
+            post_delete.connect(touchItem, sender=model,
+                                dispatch_uid=uid + '_post_delete')
+
+        for field in ('categories', 'location_code'):
+            m2m_changed.connect(touchItem,
+                                sender=getattr(Item, field).through,
+                                dispatch_uid='touch_item_' + field)
@@ -0,0 +1,187 @@
+#
+# items/fulltext.py
+#
+
+import re
+import struct
+import logging
+from functools import reduce
+
+from django.db import connections
+from django.db.models import Q
+
+log = logging.getLogger('inventory.apps.items.fulltext')
+
+
+class ItemTextIndex(object):
+    """
+    Full text search over the text columns of Item. MySQL uses a FULLTEXT
+    index on the item table, SQLite an FTS4 table kept current by triggers
+    and any other database falls back to case insensitive containment.
+    """
+    FIELDS = ('title', 'item_number', 'item_number_mfg', 'item_number_dst',
+              'notes',)
+    INDEX_NAME = 'items_item_fulltext'
+    FTS_TABLE = 'items_item_fts'
+    RANK_FUNCTION = 'items_item_rank'
+    __WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+    @classmethod
+    def createIndex(self, using='default'):
+        """
+        Create the index of the database if it does not exist yet.
+        """
+        connection = connections[using]
+        method = getattr(
+            self, '_create{}'.format(connection.vendor.capitalize()), None)
+
+        if method:
+            method(connection)
+
+    @classmethod
+    def search(self, queryset, text):
+        """
+        Filter the Item 'queryset' on the words in 'text', the result is
+        annotated with a 'rank' and ordered by it, best match first.
+        """
+        if not self.__WORD_RE.search(text): return queryset.none()
+        connection = connections[queryset.db]
+        method = getattr(
+            self, '_search{}'.format(connection.vendor.capitalize()),
+            self._searchDefault)
+        return method(connection, queryset, text).order_by('-rank', 'pk')
+
+    @classmethod
+    def _getTable(self):
+        from inventory.apps.items.models import Item
+        return Item._meta.db_table
+
+    @classmethod
+    def _getColumns(self, connection, table=None):
+        qn = connection.ops.quote_name
+        prefix = "{}.".format(qn(table)) if table else ""
+        return ", ".join([prefix + qn(field) for field in self.FIELDS])
+
+    #
+    # MySQL
+    #
+    @classmethod
+    def _createMysql(self, connection):
+        table = self._getTable()
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) "
+                           "FROM information_schema.statistics "
+                           "WHERE table_schema = DATABASE() "
+                           "AND table_name = %s AND index_name = %s",
+                           [table, self.INDEX_NAME])
+
+            if not cursor.fetchone()[0]:
+                cursor.execute(
+                    "ALTER TABLE {} ADD FULLTEXT INDEX {} ({})".format(
+                        connection.ops.quote_name(table),
+                        connection.ops.quote_name(self.INDEX_NAME),
+                        self._getColumns(connection)))
+                log.info("Created full text index %s on %s",
+                         self.INDEX_NAME, table)
+
+    @classmethod
+    def _searchMysql(self, connection, queryset, text):
+        match = "MATCH ({}) AGAINST (%s IN NATURAL LANGUAGE MODE)".format(
+            self._getColumns(connection, self._getTable()))
+        return queryset.extra(select={'rank': match}, select_params=[text],
+                              where=[match], params=[text])
+
+    #
+    # SQLite
+    #
+    @classmethod
+    def _createSqlite(self, connection):
+        qn = connection.ops.quote_name
+        table = qn(self._getTable())
+        fts = qn(self.FTS_TABLE)
+        columns = self._getColumns(connection)
+        new = ", ".join(["new." + qn(field) for field in self.FIELDS])
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM sqlite_master "
+                           "WHERE type = 'table' AND name = %s",
+                           [self.FTS_TABLE])
+            if cursor.fetchone()[0]: return
+
+            cursor.execute("CREATE VIRTUAL TABLE {} USING fts4({})".format(
+                fts, columns))
+            insert = "INSERT INTO {} (docid, {}) VALUES (new.id, {});".format(
+                fts, columns, new)
+            delete = "DELETE FROM {} WHERE docid = old.id;".format(fts)
+            trigger = "CREATE TRIGGER {}_{{}} AFTER {{}} ON {} BEGIN {{}} END"
+            trigger = trigger.format(self.FTS_TABLE, table)
+            cursor.execute(trigger.format('ai', 'INSERT', insert))
+            cursor.execute(trigger.format('au', 'UPDATE', delete + insert))
+            cursor.execute(trigger.format('ad', 'DELETE', delete))
+            cursor.execute("INSERT INTO {0} (docid, {1}) "
+                           "SELECT id, {1} FROM {2}".format(
+                               fts, columns, table))
+            log.info("Created full text table %s", self.FTS_TABLE)
+
+    @classmethod
+    def _searchSqlite(self, connection, queryset, text):
+        qn = connection.ops.quote_name
+        fts = qn(self.FTS_TABLE)
+        # Quote each word so the user can not use the FTS query syntax.
+        words = " ".join(['"{}"'.format(word)
+                          for word in self.__WORD_RE.findall(text)])
+        return queryset.extra(
+            select={'rank': "{}(matchinfo({}, 'pcx'))".format(
+                self.RANK_FUNCTION, fts)},
+            tables=[self.FTS_TABLE],
+            where=["{}.docid = {}.id".format(fts, qn(self._getTable())),
+                   "{} MATCH %s".format(fts)],
+            params=[words])
+
+    @classmethod
+    def rankMatchInfo(self, matchInfo):
+        """
+        Rank a row from the 'pcx' matchinfo of the FTS table, each phrase
+        scores the hits in a column over the hits in all the rows.
+        """
+        data = struct.unpack('@' + 'I' * (len(matchInfo) // 4),
+                             str(matchInfo))
+        phrases, columns = data[:2]
+        rank = 0.0
+
+        for phrase in range(phrases):
+            for column in range(columns):
+                idx = 2 + (phrase * columns + column) * 3
+                hits, total = data[idx], data[idx + 1]
+                if hits: rank += float(hits) / total
+
+        return rank
+
+    #
+    # Any other database
+    #
+    @classmethod
+    def _searchDefault(self, connection, queryset, text):
+        for word in self.__WORD_RE.findall(text):
+            queryset = queryset.filter(reduce(lambda q, field: q | Q(
+                **{field + '__icontains': word}), self.FIELDS, Q()))
+
+        return queryset.extra(select={'rank': '0'})
+
+
+def createTextIndex(sender, using='default', **kwargs):
+    """
+    Receiver for the post_migrate signal of the items app.
+    """
+    ItemTextIndex.createIndex(using=using)
+
+
+def registerRankFunction(sender, connection, **kwargs):
+    """
+    Receiver for the connection_created signal, SQLite needs the rank
+    function of the FTS table on each new connection.
+    """
+    if connection.vendor == 'sqlite':
+        connection.connection.create_function(
+            ItemTextIndex.RANK_FUNCTION, 1, ItemTextIndex.rankMatchInfo)
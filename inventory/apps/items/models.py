@@ -11,6 +11,7 @@
 #----------------------------------
 
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from django.utils.safestring import mark_safe
 
@@ -335,3 +336,31 @@ class Item(Base):
 
     class Meta:
         ordering = ('categories__path',)
+
+
+def touchItem(sender, instance, **kwargs):
+    """
+    Receiver that updates the modification time of the items whose costs,
+    specifications, categories or location codes changed, so caches keyed
+    on the item modification time see the change.
+    """
+    action = kwargs.get('action')
+
+    if action is None:
+        pks = [instance.item_id]
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        pks = [instance.pk] if isinstance(instance, Item) else kwargs.get(
+            'pk_set')
+    elif action == 'pre_clear' and not isinstance(instance, Item):
+        # A clear from the category or location code side sends no pk_set,
+        # so the items are found while they are still linked. The clear
+        # runs in a transaction with this receiver.
+        name = [field.name for field in Item._meta.many_to_many
+                if field.remote_field.through is sender][0]
+        pks = list(Item.objects.filter(**{name: instance}).values_list(
+            'pk', flat=True))
+    else:
+        pks = None
+
+    if pks:
+        Item.objects.filter(pk__in=pks).update(mtime=timezone.now())
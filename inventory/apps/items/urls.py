@@ -15,5 +15,6 @@ from inventory.apps.items import views
 
 urlpatterns = [
     url(r'^$', views.frontPage),
+    url(r'^items/search/$', views.itemTextSearch),
     #url(r'^lookup/regions/', views.processRegion),
     ]
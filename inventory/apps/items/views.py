@@ -6,7 +6,8 @@ import json
 import logging
 import datetime, pytz
 
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseBadRequest
 from django.template import Context, loader
 from django.contrib.sessions.models import Session
 from django.contrib.auth.decorators import login_required
@@ -14,7 +15,8 @@ from django.utils.decorators import method_decorator
 
 from inventory.regions.models import Country
 from inventory.apps.utils.views import ViewBase
-from inventory.apps.items.models import Distributor, Manufacturer
+from inventory.apps.items.models import Item, Distributor, Manufacturer
+from inventory.apps.items.fulltext import ItemTextIndex
 from inventory.settings import SITE_NAME
 
 log = logging.getLogger('inventory.apps.items.views')
@@ -93,6 +95,43 @@ class ProcessRegion(ViewBase):
         return HttpResponse(json.dumps(response))
 
 
+class ItemTextSearch(ViewBase):
+    """
+    Return the items matching the words in the 'q' argument as JSON, best
+    match first. The 'limit' argument sets the number of items returned.
+    """
+    def __init__(self, log):
+        super(ItemTextSearch, self).__init__(log)
+
+    @method_decorator(login_required(redirect_field_name='/login/'))
+    def __call__(self, request, *args, **kwargs):
+        text = request.GET.get('q', '').strip()
+        limit = request.GET.get('limit', settings.ITEM_TEXT_SEARCH_LIMIT)
+
+        try:
+            limit = min(int(limit), settings.ITEM_TEXT_SEARCH_MAX_LIMIT)
+        except ValueError:
+            msg = "Invalid limit: %s" % limit
+            self._log.error(msg)
+            return HttpResponseBadRequest(json.dumps(
+                {'valid': False, 'message': msg}))
+
+        response = {'valid': True, 'items': []}
+
+        if text and limit > 0:
+            records = ItemTextIndex.search(Item.objects.all(), text)
+            response['items'] = [
+                {'pk': record.pk, 'title': record.title,
+                 'item_number': record.item_number,
+                 'rank': float(record.rank)}
+                for record in records.only(
+                    'pk', 'title', 'item_number')[:limit]]
+
+        self._log.debug("Context dump for %s: %s", self.__module__, response)
+        return HttpResponse(json.dumps(response),
+                            content_type='application/json')
+
+
 ##############################
 # Instantiate view callables #
 ##############################
@@ -100,3 +139,6 @@ frontPage = FrontPage(log)
 
 # Find regions for either Distributor or Manufacturer.
 processRegion = ProcessRegion(log)
+
+# Find items from the words in their text fields.
+itemTextSearch = ItemTextSearch(log)
@@ -4,6 +4,9 @@
 
 import logging
 
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
 from django.http import HttpResponse, HttpResponseBadRequest
 from django.template import Context, loader
 from django.contrib.auth.decorators import login_required
@@ -11,7 +14,7 @@ from django.utils.decorators import method_decorator
 from django.utils.html import escape
 from django.utils.safestring import mark_safe
 
-from inventory.apps.items.models import Item, Distributor, Manufacturer
+from inventory.apps.items.models import Item, Distributor, Manufacturer, Cost
 from inventory.apps.reports.forms import ItemForm, CostFormSet, BusinessForm
 from inventory.apps.utils.search import ItemSearch, DistributorSearch, \
      ManufacturerSearch
@@ -76,20 +79,53 @@ class ReportsBase(ViewBase):
 
 
 class ItemRecord(ReportsBase):
+    CONTENT_KEY = 'reports:item:{}:{}'
 
     def __init__(self, *args, **kwargs):
         super(ItemRecord, self).__init__(*args, **kwargs)
 
     def _populateRecord(self, response, pk):
         response['edit'] = "/admin/items/item/%s/" % pk
-        record = Item.objects.get(pk=int(pk))
-        response['item'] = self._getItemForm(record)
-        response['specset'] = self._getSpecForms(record)
-        response['costset'] = self._getCostForms(record)
+        response['content'] = mark_safe(self._getContent(int(pk)))
 
     def _getRecordHTML(self):
         return 'itemRecord.html'
 
+    def _getContent(self, pk):
+        """
+        Return the rendered record of the item, cached by its primary key and
+        modification time. The item is touched when its related rows change.
+        """
+        mtime = Item.objects.values_list('mtime', flat=True).get(pk=pk)
+        key = self.CONTENT_KEY.format(pk, mtime.isoformat())
+        content = cache.get(key)
+
+        if content is None:
+            record = self._getRecord(pk)
+            response = {}
+            response['item'] = self._getItemForm(record)
+            response['specset'] = self._getSpecForms(record)
+            response['costset'] = self._getCostForms(record)
+            context = Context(response)
+            self._log.debug("Context dump for %s: %s", self.__module__,
+                            context)
+            tmpl = loader.get_template('itemRecordContent.html')
+            content = tmpl.render(context)
+            cache.set(key, content, settings.ITEM_RECORD_CACHE_TIMEOUT)
+
+        return content
+
+    def _getRecord(self, pk):
+        """
+        Get the item with all the related objects of the report.
+        """
+        costs = Cost.objects.select_related(
+            'currency', 'distributor', 'manufacturer')
+        return Item.objects.select_related(
+            'distributor', 'manufacturer').prefetch_related(
+            'location_code', 'categories', 'specification_set',
+            Prefetch('cost_set', queryset=costs)).get(pk=pk)
+
     def _getItemForm(self, record):
         items = {}
         items['title'] = escape(record.title)
@@ -114,39 +150,25 @@ class ItemRecord(ReportsBase):
         return ItemForm(items)
 
     def _getSpecForms(self, record):
-        specIter = record.specification_set.iterator()
-        specList = []
-
-        while True:
-            try:
-                spec = specIter.next()
-                specs = (escape(spec.name + ':'), escape(spec.value))
-                specList.append(specs)
-            except StopIteration:
-                break
-
-        return specList
+        # Uses the prefetched specifications, iterator() would query again.
+        return [(escape(spec.name + ':'), escape(spec.value))
+                for spec in record.specification_set.all()]
 
     def _getCostForms(self, record):
-        costIter = record.cost_set.iterator()
         costList = []
 
-        while True:
-            try:
-                cost = costIter.next()
-                costs = {}
-                costs['value'] = escape(cost.value)
-                costs['currency'] = "%s (%s)" % (
-                    escape(cost.currency.symbol),
-                    escape(cost.currency.currency))
-                costs['date_acquired'] = cost.date_acquired
-                dist = cost.distributor
-                if dist: costs['distributor'] = escape(dist.name)
-                mfg = cost.manufacturer
-                if mfg: costs['manufacturer'] = escape(mfg.name)
-                costList.append(costs)
-            except StopIteration:
-                break
+        for cost in record.cost_set.all():
+            costs = {}
+            costs['value'] = escape(cost.value)
+            costs['currency'] = "%s (%s)" % (
+                escape(cost.currency.symbol),
+                escape(cost.currency.currency))
+            costs['date_acquired'] = cost.date_acquired
+            dist = cost.distributor
+            if dist: costs['distributor'] = escape(dist.name)
+            mfg = cost.manufacturer
+            if mfg: costs['manufacturer'] = escape(mfg.name)
+            costList.append(costs)
 
         return CostFormSet(initial=costList, prefix='cost')
 
@@ -0,0 +1,119 @@
+#
+# utils/choices.py
+#
+# Distinct value providers for the search form choices.
+#
+
+import logging
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.conf import settings
+
+log = logging.getLogger('inventory.apps.utils.choices')
+
+
+class ChoiceCache(object):
+    """
+    Keeps the distinct values of a model field in the default cache. The
+    values are found with one SELECT DISTINCT and a cached field is dropped
+    whenever a model in its field path is saved or deleted.
+    """
+    KEY = 'search:choices:{}:{}'
+    # The (model, field) pairs used by the search forms, only these are
+    # invalidated by the signals, any other field only expires.
+    FIELDS = (
+        ('items.Item', 'package'),
+        ('items.Item', 'distributor__name'),
+        ('items.Item', 'manufacturer__name'),
+        ('items.Category', 'path'),
+        ('maintenance.LocationCode', 'path'),
+        ('items.Distributor', 'name'),
+        ('items.Distributor', 'postal_code'),
+        ('items.Distributor', 'country'),
+        ('items.Manufacturer', 'name'),
+        ('items.Manufacturer', 'postal_code'),
+        ('items.Manufacturer', 'country'),
+        )
+
+    @classmethod
+    def getValues(self, model, field):
+        """
+        Return a sorted list of the distinct non-empty values of 'field',
+        which may span relations, ex. 'distributor__name'.
+        """
+        key = self.KEY.format(model._meta.label, field)
+        values = cache.get(key)
+
+        if values is None:
+            values = self._findValues(model, field)
+            cache.set(key, values, settings.SEARCH_CHOICES_CACHE_TIMEOUT)
+
+        return values
+
+    @classmethod
+    def getModels(self):
+        """
+        Return all the models that the cached fields depend on.
+        """
+        result = set()
+
+        for label, field in self.FIELDS:
+            result.update(self._resolve(apps.get_model(label), field)[0])
+
+        return result
+
+    @classmethod
+    def invalidate(self, sender):
+        keys = []
+
+        for label, field in self.FIELDS:
+            model = apps.get_model(label)
+
+            if sender in self._resolve(model, field)[0]:
+                keys.append(self.KEY.format(label, field))
+
+        if keys:
+            cache.delete_many(keys)
+            log.debug("Invalidated search choices: %s", keys)
+
+    @classmethod
+    def _findValues(self, model, field):
+        models, fieldObj = self._resolve(model, field)
+        values = model.objects.values_list(
+            field, flat=True).distinct().order_by()
+
+        # A relation shows the string of the related object.
+        if fieldObj is not None and fieldObj.is_relation:
+            values = [obj for obj in fieldObj.related_model.objects.filter(
+                pk__in=[value for value in values if value is not None])]
+
+        valueMap = dict([(str(value), None) for value in values if value])
+        return [value.strip() for value in sorted(valueMap)]
+
+    @classmethod
+    def _resolve(self, model, field):
+        """
+        Return the models in the field path and the last model field.
+        """
+        models = [model]
+        fieldObj = None
+
+        for name in field.split('__'):
+            try:
+                fieldObj = models[-1]._meta.get_field(name)
+            except FieldDoesNotExist:
+                break
+
+            if fieldObj.is_relation:
+                models.append(fieldObj.related_model)
+
+        return models, fieldObj
+
+
+def invalidateChoices(sender, **kwargs):
+    """
+    Receiver for the post_save and post_delete signals of the choice models.
+    """
+    ChoiceCache.invalidate(sender)
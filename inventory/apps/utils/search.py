@@ -8,23 +8,97 @@
 # $Revision: 95 $
 #----------------------------------
 
-from django.http import HttpResponse, HttpResponseBadRequest
+import csv
+import json
+import logging
+import operator
+from functools import reduce
+
+from django.conf import settings
+from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import (
+    HttpResponse, HttpResponseBadRequest, StreamingHttpResponse)
 from django.template import Context, loader
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
+from django.db import connections
 from django.db.models import Q
+from django.db.models.sql.datastructures import EmptyResultSet
 from django.utils.safestring import mark_safe
 from django.utils.html import escape
 from django.template.context_processors import csrf
 
 from inventory.apps.items.models import Item, Distributor, Manufacturer
+from inventory.apps.items.fulltext import ItemTextIndex
 from .views import ViewBase
 from .searchforms import (
     FindChoices, ItemSearchForm, DistributorSearchForm, ManufacturerSearchForm)
 from inventory.settings import SITE_NAME
 
 
+class SearchPlanner(type):
+    """
+    Compiles the field maps of a search class into a plan when the class is
+    created. The plan maps each form field to its kind, model field and the
+    lookups it is searched with, so a search only builds Q objects from it.
+    """
+    ICONTAINS = 'icontains'
+    EXACT = 'exact'
+    LESS_THAN_EQUAL = 'lte'
+    GREATER_THAN_EQUAL = 'gte'
+    CHECK_BOX = 'check_box'
+    # The field maps in order of precedence.
+    KINDS = ((ICONTAINS, '_ICONTAINS'), (EXACT, '_EXACT'),
+             (LESS_THAN_EQUAL, '_LESS_THAN_EQUAL'),
+             (GREATER_THAN_EQUAL, '_GREATER_THAN_EQUAL'),
+             (CHECK_BOX, '_CHECK_BOX'))
+    USER_FIELDS = ('username', 'first_name', 'last_name')
+
+    def __new__(cls, name, bases, attrs):
+        klass = super(SearchPlanner, cls).__new__(cls, name, bases, attrs)
+        plan = {}
+
+        for kind, attr in cls.KINDS:
+            for key, field in getattr(klass, attr, {}).items():
+                if kind == cls.CHECK_BOX:
+                    lookups = (field,)
+                elif kind == cls.ICONTAINS and key == 'user':
+                    lookups = tuple(["user__%s__icontains" % userField
+                                     for userField in cls.USER_FIELDS])
+                else:
+                    lookups = ("%s__%s" % (field, kind),)
+
+                plan.setdefault(key, (kind, field, lookups))
+
+        klass._PLAN = plan
+        return klass
+
+
+class Echo(object):
+    """
+    A file like object that returns what is written to it, so a csv writer
+    produces the lines of a streaming response.
+    """
+
+    def write(self, value):
+        return value
+
+
 class SearchBase(ViewBase):
+    __metaclass__ = SearchPlanner
+    # The related objects a result row is rendered from, fetched with the
+    # records so rendering a page does not query once per row.
+    _SELECT_RELATED = ()
+    _PREFETCH_RELATED = ()
+    # The columns and file name of an export of the search results.
+    _EXPORT_FIELDS = ()
+    _EXPORT_NAME = 'records'
+    _EXPORT_TYPES = {'csv': 'text/csv', 'json': 'application/x-ndjson'}
+    # The POST arguments that are not part of the search itself.
+    _PAGE_ARG = 'page'
+    _EXPORT_ARG = 'export'
+    _IGNORED_ARGS = ('csrfmiddlewaretoken', _PAGE_ARG, _EXPORT_ARG)
 
     def __init__(self, log, referringPage, action, purge=False, crumbData=()):
         self._log = log
@@ -54,18 +128,29 @@ class SearchBase(ViewBase):
 
             if form.is_valid():
                 query = self._buildQuery(form)
-                records = self._getRecords(query)
-                self._log.debug("records: %s", records)
-                response['title'] = referTitle
+                records = self._filterRecords(self._getRecords(query), form)
+                records = self._prepareRecords(records)
+
+                if self._log.isEnabledFor(logging.DEBUG):
+                    self._log.debug("SQL: %s, plan: %s",
+                                    *self.explain(records))
 
-                if records:
-                    response['records'] = []
+                export = request.POST.get(self._EXPORT_ARG)
 
-                    for record in records:
-                        response['records'].append(self._populateRow(record))
+                if export in self._EXPORT_TYPES:
+                    return self._export(records, export)
 
+                response['title'] = referTitle
+                page = self._getPage(records, request.POST.get(self._PAGE_ARG))
+
+                if page.paginator.count:
+                    response['records'] = [self._populateRow(record)
+                                           for record in page.object_list]
+                    response['page'] = page
+                    response['search'] = self._getSearchArgs(request.POST)
                     self._setBreadcrumb(request, referTitle, "")
                     context = Context(response)
+                    context.update(csrf(request))
                     self._log.debug("Context dump for %s: %s",
                                     self.__module__, context)
                     tmpl = loader.get_template(self._referringPage)
@@ -90,14 +175,123 @@ class SearchBase(ViewBase):
         tmpl = loader.get_template(self._getSearchHTML())
         return HttpResponse(tmpl.render(context))
 
-    def _getChoice(self, field, value):
-        msg = "_getChoice() must be defined in the subclass."
+    def _getChoice(self, field, value, choiceMaps):
+        """
+        Translate the index of a select box into its value. The choice map
+        of each field is only built once per search.
+        """
+        if field not in choiceMaps:
+            choiceMaps[field] = self._getChoiceMap(field)
+
+        return choiceMaps[field].get(int(value), u'')
+
+    def _getChoiceMap(self, field):
+        msg = "_getChoiceMap() must be defined in the subclass."
         raise NotImplementedError(msg)
 
     def _getRecords(self, query):
         msg = "_getRecords() must be defined in the subclass."
         raise NotImplementedError(msg)
 
+    def _filterRecords(self, records, form):
+        """
+        Apply the parts of the search that are not Q objects to the records.
+        """
+        return records
+
+    def _prepareRecords(self, records):
+        """
+        Add the related data needs of the search to the records queryset.
+        """
+        if self._SELECT_RELATED:
+            records = records.select_related(*self._SELECT_RELATED)
+
+        if self._PREFETCH_RELATED:
+            records = records.prefetch_related(*self._PREFETCH_RELATED)
+
+        return records
+
+    def _getPage(self, records, number):
+        """
+        Return the requested page of the records, the first or last page is
+        returned if the page number is invalid or out of range.
+        """
+        paginator = Paginator(records, settings.SEARCH_RESULTS_PAGE_SIZE)
+
+        try:
+            page = paginator.page(number)
+        except PageNotAnInteger:
+            page = paginator.page(1)
+        except EmptyPage:
+            page = paginator.page(paginator.num_pages)
+
+        return page
+
+    def _export(self, records, export):
+        """
+        Stream all the records as csv or newline delimited json.
+        """
+        if export == 'csv':
+            lines = self._iterCSV(records)
+        else:
+            lines = self._iterJSON(records)
+
+        response = StreamingHttpResponse(
+            lines, content_type=self._EXPORT_TYPES[export])
+        response['Content-Disposition'] = (
+            'attachment; filename="{}.{}"'.format(self._EXPORT_NAME, export))
+        return response
+
+    def _iterCSV(self, records):
+        writer = csv.writer(Echo())
+        yield writer.writerow(self._EXPORT_FIELDS)
+
+        for record in self._iterRecords(records):
+            yield writer.writerow([self._encodeValue(value) for value in
+                                   self._exportRow(record)])
+
+    def _iterJSON(self, records):
+        for record in self._iterRecords(records):
+            yield json.dumps(dict(zip(self._EXPORT_FIELDS,
+                                      self._exportRow(record))),
+                             cls=DjangoJSONEncoder) + '\n'
+
+    def _encodeValue(self, value):
+        if value is None:
+            value = u''
+        elif isinstance(value, (list, tuple)):
+            value = u'|'.join(value)
+
+        return unicode(value).encode('utf-8')
+
+    def _iterRecords(self, records):
+        """
+        Iterate over the records in chunks of primary keys, so only one chunk
+        and its related objects are held in memory at a time.
+        """
+        records = records.order_by('pk')
+        size = settings.SEARCH_EXPORT_CHUNK_SIZE
+        chunk = list(records[:size])
+
+        while chunk:
+            for record in chunk:
+                yield record
+
+            if len(chunk) < size: break
+            chunk = list(records.filter(pk__gt=chunk[-1].pk)[:size])
+
+    def _exportRow(self, record):
+        msg = "_exportRow() must be defined in the subclass."
+        raise NotImplementedError(msg)
+
+    def _getSearchArgs(self, data):
+        """
+        Return the search arguments as a list of (name, value) tuples, so the
+        result pages can post the same search again for another page.
+        """
+        return [(name, value) for name, values in sorted(data.lists())
+                if name not in self._IGNORED_ARGS for value in values]
+
     def _getSearchForm(self, data=None):
         msg = "_getSearchForm() must be defined in the subclass."
         raise NotImplementedError(msg)
@@ -111,46 +305,45 @@ class SearchBase(ViewBase):
         raise NotImplementedError(msg)
 
     def _buildQuery(self, form):
-        query = []
+        query = Q()
+        choiceMaps = {}
 
         for key, value in form.cleaned_data.items():
             #self._log.debug("key: %s, value: %s", key, value)
-            if value in (u'', '', None): continue
+            if value in (u'', '', None) or key not in self._PLAN: continue
+            kind, field, lookups = self._PLAN[key]
 
-            if key in self._ICONTAINS:
-                field = self._ICONTAINS[key]
+            if kind == SearchPlanner.EXACT:
+                value = self._getChoice(field, value, choiceMaps)
+            elif kind == SearchPlanner.CHECK_BOX:
+                if self._purge and field == 'purge': value = True
 
-                if key == 'user':
-                    code = "(Q(user__username__icontains='%s') |" + \
-                           " Q(user__first_name__icontains='%s') |" + \
-                           " Q(user__last_name__icontains='%s'))"
-                    code = code % (value, value, value)
-                else:
-                    code = "Q(%s__icontains='%s')" % (field, value)
-            elif key in self._EXACT:
-                field = self._EXACT[key]
-                choice = self._getChoice(field, value)
-                code = "Q(%s__exact='%s')" % (field, choice)
-            elif key in self._LESS_THAN_EQUAL:
-                field = self._LESS_THAN_EQUAL[key]
-                code = "Q(%s__lte=%s)" % (field, value)
-            elif key in self._GREATER_THAN_EQUAL:
-                field = self._GREATER_THAN_EQUAL[key]
-                code = "Q(%s__gte=%s)" % (field, value)
-            elif key in self._CHECK_BOX:
-                field = self._CHECK_BOX[key]
-
-                if self._purge and field == 'purge':
-                    code = "Q(%s=True)" % field
-                else:
-                    code = "Q(%s=%s)" % (field, value)
+            query &= reduce(operator.or_, [Q(**{lookup: value})
+                                           for lookup in lookups])
+
+        self._log.debug("query: %s", query)
+        return query
+
+    def explain(self, records):
+        """
+        Return the SQL of the 'records' queryset and the database plan for
+        it, used for debugging slow searches.
+        """
+        try:
+            sql, params = records.query.sql_with_params()
+        except EmptyResultSet:
+            # A search that can match nothing is not sent to the database.
+            return "", []
 
-            query.append(code)
+        cursor = connections[records.db].cursor()
 
-        result = ' & '.join(query)
-        self._log.debug("query: %s", result)
-        if result: result = eval(result)
-        return result
+        try:
+            cursor.execute("EXPLAIN " + sql, params)
+            plan = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        return str(records.query), plan
 
 
 class ItemSearch(SearchBase):
@@ -168,12 +361,25 @@ class ItemSearch(SearchBase):
     _CHECK_BOX = {'active': 'active',
                   'obsolete': 'obsolete',
                   'purge': 'purge'}
+    _SELECT_RELATED = ('distributor', 'manufacturer')
+    _PREFETCH_RELATED = ('categories', 'location_code')
+    _EXPORT_FIELDS = ('pk', 'title', 'item_number', 'item_number_mfg',
+                      'item_number_dst', 'package', 'quantity', 'categories',
+                      'location_code', 'distributor', 'manufacturer',
+                      'active', 'obsolete')
+    _EXPORT_NAME = 'items'
 
     def __init__(self, *args, **kwargs):
         super(ItemSearch, self).__init__(*args, **kwargs)
 
     def _getRecords(self, query):
-        return Item.objects.filter(query)
+        # The joins of the many to many lookups can repeat an item.
+        return Item.objects.filter(query).distinct().order_by('title', 'pk')
+
+    def _filterRecords(self, records, form):
+        text = form.cleaned_data.get('text')
+        if text: records = ItemTextIndex.search(records, text)
+        return records
 
     def _getSearchForm(self, data=None):
         return ItemSearchForm(data=data)
@@ -191,22 +397,31 @@ class ItemSearch(SearchBase):
             escape(cat.path) for cat in record.categories.all()]))
         return data
 
-    def _getChoice(self, field, value):
+    def _exportRow(self, record):
+        return [record.pk, record.title, record.item_number,
+                record.item_number_mfg, record.item_number_dst,
+                record.package, record.quantity,
+                [cat.path for cat in record.categories.all()],
+                [code.path for code in record.location_code.all()],
+                record.distributor and record.distributor.name,
+                record.manufacturer and record.manufacturer.name,
+                record.active, record.obsolete]
+
+    def _getChoiceMap(self, field):
         obj, sep, attr = field.partition('__')
 
         if obj == "categories":
             choiceMap = dict(FindChoices.findCategoryFieldList(
                 attr, defaultOption=False))
         elif obj == "location_code":
-            choiceMap = dict(FindChoices.findLocationCodeCategoryFieldList(
+            choiceMap = dict(FindChoices.findLocationCodeFieldList(
                 attr, defaultOption=False))
         else:
             choiceMap = dict(FindChoices.findItemFieldList(
                 field, defaultOption=False))
 
-        self._log.debug("field: %s, value: %s, choiceMap: %s",
-                        field, value, choiceMap)
-        return choiceMap.get(int(value), u'')
+        self._log.debug("field: %s, choiceMap: %s", field, choiceMap)
+        return choiceMap
 
 
 class BusinessSearchBase(SearchBase):
@@ -219,6 +434,10 @@ class BusinessSearchBase(SearchBase):
     _LESS_THAN_EQUAL = {}
     _GREATER_THAN_EQUAL = {}
     _CHECK_BOX = {}
+    _SELECT_RELATED = ('state', 'country')
+    _EXPORT_FIELDS = ('pk', 'name', 'address_01', 'address_02', 'city',
+                      'state', 'postal_code', 'country', 'phone', 'fax',
+                      'email', 'url')
 
     def __init__(self, *args, **kwargs):
         super(BusinessSearchBase, self).__init__(*args, **kwargs)
@@ -239,41 +458,50 @@ class BusinessSearchBase(SearchBase):
         data.append(('country', record.country))
         return dict([(k, v is not None and v or u'') for k, v in data])
 
+    def _exportRow(self, record):
+        return [record.pk, record.name, record.address_01, record.address_02,
+                record.city, record.state and unicode(record.state),
+                record.postal_code,
+                record.country and unicode(record.country), record.phone,
+                record.fax, record.email, record.url]
+
 
 class DistributorSearch(BusinessSearchBase):
+    _EXPORT_NAME = 'distributors'
 
     def __init__(self, *args, **kwargs):
         super(DistributorSearch, self).__init__(*args, **kwargs)
 
     def _getRecords(self, query):
-        if query: return Distributor.objects.filter(query)
-        return Distributor.objects.all()
+        records = Distributor.objects.order_by('name', 'pk')
+        if query: records = records.filter(query)
+        return records
 
     def _getSearchForm(self, data=None):
         return DistributorSearchForm(data=data)
 
-    def _getChoice(self, field, value):
+    def _getChoiceMap(self, field):
         choiceMap = dict(FindChoices.findDistributorFieldList(
             field, defaultOption=False))
-        self._log.debug("field: %s, value: %s, choiceMap: %s",
-                        field, value, choiceMap)
-        return choiceMap.get(int(value), u'')
+        self._log.debug("field: %s, choiceMap: %s", field, choiceMap)
+        return choiceMap
 
 class ManufacturerSearch(BusinessSearchBase):
+    _EXPORT_NAME = 'manufacturers'
 
     def __init__(self, *args, **kwargs):
         super(ManufacturerSearch, self).__init__(*args, **kwargs)
 
     def _getRecords(self, query):
-        if query: return Manufacturer.objects.filter(query)
-        return Manufacturer.objects.all()
+        records = Manufacturer.objects.order_by('name', 'pk')
+        if query: records = records.filter(query)
+        return records
 
     def _getSearchForm(self, data=None):
         return ManufacturerSearchForm(data=data)
 
-    def _getChoice(self, field, value):
+    def _getChoiceMap(self, field):
         choiceMap = dict(FindChoices.findManufacturerFieldList(
             field, defaultOption=False))
-        self._log.debug("field: %s, value: %s, choiceMap: %s",
-                        field, value, choiceMap)
-        return choiceMap.get(int(value), u'')
+        self._log.debug("field: %s, choiceMap: %s", field, choiceMap)
+        return choiceMap
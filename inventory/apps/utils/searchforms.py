@@ -8,64 +8,63 @@
 # $Revision: 95 $
 #----------------------------------
 
+from functools import partial
+
 from django import forms
 
 from inventory.apps.items.models import (
     Item, Category, Distributor, Manufacturer)
 from inventory.maintenance.models import LocationCode
 
+from .choices import ChoiceCache
+
 
 class FindChoices(object):
     """
-    This class finds the choices for form fields.
-
-    *** TODO ***
-    These class methods are doing full table scans which will
-    become an issue as the database grows.
+    This class finds the choices for form fields. The distinct values of
+    each field are found in SQL and cached by the ChoiceCache.
     """
     @classmethod
     def findCategoryFieldList(self, field, defaultOption=True,
                               optionName="Category"):
-        records = Category.objects.all()
         return FindChoices._findFieldList(
-            records, field, defaultOption=defaultOption, optionName=optionName)
+            Category, field, defaultOption=defaultOption,
+            optionName=optionName)
 
     @classmethod
     def findItemFieldList(self, field, defaultOption=True, optionName=""):
-        records = Item.objects.all()
         return FindChoices._findFieldList(
-            records, field, defaultOption=defaultOption, optionName=optionName)
+            Item, field, defaultOption=defaultOption, optionName=optionName)
 
     @classmethod
     def findLocationCodeFieldList(self, field, defaultOption=True,
                                   optionName="Location Code"):
-        records = LocationCode.objects.all()
         return FindChoices._findFieldList(
-            records, field, defaultOption=defaultOption, optionName=optionName)
+            LocationCode, field, defaultOption=defaultOption,
+            optionName=optionName)
 
     @classmethod
     def findDistributorFieldList(self, field, defaultOption=True,
                                  optionName=""):
-        records = Distributor.objects.all()
         return FindChoices._findFieldList(
-            records, field, defaultOption=defaultOption, optionName=optionName)
+            Distributor, field, defaultOption=defaultOption,
+            optionName=optionName)
 
     @classmethod
     def findManufacturerFieldList(self, field, defaultOption=True,
                                   optionName=""):
-        records = Manufacturer.objects.all()
         return FindChoices._findFieldList(
-            records, field, defaultOption=defaultOption, optionName=optionName)
+            Manufacturer, field, defaultOption=defaultOption,
+            optionName=optionName)
 
     @classmethod
-    def _findFieldList(self, records, field, defaultOption=True, optionName=""):
+    def _findFieldList(self, model, field, defaultOption=True, optionName=""):
         if not len(field) or not isinstance(field, (str, unicode)):
             msg = "Invalid field value and type can only be a 'str' or" + \
                   " 'unicode'."
             raise TypeError(msg)
 
-        field = field.replace('__', '.')
-        obj, sep, attr = field.partition('.')
+        obj, sep, attr = field.partition('__')
 
         if defaultOption:
             if optionName:
@@ -78,55 +77,52 @@ class FindChoices(object):
         else:
             result = []
 
-        valueMap = {}
-
-        if records:
-            for record in records:
-                fieldPath = '.'.join(["record", obj])
-
-                if attr and hasattr(eval(fieldPath), attr):
-                    fieldPath += ".%s" % attr
+        values = ChoiceCache.getValues(model, field)
+        result += [(idx, value) for idx, value in enumerate(values, start=1)]
+        return result
 
-                #log.debug("fieldPath: %s", fieldPath)
-                value = eval(fieldPath)
-                if value: valueMap[str(value)] = None
 
-            values = valueMap.keys()
-            values.sort()
-            #log.debug("values: %s", values)
-            idx = 1
+class SearchForm(forms.Form):
+    """
+    The choices of the select boxes are callables so nothing is found when
+    this module is imported. They are resolved once for each new form from
+    the ChoiceCache, so rendering and validating use the same choices.
+    """
 
-            for value in values:
-                result.append((idx, value.strip()))
-                idx += 1
+    def __init__(self, *args, **kwargs):
+        super(SearchForm, self).__init__(*args, **kwargs)
 
-        return result
+        for field in self.fields.values():
+            if isinstance(field, forms.ChoiceField):
+                field.choices = list(field.choices)
 
 
-class ItemSearchForm(forms.Form):
+class ItemSearchForm(SearchForm):
+    text = forms.CharField(max_length=248, required=False,
+                           label="Text Search")
     user = forms.CharField(max_length=50, required=False)
     title = forms.CharField(max_length=20, required=False)
     item_number = forms.CharField(max_length=20, required=False)
     item_number_dst = forms.CharField(max_length=20, required=False)
     item_number_mfg = forms.CharField(max_length=20, required=False)
     package = forms.ChoiceField(
-        choices=FindChoices.findItemFieldList('package'),
+        choices=partial(FindChoices.findItemFieldList, 'package'),
         required=False,
         widget=forms.Select())
     location_code = forms.ChoiceField(
-        choices=FindChoices.findLocationCodeFieldList('path'),
+        choices=partial(FindChoices.findLocationCodeFieldList, 'path'),
         required=False,
         widget=forms.Select())
     categories = forms.ChoiceField(
-        choices=FindChoices.findCategoryFieldList('path'),
+        choices=partial(FindChoices.findCategoryFieldList, 'path'),
         required=False,
         widget=forms.Select())
     distributor = forms.ChoiceField(
-        choices=FindChoices.findItemFieldList('distributor__name'),
+        choices=partial(FindChoices.findItemFieldList, 'distributor__name'),
         required=False,
         widget=forms.Select())
     manufacturer = forms.ChoiceField(
-        choices=FindChoices.findItemFieldList('manufacturer__name'),
+        choices=partial(FindChoices.findItemFieldList, 'manufacturer__name'),
         required=False,
         widget=forms.Select())
     quantity = forms.IntegerField(required=False)
@@ -150,10 +146,10 @@ class ItemSearchForm(forms.Form):
         return self.cleaned_data
 
 
-class DistributorSearchForm(forms.Form):
+class DistributorSearchForm(SearchForm):
     user = forms.CharField(max_length=50, required=False)
     name = forms.ChoiceField(
-        choices=FindChoices.findDistributorFieldList('name'),
+        choices=partial(FindChoices.findDistributorFieldList, 'name'),
         required=False,
         widget=forms.Select())
     address_01 = forms.CharField(max_length=50, required=False)
@@ -161,11 +157,12 @@ class DistributorSearchForm(forms.Form):
     city = forms.CharField(max_length=30, required=False)
     state = forms.CharField(max_length=2, required=False)
     postal_code = forms.ChoiceField(
-        choices=FindChoices.findDistributorFieldList('postal_code'),
+        choices=partial(FindChoices.findDistributorFieldList,
+                        'postal_code'),
         required=False,
         widget=forms.Select())
     country = forms.ChoiceField(
-        choices=FindChoices.findDistributorFieldList('country'),
+        choices=partial(FindChoices.findDistributorFieldList, 'country'),
         required=False,
         widget=forms.Select())
     phone = forms.CharField(max_length=20, required=False)
@@ -186,10 +183,10 @@ class DistributorSearchForm(forms.Form):
         return self.cleaned_data
 
 
-class ManufacturerSearchForm(forms.Form):
+class ManufacturerSearchForm(SearchForm):
     user = forms.CharField(max_length=50, required=False)
     name = forms.ChoiceField(
-        choices=FindChoices.findManufacturerFieldList('name'),
+        choices=partial(FindChoices.findManufacturerFieldList, 'name'),
         required=False,
         widget=forms.Select())
     address_01 = forms.CharField(max_length=50, required=False)
@@ -197,11 +194,13 @@ class ManufacturerSearchForm(forms.Form):
     city = forms.CharField(max_length=30, required=False)
     state = forms.CharField(max_length=2, required=False)
     postal_code = forms.ChoiceField(
-        choices=FindChoices.findManufacturerFieldList('postal_code'),
+        choices=partial(FindChoices.findManufacturerFieldList,
+                        'postal_code'),
         required=False,
         widget=forms.Select())
     country = forms.ChoiceField(
-        choices=FindChoices.findManufacturerFieldList('country'),
+        choices=partial(FindChoices.findManufacturerFieldList,
+                        'country'),
         required=False,
         widget=forms.Select())
     phone = forms.CharField(max_length=20, required=False)
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+#
+# inventory/apps/utils/tests/test_search.py
+#
+# Run ./manage.py test -k # Keep the DB, don't rebuild.
+#
+
+import csv
+import json
+import logging
+from unittest import skipIf
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils.six import StringIO
+
+from inventory.apps.items.models import Item, Category
+
+from ..search import SearchPlanner, ItemSearch, DistributorSearch
+
+User = get_user_model()
+log = logging.getLogger('inventory.apps.utils.tests')
+
+
+class CleanedForm(object):
+    """
+    Stands in for a valid search form.
+    """
+
+    def __init__(self, **cleaned_data):
+        self.cleaned_data = cleaned_data
+
+
+class MappedItemSearch(ItemSearch):
+    """
+    Item search with fixed choice maps that counts the maps it builds.
+    """
+    CHOICE_MAPS = {'package': {1: u'TO-92', 2: u'DIP-8'},
+                   'categories__path': {1: u'Arts>Music'}}
+
+    def __init__(self, *args, **kwargs):
+        super(MappedItemSearch, self).__init__(*args, **kwargs)
+        self.built = []
+
+    def _getChoiceMap(self, field):
+        self.built.append(field)
+        return self.CHOICE_MAPS[field]
+
+
+class TestItemSearch(TestCase):
+    _TEST_USERNAME = 'TestUser'
+    _TEST_PASSWORD = 'TestPassword_007'
+
+    def __init__(self, name):
+        super(TestItemSearch, self).__init__(name)
+        self.user = None
+        self.search = None
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username=self._TEST_USERNAME, password=self._TEST_PASSWORD)
+        self.search = MappedItemSearch(log, 'itemSearch.html',
+                                       '/search/item/')
+
+    def _create_item(self, title, user=None, **kwargs):
+        kwargs.setdefault('item_number', '0001')
+        return Item.objects.create(user=user or self.user, title=title,
+                                   **kwargs)
+
+    def _get_leaves(self, query):
+        leaves = set()
+
+        for child in query.children:
+            if isinstance(child, tuple):
+                leaves.add(child)
+            else:
+                leaves.update(self._get_leaves(child))
+
+        return leaves
+
+    def _run_search(self, search, **cleaned_data):
+        form = CleanedForm(**cleaned_data)
+        records = search._getRecords(search._buildQuery(form))
+        return search._prepareRecords(search._filterRecords(records, form))
+
+    def test_plan(self):
+        #self.skipTest("Temporarily skipped")
+        plan = ItemSearch._PLAN
+        msg = "plan: {}".format(plan)
+        self.assertEqual(plan['title'], (
+            SearchPlanner.ICONTAINS, 'title', ('title__icontains',)), msg)
+        self.assertEqual(plan['user'][2], (
+            'user__username__icontains', 'user__first_name__icontains',
+            'user__last_name__icontains'), msg)
+        self.assertEqual(plan['categories'], (
+            SearchPlanner.EXACT, 'categories__path',
+            ('categories__path__exact',)), msg)
+        self.assertEqual(plan['quantity'], (
+            SearchPlanner.LESS_THAN_EQUAL, 'quantity',
+            ('quantity__lte',)), msg)
+        self.assertEqual(plan['active'], (
+            SearchPlanner.CHECK_BOX, 'active', ('active',)), msg)
+        self.assertFalse('text' in plan, msg)
+
+    def test_build_query_exact(self):
+        #self.skipTest("Temporarily skipped")
+        form = CleanedForm(package=u'2', categories=u'1', text=u'lamp',
+                           title=u'', distributor=None)
+        query = self.search._buildQuery(form)
+        leaves = self._get_leaves(query)
+        msg = "query: {}, built: {}".format(query, self.search.built)
+        self.assertEqual(query.connector, 'AND', msg)
+        self.assertEqual(leaves, set([
+            ('package__exact', u'DIP-8'),
+            ('categories__path__exact', u'Arts>Music')]), msg)
+        self.assertEqual(sorted(self.search.built),
+                         ['categories__path', 'package'], msg)
+        # An index that is not in the choice map matches the empty value.
+        query = self.search._buildQuery(CleanedForm(package=u'9'))
+        msg = "query: {}".format(query)
+        self.assertEqual(self._get_leaves(query),
+                         set([('package__exact', u'')]), msg)
+
+    def test_build_query_check_box(self):
+        #self.skipTest("Temporarily skipped")
+        form = CleanedForm(active=False, obsolete=True, purge=False,
+                           quantity=5)
+        query = self.search._buildQuery(form)
+        msg = "query: {}".format(query)
+        self.assertEqual(self._get_leaves(query), set([
+            ('active', False), ('obsolete', True), ('purge', False),
+            ('quantity__lte', 5)]), msg)
+        # A purge search always searches the items marked for purging.
+        search = MappedItemSearch(log, 'itemSearch.html', '/search/purge/',
+                                  purge=True)
+        query = search._buildQuery(form)
+        msg = "query: {}".format(query)
+        self.assertEqual(self._get_leaves(query), set([
+            ('active', False), ('obsolete', True), ('purge', True),
+            ('quantity__lte', 5)]), msg)
+
+    def test_build_query_user(self):
+        #self.skipTest("Temporarily skipped")
+        query = self.search._buildQuery(CleanedForm(user=u'smith'))
+        msg = "query: {}".format(query)
+        self.assertEqual(query.connector, 'OR', msg)
+        self.assertEqual(sorted(query.children), [
+            ('user__first_name__icontains', u'smith'),
+            ('user__last_name__icontains', u'smith'),
+            ('user__username__icontains', u'smith')], msg)
+        # The OR group is ANDed with the other fields.
+        query = self.search._buildQuery(
+            CleanedForm(user=u'smith', title=u'lamp'))
+        msg = "query: {}".format(query)
+        self.assertEqual(query.connector, 'AND', msg)
+        self.assertEqual(len(self._get_leaves(query)), 4, msg)
+        other = User.objects.create_user(
+            username='other', password=self._TEST_PASSWORD,
+            first_name='Robert', last_name='Smith')
+        red = self._create_item("Red Lamp", user=other)
+        blue = self._create_item("Blue Lamp")
+        self._create_item("Smith Widget")
+
+        for value, expected in (('SMITH', [red.pk]), ('rob', [red.pk]),
+                                ('testu', [blue.pk])):
+            records = self._run_search(self.search, user=value,
+                                       title=u'lamp')
+            pks = [record.pk for record in records]
+            msg = "value: {}, found: {}, expected: {}".format(
+                value, pks, expected)
+            self.assertEqual(pks, expected, msg)
+
+    def test_explain(self):
+        #self.skipTest("Temporarily skipped")
+        self._create_item("Red Lamp")
+        records = self._run_search(self.search, title=u'lamp')
+        sql, plan = self.search.explain(records)
+        msg = "sql: {}, plan: {}".format(sql, plan)
+        self.assertTrue(Item._meta.db_table in sql, msg)
+        self.assertTrue('lamp' in sql, msg)
+        self.assertTrue(len(plan) > 0, msg)
+
+    def test_explain_empty(self):
+        #self.skipTest("Temporarily skipped")
+        self._create_item("Red Lamp")
+        # Text without any words can match nothing.
+        records = self._run_search(self.search, text=u'-- !? --',
+                                   title=u'lamp')
+        sql, plan = self.search.explain(records)
+        msg = "sql: {}, plan: {}".format(sql, plan)
+        self.assertEqual((sql, plan), ("", []), msg)
+        self.assertEqual(list(records), [], msg)
+
+    @override_settings(SEARCH_RESULTS_PAGE_SIZE=2)
+    def test_paging(self):
+        #self.skipTest("Temporarily skipped")
+        arts = Category.objects.create(user=self.user, name='Arts',
+                                       parent=None)
+        items = [self._create_item("Lamp {}".format(idx))
+                 for idx in range(5)]
+
+        for item in items:
+            item.categories.add(arts)
+
+        records = self._run_search(self.search, title=u'lamp')
+        msg = "select_related: {}, prefetch_related: {}".format(
+            records.query.select_related, records._prefetch_related_lookups)
+        self.assertEqual(sorted(records.query.select_related),
+                         ['distributor', 'manufacturer'], msg)
+        self.assertEqual(tuple(records._prefetch_related_lookups),
+                         ('categories', 'location_code'), msg)
+
+        for number, expected in (('2', items[2:4]), ('x', items[:2]),
+                                 ('99', items[4:])):
+            page = self.search._getPage(records, number)
+
+            # The rows of a page cost the same queries for any page size.
+            with self.assertNumQueries(3):
+                rows = [self.search._populateRow(record)
+                        for record in page.object_list]
+
+            msg = "number: {}, rows: {}".format(number, rows)
+            self.assertEqual([row['pk'] for row in rows],
+                             [item.pk for item in expected], msg)
+            self.assertEqual([row['categories'] for row in rows],
+                             ['Arts'] * len(expected), msg)
+
+    def test_iter_records(self):
+        #self.skipTest("Temporarily skipped")
+        items = [self._create_item("Lamp {}".format(idx))
+                 for idx in range(5)]
+        records = self._run_search(self.search, title=u'lamp')
+
+        # Uneven and exact multiples of the chunk size.
+        for size in (1, 2, 5, 6):
+            with self.settings(SEARCH_EXPORT_CHUNK_SIZE=size):
+                pks = [record.pk
+                       for record in self.search._iterRecords(records)]
+
+            msg = "size: {}, pks: {}".format(size, pks)
+            self.assertEqual(pks, [item.pk for item in items], msg)
+
+    @override_settings(SEARCH_EXPORT_CHUNK_SIZE=2)
+    def test_export_csv(self):
+        #self.skipTest("Temporarily skipped")
+        arts = Category.objects.create(user=self.user, name='Arts',
+                                       parent=None)
+        items = [self._create_item("Lamp {}".format(idx), package='TO-92')
+                 for idx in range(5)]
+        items[3].categories.add(arts)
+        records = self._run_search(self.search, title=u'lamp')
+        response = self.search._export(records, 'csv')
+        msg = "Content-Type: {}, Content-Disposition: {}".format(
+            response['Content-Type'], response['Content-Disposition'])
+        self.assertEqual(response['Content-Type'], 'text/csv', msg)
+        self.assertTrue('items.csv' in response['Content-Disposition'], msg)
+        content = "".join(response.streaming_content)
+        rows = list(csv.reader(StringIO(content)))
+        msg = "rows: {}".format(rows)
+        self.assertEqual(tuple(rows[0]), ItemSearch._EXPORT_FIELDS, msg)
+        self.assertEqual([int(row[0]) for row in rows[1:]],
+                         [item.pk for item in items], msg)
+        self.assertEqual(rows[4][1], "Lamp 3", msg)
+        self.assertEqual(rows[4][7], "Arts", msg)
+        self.assertEqual(rows[5][7], "", msg)
+
+    @override_settings(SEARCH_EXPORT_CHUNK_SIZE=2)
+    def test_export_json(self):
+        #self.skipTest("Temporarily skipped")
+        items = [self._create_item("Lamp {}".format(idx))
+                 for idx in range(4)]
+        records = self._run_search(self.search, title=u'lamp')
+        response = self.search._export(records, 'json')
+        msg = "Content-Type: {}".format(response['Content-Type'])
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson',
+                         msg)
+        lines = list(response.streaming_content)
+        data = [json.loads(line) for line in lines]
+        msg = "data: {}".format(data)
+        self.assertTrue(all([line.endswith('\n') for line in lines]), msg)
+        self.assertEqual([row['pk'] for row in data],
+                         [item.pk for item in items], msg)
+        self.assertEqual(data[0]['categories'], [], msg)
+        self.assertEqual(sorted(data[0]), sorted(ItemSearch._EXPORT_FIELDS),
+                         msg)
+
+    def test_filter_records(self):
+        #self.skipTest("Temporarily skipped")
+        records = Item.objects.all()
+        form = CleanedForm(text=u'', title=u'lamp')
+        msg = "Records should not be filtered without any text."
+        self.assertIs(self.search._filterRecords(records, form), records,
+                      msg)
+        search = DistributorSearch(log, 'businessSearch.html',
+                                   '/search/distributor/')
+        msg = "Only the item search filters on the text."
+        self.assertIs(search._filterRecords(records, CleanedForm(
+            text=u'lamp')), records, msg)
+
+    # InnoDB full text indexes do not see the rows of an open transaction.
+    @skipIf(connection.vendor == 'mysql', "Needs committed rows on MySQL.")
+    def test_filter_records_text(self):
+        #self.skipTest("Temporarily skipped")
+        lamp = self._create_item("Red Lamp", notes="Has a bright bulb.")
+        self._create_item("Red Widget")
+        self._create_item("Blue Lamp")
+        records = self._run_search(self.search, text=u'bulb', title=u'red')
+        pks = [record.pk for record in records]
+        msg = "pks: {}, expected: {}".format(pks, [lamp.pk])
+        self.assertEqual(pks, [lamp.pk], msg)
+        records = self._run_search(self.search, text=u'bulb', title=u'blue')
+        msg = "records: {}".format(records)
+        self.assertEqual(len(records), 0, msg)
@@ -0,0 +1,5 @@
+#
+# inventory/categories/__init__.py
+#
+
+default_app_config = 'inventory.categories.apps.CategoriesConfig'
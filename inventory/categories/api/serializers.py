@@ -12,7 +12,8 @@ from django.core.exceptions import ValidationError
 from rest_framework import serializers
 from rest_framework.exceptions import PermissionDenied
 
-from inventory.common.api.serializer_mixin import SerializerMixin
+from inventory.common.api.serializer_mixin import (
+    SerializerMixin, DynamicFieldsMixin)
 
 from ..models import Category
 
@@ -20,7 +21,8 @@ log = logging.getLogger('api.categories.serializers')
 User = get_user_model()
 
 
-class CategorySerializer(SerializerMixin, serializers.ModelSerializer):
+class CategorySerializer(DynamicFieldsMixin, SerializerMixin,
+                         serializers.ModelSerializer):
 
     owner = serializers.HyperlinkedRelatedField(
         view_name='user-detail', queryset=User.objects.all())
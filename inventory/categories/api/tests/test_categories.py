@@ -5,6 +5,10 @@
 # Run ./manage.py test -k # Keep the DB, don't rebuild.
 #
 
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
 from rest_framework.reverse import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -12,6 +16,13 @@ from rest_framework.test import APITestCase
 from inventory.common.api.tests.base_test import BaseTest
 from inventory.categories.models import Category
 
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-categories-api',
+        },
+    }
+
 
 class TestCategories(BaseTest):
 
@@ -473,6 +484,243 @@ class TestCategories(BaseTest):
         self.assertTrue("A root level category name " in data.get('name')[0],
                         msg)
 
+    def test_get_category_tree(self):
+        """
+        Test that the category tree of the user is listed.
+        """
+        #self.skipTest("Temporarily skipped")
+        cat0 = self._create_category(self.user, name="Test Category 1")
+        cat1 = self._create_category(self.user, name="Test Category 2",
+                                     parent=cat0)
+        cat2 = self._create_category(self.user, name="Test Category 3")
+        uri = reverse('category-tree-list')
+        response = self.client.get(uri, format='json')
+        data = response.data
+        msg = "Response: {} should be {}, content: {}".format(
+            response.status_code, status.HTTP_200_OK, self._clean_data(data))
+        self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
+        self.assertEqual(data.get('count'), 3, msg)
+        paths = [item.get('path') for item in data.get('results')]
+        self.assertEqual(paths, [cat0.path, cat1.path, cat2.path], msg)
+        # Only list the subtree of cat0.
+        response = self.client.get(uri, {'root': cat0.pk}, format='json')
+        data = response.data
+        msg = "Response: {} should be {}, content: {}".format(
+            response.status_code, status.HTTP_200_OK, self._clean_data(data))
+        self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
+        self.assertEqual(data.get('count'), 2, msg)
+        self.assertEqual(data.get('results')[1].get('parent'), cat0.pk, msg)
+        # An unknown root category.
+        response = self.client.get(uri, {'root': cat2.pk + 100},
+                                   format='json')
+        msg = "Response: {} should be {}, content: {}".format(
+            response.status_code, status.HTTP_404_NOT_FOUND,
+            self._clean_data(response.data))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, msg)
+
+    def test_get_category_autocomplete(self):
+        """
+        Test that categories are found by the start of the path or name.
+        """
+        #self.skipTest("Temporarily skipped")
+        cat0 = self._create_category(self.user, name="Test Category 1")
+        cat1 = self._create_category(self.user, name="Child Category 1",
+                                     parent=cat0)
+        cat2 = self._create_category(self.user, name="Test Category 2")
+        uri = reverse('category-autocomplete')
+        response = self.client.get(uri, {'q': 'test category'}, format='json')
+        data = response.data
+        msg = "Response: {} should be {}, content: {}".format(
+            response.status_code, status.HTTP_200_OK, self._clean_data(data))
+        self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
+        paths = [item.get('path') for item in data.get('results')]
+        self.assertEqual(paths, [cat0.path, cat1.path, cat2.path], msg)
+        # Match on the name of a child and limit the results.
+        response = self.client.get(uri, {'q': 'CHILD', 'limit': 1},
+                                   format='json')
+        data = response.data
+        msg = "Response: {} should be {}, content: {}".format(
+            response.status_code, status.HTTP_200_OK, self._clean_data(data))
+        self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
+        self.assertEqual(data.get('count'), 1, msg)
+        self.assertEqual(data.get('results')[0].get('id'), cat1.pk, msg)
+
+    def test_get_category_list_cursor(self):
+        """
+        Test that the category list can be paged with a cursor in path order
+        and without a count. A full access list is in primary key order,
+        since common paths tie across the owners.
+        """
+        #self.skipTest("Temporarily skipped")
+        names = ["Test Category {:02}".format(num) for num in range(12)]
+        user, client = self._create_normal_user('Normal_User', '123456')
+
+        for name in reversed(names):
+            self._create_category(self.user, name=name)
+            self._create_category(user, name=name)
+
+        paths = self._get_cursor_paths(client)
+        msg = "Paths: {}".format(paths)
+        self.assertEqual(paths, names, msg)
+        paths = self._get_cursor_paths(self.client)
+        msg = "Paths: {}".format(paths)
+        self.assertEqual(paths, [name for name in reversed(names)
+                                 for num in range(2)], msg)
+
+    def _get_cursor_paths(self, client):
+        uri = reverse('category-list')
+        params = {'pagination': 'cursor', 'page_size': 5}
+        paths = []
+
+        while uri:
+            response = client.get(uri, params, format='json')
+            data = response.data
+            msg = "Response: {} should be {}, content: {}".format(
+                response.status_code, status.HTTP_200_OK,
+                self._clean_data(data))
+            self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
+            self.assertFalse('count' in data, msg)
+            paths += [item.get('path') for item in data.get('results')]
+            # The next link already has all the query parameters.
+            uri, params = data.get('next'), None
+
+        return paths
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_get_category_list_approximate_count(self):
+        """
+        Test that an approximate count is cached and flagged as approximate.
+        """
+        #self.skipTest("Temporarily skipped")
+        self._create_category(self.user, name="Test Category 1")
+        uri = reverse('category-list')
+        response = self.client.get(uri, {'count': 'approximate'},
+                                   format='json')
+        data = response.data
+        msg = "Response: {} should be {}, content: {}".format(
+            response.status_code, status.HTTP_200_OK, self._clean_data(data))
+        self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
+        self.assertEqual(data.get('count'), 1, msg)
+        self.assertFalse(data.get('approximate'), msg)
+        # The cached count does not see the new category.
+        self._create_category(self.user, name="Test Category 2")
+        response = self.client.get(uri, {'count': 'approximate'},
+                                   format='json')
+        data = response.data
+        msg = "Response: {} should be {}, content: {}".format(
+            response.status_code, status.HTTP_200_OK, self._clean_data(data))
+        self.assertEqual(data.get('count'), 1, msg)
+        self.assertTrue(data.get('approximate'), msg)
+        # An exact count is still the default.
+        response = self.client.get(uri, format='json')
+        data = response.data
+        msg = "Response: {} should be {}, content: {}".format(
+            response.status_code, status.HTTP_200_OK, self._clean_data(data))
+        self.assertEqual(data.get('count'), 2, msg)
+        self.assertFalse('approximate' in data, msg)
+
+    def test_get_category_list_sparse_fields(self):
+        """
+        Test that only the asked for fields are returned and selected.
+        """
+        #self.skipTest("Temporarily skipped")
+        cat0 = self._create_category(self.user, name="Test Category 1")
+        self._create_category(self.user, name="Test Category 2", parent=cat0)
+        uri = reverse('category-list')
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(uri, {'fields': 'id,path,level'},
+                                       format='json')
+
+        data = response.data
+        msg = "Response: {} should be {}, content: {}".format(
+            response.status_code, status.HTTP_200_OK, self._clean_data(data))
+        self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
+        self.assertEqual(data.get('count'), 2, msg)
+
+        for item in data.get('results'):
+            self.assertEqual(sorted(item), ['id', 'level', 'path'], msg)
+
+        # The name column is not selected.
+        sql = [query['sql'] for query in ctx.captured_queries
+               if Category._meta.db_table in query['sql']][-1]
+        msg = "SQL: {}".format(sql)
+        self.assertFalse(connection.ops.quote_name('name') in sql, msg)
+        # Exclude fields.
+        response = self.client.get(uri, {'exclude': 'uri,owner'},
+                                   format='json')
+        data = response.data
+        msg = "Response: {} should be {}, content: {}".format(
+            response.status_code, status.HTTP_200_OK, self._clean_data(data))
+        self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
+        item = data.get('results')[0]
+        self.assertFalse('uri' in item or 'owner' in item, msg)
+        self.assertTrue('path' in item, msg)
+
+    def test_get_category_conditional(self):
+        """
+        Test that unchanged lists and details are answered with 304.
+        """
+        #self.skipTest("Temporarily skipped")
+        cat0 = self._create_category(self.user, name="Test Category 1")
+        uri = reverse('category-list')
+        response = self.client.get(uri, format='json')
+        etag = response.get('ETag')
+        msg = "Response: {} should be {}, ETag: {}".format(
+            response.status_code, status.HTTP_200_OK, etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
+        self.assertTrue(etag, msg)
+        # Unchanged list
+        response = self.client.get(uri, format='json',
+                                   HTTP_IF_NONE_MATCH=etag)
+        msg = "Response: {} should be {}".format(
+            response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.status_code,
+                         status.HTTP_304_NOT_MODIFIED, msg)
+        self.assertEqual(response.get('ETag'), etag, msg)
+        # A new category changes the list.
+        self._create_category(self.user, name="Test Category 2", parent=cat0)
+        response = self.client.get(uri, format='json',
+                                   HTTP_IF_NONE_MATCH=etag)
+        msg = "Response: {} should be {}".format(
+            response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
+        self.assertNotEqual(response.get('ETag'), etag, msg)
+        # Unchanged detail
+        uri = reverse('category-detail', kwargs={'pk': cat0.pk})
+        response = self.client.get(uri, format='json')
+        last_modified = response.get('Last-Modified')
+        msg = "Response: {} should be {}, Last-Modified: {}".format(
+            response.status_code, status.HTTP_200_OK, last_modified)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
+        self.assertTrue(last_modified, msg)
+        response = self.client.get(uri, format='json',
+                                   HTTP_IF_MODIFIED_SINCE=last_modified)
+        msg = "Response: {} should be {}".format(
+            response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.status_code,
+                         status.HTTP_304_NOT_MODIFIED, msg)
+
+    def test_category_list_query_budget(self):
+        """
+        Test that the category list runs the same number of queries for any
+        number of categories.
+        """
+        #self.skipTest("Temporarily skipped")
+        cat0 = self._create_category(self.user, name="Test Category 0")
+        uri = reverse('category-list')
+        count, data = self._assert_query_budget(self.client, uri, 6)
+
+        for num in range(1, 5):
+            self._create_category(self.user, name="Child Category {}".format(
+                num), parent=cat0)
+
+        new_count, data = self._assert_query_budget(self.client, uri, 6)
+        msg = "Queries: {} should be {}, content: {}".format(
+            new_count, count, self._clean_data(data))
+        self.assertEqual(data.get('count'), 5, msg)
+        self.assertEqual(new_count, count, msg)
+
     def _create_category(self, user, name=None, parent=None):
         if not name:
             name = 'TestCategory-00'
@@ -13,4 +13,8 @@ urlpatterns = [
         name="category-list"),
     url(r'category/(?P<pk>\d+)/$', views.category_detail,
         name="category-detail"),
+    url(r'categories/tree/$', views.category_tree_list,
+        name="category-tree-list"),
+    url(r'categories/autocomplete/$', views.category_autocomplete,
+        name="category-autocomplete"),
     ]
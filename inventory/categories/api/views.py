@@ -5,13 +5,19 @@
 
 import logging
 
+from collections import OrderedDict
+
 from django.contrib.auth import get_user_model
+from django.conf import settings
 from django.utils.translation import ugettext_lazy as _
 
 from rest_framework.generics import (
     ListCreateAPIView, RetrieveUpdateDestroyAPIView)
-from rest_framework.exceptions import PermissionDenied, NotAuthenticated
+from rest_framework.exceptions import (
+    PermissionDenied, NotAuthenticated, NotFound)
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework import serializers
 
 from rest_condition import ConditionalPermission, C, And, Or, Not
@@ -22,9 +28,11 @@ from inventory.common.api.permissions import (
     IsAdminSuperUser, IsAdministrator, IsProjectManager, IsAnyUser)
 from inventory.common.api.pagination import SmallResultsSetPagination
 from inventory.common.api.view_mixins import (
-    TrapDjangoValidationErrorCreateMixin, TrapDjangoValidationErrorUpdateMixin)
+    TrapDjangoValidationErrorCreateMixin, TrapDjangoValidationErrorUpdateMixin,
+    RelatedQuerysetMixin, ConditionalGetMixin)
 
 from ..models import Category
+from ..cache import CategoryTreeCache
 
 from .serializers import CategorySerializer
 
@@ -43,8 +51,6 @@ class CategoryAuthorizationMixin(object):
                 self.request.user.role == User.ADMINISTRATOR)
 
     def get_queryset(self):
-        result = []
-
         if self.has_full_access():
             result = Category.objects.all()
         else:
@@ -52,11 +58,12 @@ class CategoryAuthorizationMixin(object):
 
         return result
 
-class CategoryList(CategoryAuthorizationMixin,
-                   TrapDjangoValidationErrorCreateMixin,
-                   ListCreateAPIView):
+class CategoryList(RelatedQuerysetMixin, ConditionalGetMixin,
+                   CategoryAuthorizationMixin,
+                   TrapDjangoValidationErrorCreateMixin, ListCreateAPIView):
     """
-    Category list endpoint.
+    Category list endpoint. The full records are read from the database,
+    the category tree endpoint lists the paths from the cached tree.
     """
     serializer_class = CategorySerializer
     permission_classes = (
@@ -65,10 +72,25 @@ class CategoryList(CategoryAuthorizationMixin,
         )
     pagination_class = SmallResultsSetPagination
 
+    @property
+    def cursor_ordering(self):
+        """
+        The cursor is keyed on the first field alone. The paths of one owner
+        only tie past the length of path_lower, but common paths like 'Arts'
+        tie across all the owners, so a full access list is keyed on the
+        unique primary key instead.
+        """
+        if self.has_full_access():
+            result = ('id',)
+        else:
+            result = ('path_lower', 'id',)
+
+        return result
+
 category_list = CategoryList.as_view()
 
 
-class CategoryDetail(CategoryAuthorizationMixin,
+class CategoryDetail(ConditionalGetMixin, CategoryAuthorizationMixin,
                      TrapDjangoValidationErrorUpdateMixin,
                      RetrieveUpdateDestroyAPIView):
     """
@@ -82,3 +104,94 @@ class CategoryDetail(CategoryAuthorizationMixin,
     serializer_class = CategorySerializer
 
 category_detail = CategoryDetail.as_view()
+
+
+class CategoryTreeList(APIView):
+    """
+    Category tree endpoint. Lists the categories of the requesting user from
+    the cached category tree without querying the categories.
+
+    ## Keywords:
+      * root `int` (optional)
+        * Only list this category and its descendants.
+    """
+    permission_classes = (
+        Or(IsAnyUser),
+        And(Or(TokenHasReadWriteScope, IsAuthenticated,),),
+        )
+
+    def get(self, request, format=None):
+        tree = CategoryTreeCache.get_tree(request.user)
+        root = request.query_params.get('root')
+
+        if root is None:
+            ids = tree.ids
+        elif root.isdigit() and int(root) in tree:
+            ids = tree.get_descendant_ids(int(root), with_root=True)
+        else:
+            raise NotFound(detail=_("Invalid root category: {}").format(root))
+
+        results = []
+
+        for pk in ids:
+            path = tree.get_path(pk)
+            item = OrderedDict()
+            item['id'] = pk
+            item['parent'] = tree.get_parent_id(pk)
+            item['path'] = path
+            item['level'] = path.count(Category.DEFAULT_SEPARATOR)
+            results.append(item)
+
+        buff = OrderedDict()
+        buff['count'] = len(results)
+        buff['results'] = results
+        return Response(buff)
+
+category_tree_list = CategoryTreeList.as_view()
+
+
+class CategoryAutocomplete(APIView):
+    """
+    Category autocomplete endpoint. Lists the categories of the requesting
+    user where the path or the name starts with the query, the case is
+    ignored.
+
+    ## Keywords:
+      * q `str`
+        * The start of a category path or name.
+      * limit `int` (optional)
+        * The number of categories to return, defaults to
+          CATEGORY_AUTOCOMPLETE_LIMIT.
+    """
+    permission_classes = (
+        Or(IsAnyUser),
+        And(Or(TokenHasReadWriteScope, IsAuthenticated,),),
+        )
+
+    def get(self, request, format=None):
+        query = request.query_params.get('q', '').strip()
+        limit = request.query_params.get('limit', '')
+
+        if limit.isdigit() and int(limit) > 0:
+            limit = min(int(limit), settings.CATEGORY_AUTOCOMPLETE_MAX_LIMIT)
+        else:
+            limit = settings.CATEGORY_AUTOCOMPLETE_LIMIT
+
+        results = []
+
+        if query:
+            for category in Category.objects.autocomplete(
+                query, request.user, limit):
+                item = OrderedDict()
+                item['id'] = category.pk
+                item['name'] = category.name
+                item['path'] = category.path
+                item['level'] = category.level
+                results.append(item)
+
+        buff = OrderedDict()
+        buff['count'] = len(results)
+        buff['results'] = results
+        return Response(buff)
+
+category_autocomplete = CategoryAutocomplete.as_view()
@@ -0,0 +1,21 @@
+#
+# inventory/categories/apps.py
+#
+
+from django.apps import AppConfig
+from django.db.models.signals import post_save, post_delete
+from django.utils.translation import ugettext_lazy as _
+
+
+class CategoriesConfig(AppConfig):
+    name = 'inventory.categories'
+    label = 'categories'
+    verbose_name = _("Categories")
+
+    def ready(self):
+        from .cache import invalidate_category_tree
+        Category = self.get_model('Category')
+        post_save.connect(invalidate_category_tree, sender=Category,
+                          dispatch_uid='category_tree_post_save')
+        post_delete.connect(invalidate_category_tree, sender=Category,
+                            dispatch_uid='category_tree_post_delete')
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+#
+# inventory/categories/cache.py
+#
+
+import bisect
+import logging
+
+from django.core.cache import cache
+from django.conf import settings
+
+log = logging.getLogger('inventory.categories.cache')
+
+
+class CategoryTree(object):
+    """
+    A snapshot of all the categories of one owner. The tree is held in three
+    parallel lists ordered by path, where 'parents' holds the list index of
+    the parent of each category or -1 for a root category.
+    """
+
+    def __init__(self, ids, parents, paths):
+        self.ids = ids
+        self.parents = parents
+        self.paths = paths
+        self._index = dict([(pk, idx) for idx, pk in enumerate(ids)])
+        self._lower = None
+
+    @classmethod
+    def build(cls, owner_id):
+        """
+        Build the tree of the owner with one query.
+        """
+        from .models import Category
+
+        rows = list(Category.objects.filter(owner_id=owner_id).order_by(
+            'path').values_list('pk', 'parent_id', 'path'))
+        index = dict([(row[0], idx) for idx, row in enumerate(rows)])
+        ids = [pk for pk, parent_id, path in rows]
+        parents = [index.get(parent_id, -1) for pk, parent_id, path in rows]
+        paths = [path for pk, parent_id, path in rows]
+        return cls(ids, parents, paths)
+
+    def to_dict(self):
+        return {'ids': self.ids, 'parents': self.parents, 'paths': self.paths}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, pk):
+        return pk in self._index
+
+    def get_path(self, pk):
+        idx = self._index.get(pk)
+        return None if idx is None else self.paths[idx]
+
+    def get_parent_id(self, pk):
+        idx = self._index.get(pk)
+        if idx is None or self.parents[idx] < 0: return None
+        return self.ids[self.parents[idx]]
+
+    def get_ancestor_ids(self, pk):
+        """
+        Return the primary keys of the parents of 'pk' in root first order.
+        """
+        result = []
+        idx = self._index.get(pk)
+
+        if idx is not None:
+            idx = self.parents[idx]
+
+            while idx >= 0:
+                result.append(self.ids[idx])
+                idx = self.parents[idx]
+
+        result.reverse()
+        return result
+
+    def is_ancestor(self, ancestor_id, pk):
+        return ancestor_id in self.get_ancestor_ids(pk)
+
+    def get_descendant_ids(self, pk, with_root=False):
+        """
+        Return the primary keys of all the descendants of 'pk' in path order.
+        """
+        result = []
+        path = self.get_path(pk)
+
+        if path is not None:
+            from .models import Category
+
+            if with_root: result.append(pk)
+            prefix = path + Category.DEFAULT_SEPARATOR
+            result += [self.ids[idx] for lower, idx in self._match(prefix)]
+
+        return result
+
+    def autocomplete(self, prefix, limit=None):
+        """
+        Return a list of (pk, path) tuples where the path starts with
+        'prefix', the case of both is ignored.
+        """
+        items = self._match(prefix)
+        if limit is not None: items = items[:limit]
+        return [(self.ids[idx], self.paths[idx]) for lower, idx in items]
+
+    def _match(self, prefix):
+        if self._lower is None:
+            self._lower = sorted([(path.lower(), idx)
+                                  for idx, path in enumerate(self.paths)])
+
+        prefix = prefix.lower()
+        start = bisect.bisect_left(self._lower, (prefix,))
+        end = start
+
+        while end < len(self._lower) and self._lower[end][0].startswith(
+            prefix):
+            end += 1
+
+        return self._lower[start:end]
+
+
+class CategoryTreeCache(object):
+    """
+    Keeps a CategoryTree per owner in the default cache. The trees are
+    invalidated whenever a category of the owner is saved or deleted.
+    """
+    TREE_KEY = 'categories:tree:{}'
+    STATS_KEY = 'categories:tree:stats:{}'
+
+    @classmethod
+    def get_tree(self, owner):
+        """
+        Get the CategoryTree for the owner object or owner primary key.
+        """
+        owner_id = getattr(owner, 'pk', owner)
+        key = self.TREE_KEY.format(owner_id)
+        data = cache.get(key)
+
+        if data is None:
+            self._count('misses')
+            tree = CategoryTree.build(owner_id)
+            cache.set(key, tree.to_dict(),
+                      settings.CATEGORY_TREE_CACHE_TIMEOUT)
+        else:
+            self._count('hits')
+            tree = CategoryTree(**data)
+
+        return tree
+
+    @classmethod
+    def invalidate(self, owner):
+        owner_id = getattr(owner, 'pk', owner)
+        cache.delete(self.TREE_KEY.format(owner_id))
+        log.debug("Invalidated category tree for owner: %s", owner_id)
+
+    @classmethod
+    def get_stats(self):
+        """
+        Return the hits and misses of all processes since the last reset.
+        """
+        names = ('hits', 'misses',)
+        values = cache.get_many([self.STATS_KEY.format(name)
+                                 for name in names])
+        return dict([(name, values.get(self.STATS_KEY.format(name), 0))
+                     for name in names])
+
+    @classmethod
+    def reset_stats(self):
+        cache.delete_many([self.STATS_KEY.format(name)
+                           for name in ('hits', 'misses',)])
+
+    @classmethod
+    def _count(self, name):
+        key = self.STATS_KEY.format(name)
+
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, timeout=None)
+
+
+def invalidate_category_tree(sender, instance, **kwargs):
+    """
+    Receiver for the post_save and post_delete signals of Category.
+    """
+    CategoryTreeCache.invalidate(instance.owner_id)
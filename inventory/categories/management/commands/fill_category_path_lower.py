@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+#
+# inventory/categories/management/commands/fill_category_path_lower.py
+#
+# Run once after the path_lower column is added to an existing database.
+#
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.categories.models import Category
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ("Fill the lowercase path of the categories used by the "
+            "autocomplete and the list ordering from their paths.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--owner', default=None, dest='owner',
+            help="Only fill the categories of the owner with this username.")
+
+    def handle(self, *args, **options):
+        owner = options.get('owner')
+
+        if owner is not None:
+            try:
+                owner = User.objects.get(username=owner)
+            except User.DoesNotExist:
+                raise CommandError("Invalid owner: {}".format(owner))
+
+        count = Category.objects.fill_path_lower(owner=owner)
+        self.stdout.write("Filled the lowercase path of {} categories."
+                          .format(count))
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+#
+# inventory/categories/management/commands/rebuild_category_closure.py
+#
+# Run once after the closure table is added to an existing database, or to
+# repair the closure rows from the parent references.
+#
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.categories.models import CategoryClosure
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ("Rebuild the category closure rows used to find the ancestors "
+            "and descendants of categories from their parents.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--owner', default=None, dest='owner',
+            help="Only rebuild the categories of the owner with this "
+            "username.")
+
+    def handle(self, *args, **options):
+        owner = options.get('owner')
+
+        if owner is not None:
+            try:
+                owner = User.objects.get(username=owner)
+            except User.DoesNotExist:
+                raise CommandError("Invalid owner: {}".format(owner))
+
+        count = CategoryClosure.objects.rebuild(owner=owner)
+        self.stdout.write("Rebuilt the closure rows of {} categories."
+                          .format(count))
@@ -6,19 +6,27 @@
 import logging
 
 from collections import OrderedDict
+from datetime import datetime
+from dateutil.tz import tzutc
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Lower, Substr
 from django.core.exceptions import ValidationError
 from django.utils.translation import ugettext, ugettext_lazy as _
 from django.conf import settings
 
+from inventory.common.cache import ModelStamp
 from inventory.common.model_mixins import (
     UserModelMixin, TimeModelMixin, ValidateOnSaveMixin,)
 
+from .cache import CategoryTreeCache
+
 log = logging.getLogger('inventory.categories.models')
 
 
 class CategoryManager(models.Manager):
+    BATCH_SIZE = 500
 
     def create_category_tree(self, category_list, user, owner):
         """
@@ -62,6 +70,127 @@ class CategoryManager(models.Manager):
 
         return node_list
 
+    def create_category_trees(self, path_list, user, owner):
+        """
+        Gets and/or creates the categories in each delimited path in
+        'path_list' (ex. 'Arts>Music>Local'), creating parent categories as
+        necessary. Shared parents are only processed once, existing categories
+        are found with one query per level and the missing categories are
+        created with bulk_create. Returns an OrderedDict of each category
+        path in the trees to its object.
+
+        raise ValueError If a category name is empty, too long or is used more
+                         than once in the same path.
+        """
+        delimiter = self.model.DEFAULT_SEPARATOR
+        max_length = self.model._meta.get_field('name').max_length
+        levels = []
+
+        for path in path_list:
+            names = tuple([name.strip() for name in path.split(delimiter)])
+
+            if (not all(names) or len(set(names)) != len(names) or
+                any([len(name) > max_length for name in names])):
+                msg = _("Invalid category path [{}], names must not be "
+                        "empty, longer than {} characters or repeated."
+                        ).format(path, max_length)
+                log.error(ugettext(msg))
+                raise ValueError(msg)
+
+            for level in range(len(names)):
+                if len(levels) <= level: levels.append(OrderedDict())
+                levels[level][names[:level + 1]] = None
+
+        nodes = OrderedDict()
+
+        with transaction.atomic():
+            for level, keys in enumerate(levels):
+                # The names are compared without case like the collation of
+                # the unique index does, so 'foo' finds an existing 'Foo'.
+                pairs = OrderedDict()
+
+                for key in keys:
+                    parent_id = nodes[key[:-1]].pk if level else None
+                    pairs.setdefault((parent_id, key[-1].lower()), []).append(
+                        key)
+
+                found = self._find_tree_nodes(owner, level, [
+                    (parent_id, keys[0][-1])
+                    for (parent_id, name), keys in pairs.items()])
+                missing = [pair for pair in pairs if pair not in found]
+
+                if missing:
+                    now = datetime.now(tzutc())
+                    new_nodes = []
+
+                    for pair in missing:
+                        key = pairs[pair][0]
+                        node = self.model(
+                            owner=owner, parent_id=pair[0], name=key[-1],
+                            level=level, creator=user, updater=user,
+                            created=now, updated=now,
+                            path=delimiter.join(key))
+                        node.path_lower = node.get_path_lower()
+                        new_nodes.append(node)
+
+                    self.bulk_create(new_nodes, batch_size=self.BATCH_SIZE)
+                    found.update(self._find_tree_nodes(owner, level, [
+                        (pair[0], pairs[pair][0][-1]) for pair in missing]))
+
+                for pair, same_keys in pairs.items():
+                    for key in same_keys:
+                        nodes[key] = found[pair]
+
+                # The ancestors of a new category are the categories of the
+                # shorter paths, which have all been found already.
+                links = []
+
+                for pair in missing:
+                    key = pairs[pair][0]
+
+                    for depth in range(level + 1):
+                        links.append(CategoryClosure(
+                            ancestor_id=nodes[key[:len(key) - depth]].pk,
+                            descendant_id=nodes[key].pk, depth=depth))
+
+                CategoryClosure.objects.bulk_create(
+                    links, batch_size=self.BATCH_SIZE)
+
+        # The bulk inserts do not send the post_save signal.
+        CategoryTreeCache.invalidate(owner)
+        ModelStamp.touch(self.model)
+
+        return OrderedDict([(delimiter.join(key), node)
+                            for key, node in nodes.items()])
+
+    def _find_tree_nodes(self, owner, level, pairs):
+        """
+        Find the categories at 'level' matching the (parent_id, name) pairs.
+        The lookup uses the (owner, parent, name) unique index and the found
+        categories are keyed by (parent_id, lower case name).
+        """
+        found = {}
+        pairs = list(pairs)
+
+        for idx in range(0, len(pairs), self.BATCH_SIZE):
+            chunk = pairs[idx:idx + self.BATCH_SIZE]
+            wanted = set([(parent_id, name.lower())
+                          for parent_id, name in chunk])
+            query = self.filter(owner=owner, level=level, name__in=set(
+                [name for parent_id, name in chunk]))
+
+            if level:
+                query = query.filter(parent_id__in=set(
+                    [parent_id for parent_id, name in chunk]))
+            else:
+                query = query.filter(parent__isnull=True)
+
+            for node in query.order_by('pk'):
+                pair = (node.parent_id, node.name.lower())
+                if pair in wanted: found.setdefault(pair, node)
+
+        return found
+
     def delete_category_tree(self, node_list, owner):
         """
         Deletes the category tree back to the beginning, but will stop if there
@@ -70,9 +199,13 @@ class CategoryManager(models.Manager):
         should be the unaltered result of the create_category_tree method or
         its equivalent. A list of strings is returned representing the deleted
         nodes.
+
+        The children of all the nodes are counted with one query and the
+        deletable nodes are removed in batches inside a transaction.
         """
         node_list.reverse()
         deleted_nodes = []
+        ids = []
 
         for node in node_list:
             if node.owner != owner:
@@ -82,17 +215,102 @@ class CategoryManager(models.Manager):
                 log.error(ugettext(msg))
                 raise ValueError(msg)
 
+        # The default ordering must be cleared or it is added to the GROUP BY.
+        counts = dict(self.filter(
+            parent_id__in=[node.pk for node in node_list]).order_by(
+            ).values_list('parent_id').annotate(count=models.Count('pk')))
+        child = None
+
         for node in node_list:
-            if node.children.count() > 0: break
+            count = counts.get(node.pk, 0)
+
+            # The node deleted just before this one may be its only child.
+            if child is not None and child.parent_id == node.pk:
+                count -= 1
+
+            if count > 0: break
             deleted_nodes.append(node.path)
-            node.delete()
+            ids.append(node.pk)
+            child = node
+
+        with transaction.atomic():
+            for idx in range(0, len(ids), self.BATCH_SIZE):
+                self.filter(pk__in=ids[idx:idx + self.BATCH_SIZE]).delete()
 
         return deleted_nodes
 
     def get_parents(self, category, owner):
         """
-        Get all the parents to this category object.
+        Get all the parents to this category object. The parents are found
+        with a single query on the closure table and are returned in root
+        first order.
+        """
+        self._check_owner(category, owner)
+        return list(self.filter(
+            descendant_links__descendant=category,
+            descendant_links__depth__gt=0).order_by(
+            '-descendant_links__depth'))
+
+    def get_descendants(self, category, owner, with_root=False):
+        """
+        Get all the descendants of this category object regardless of the
+        depth of the tree. A queryset ordered by path is returned.
+        """
+        self._check_owner(category, owner)
+        depth = 0 if with_root else 1
+        return self.filter(ancestor_links__ancestor=category,
+                           ancestor_links__depth__gte=depth)
+
+    def autocomplete(self, prefix, owner, limit):
+        """
+        Return up to 'limit' categories of 'owner' where either the path or
+        the name starts with 'prefix', the case is ignored. The path is
+        matched as a range on the indexed (owner, path_lower) columns and the
+        name on the (owner, name) index, so a lookup only reads the matching
+        index entries.
+        """
+        prefix = prefix.lower()
+        query = self.filter(owner=owner)
+        short_prefix = prefix[:self.model.PATH_LOWER_LENGTH]
+        paths = query.filter(path_lower__gte=short_prefix,
+                             path_lower__lt=short_prefix + u'\uffff')
+
+        # Only paths longer than the indexed column need the full compare.
+        if len(prefix) > len(short_prefix):
+            paths = paths.filter(path__istartswith=prefix)
+
+        names = query.filter(name__istartswith=prefix)
+        found = OrderedDict()
+
+        for node in list(paths.order_by('path_lower')[:limit]) + list(
+            names.order_by('path_lower')[:limit]):
+            found.setdefault(node.pk, node)
+
+        return sorted(found.values(), key=lambda node: node.path_lower)[:limit]
+
+    def fill_path_lower(self, owner=None):
+        """
+        Set the 'path_lower' column from the path of all the categories or
+        only the categories of 'owner'. This is needed to populate the column
+        for categories that existed before it did. The rows are updated in
+        batches by primary key and the number of rows updated is returned.
         """
+        categories = self.all()
+        if owner is not None: categories = categories.filter(owner=owner)
+        path_lower = Substr(Lower('path'), 1, self.model.PATH_LOWER_LENGTH)
+        last = 0
+        count = 0
+
+        while True:
+            pks = list(categories.filter(pk__gt=last).order_by(
+                'pk').values_list('pk', flat=True)[:self.BATCH_SIZE])
+            if not pks: break
+            count += self.filter(pk__in=pks).update(path_lower=path_lower)
+            last = pks[-1]
+
+        return count
+
+    def _check_owner(self, category, owner):
         if category.owner != owner:
             msg = _("Trying to access a category with an invalid owner, "
                     "updater: {}, updated: {}, owner: {}, non-owner: {}"
@@ -101,18 +319,26 @@ class CategoryManager(models.Manager):
             log.error(ugettext(msg))
             raise ValueError(msg)
 
-        parents = self._recurse_parents(category)
-        parents.reverse()
-        return parents
-
-    def _recurse_parents(self, category):
-        parents = []
-
-        if category.parent_id:
-            parents.append(category.parent)
-            parents.extend(self._recurse_parents(category.parent))
-
-        return parents
+    def update_subtree_paths(self, category, old_path, old_level):
+        """
+        Rewrite the path and level of all the descendants of 'category' after
+        it has been renamed or moved. The old path prefix is replaced with the
+        new one in a single UPDATE. The number of rows changed is returned.
+        """
+        path = Concat(Value(category.path), Substr('path', len(old_path) + 1),
+                      output_field=models.CharField())
+        count = self.filter(
+            ancestor_links__ancestor=category,
+            ancestor_links__depth__gt=0).update(
+            path=path,
+            path_lower=Substr(Lower(path), 1, self.model.PATH_LOWER_LENGTH),
+            level=F('level') + (category.level - old_level),
+            updated=datetime.now(tzutc()))
+        log.debug("Category: %s, old path: %s, descendants updated: %s",
+                  category, old_path, count)
+        CategoryTreeCache.invalidate(category.owner_id)
+        ModelStamp.touch(self.model)
+        return count
 
     def get_child_tree_from_list(self, category_list, with_root=True):
         """
@@ -122,30 +348,23 @@ class CategoryManager(models.Manager):
         this function will return the [['Arts', 'Arts>Music',
         'Arts>Music>Local', ...], ['Color', 'Red', 'Green', 'Blue', ...]]
         objects. Duplicates will be removed.
+
+        All the trees are found with a single query on the closure table and
+        are ordered by path in the database.
         """
-        tree = []
-        final = OrderedDict()
+        trees = OrderedDict()
 
         for cat in category_list:
-            iterator = cat.children.iterator()
-            item = []
+            trees.setdefault(cat.pk, [])
 
-            if with_root:
-                item.append(cat)
+        links = CategoryClosure.objects.select_related('descendant').filter(
+            ancestor_id__in=list(trees), depth__gte=0 if with_root else 1
+            ).order_by('descendant__path')
 
-            try:
-                while True:
-                    item.append(iterator.next())
-            except StopIteration:
-                pass
+        for link in links:
+            trees[link.ancestor_id].append(link.descendant)
 
-            tree.append(tuple(sorted(
-                item, cmp=lambda x,y: cmp(x.path.lower(), y.path.lower()))))
-
-        for item in tree:
-            final[hash(item)] = item
-
-        return final.values()
+        return [tuple(tree) for tree in trees.values()]
 
     def get_all_root_trees(self, name, owner):
         """
@@ -154,17 +373,23 @@ class CategoryManager(models.Manager):
         <color>red>, <color>green>], [<light>, <light>red>]] Red is in both
         trees.
         """
-        result = []
-        records = self.filter(name=name, owner=owner)
+        trees = OrderedDict()
+        links = CategoryClosure.objects.select_related('ancestor').filter(
+            descendant__name=name, descendant__owner=owner).order_by(
+            'descendant__path', 'descendant_id', '-depth')
 
-        if len(records) > 0:
-            result[:] = [self.get_parents(record, owner) for record in records]
+        for link in links:
+            tree = trees.setdefault(link.descendant_id, [])
+            if link.depth: tree.append(link.ancestor)
 
-        return result
+        return list(trees.values())
 
 
 class Category(TimeModelMixin, UserModelMixin, ValidateOnSaveMixin):
     DEFAULT_SEPARATOR = '>'
+    # MySQL cannot index the full path, so only this many characters of the
+    # lowercase path are kept in the indexed column.
+    PATH_LOWER_LENGTH = 255
 
     owner = models.ForeignKey(
         settings.AUTH_USER_MODEL, verbose_name=_("Owner"),
@@ -177,15 +402,23 @@ class Category(TimeModelMixin, UserModelMixin, ValidateOnSaveMixin):
         verbose_name=_("Name"), max_length=248)
     path = models.CharField(
         verbose_name=_("Full Path"), max_length=1016, editable=False)
+    path_lower = models.CharField(
+        verbose_name=_("Lowercase Path"), max_length=PATH_LOWER_LENGTH,
+        editable=False)
     level = models.SmallIntegerField(
         verbose_name=_("Level"), editable=False)
 
     objects = CategoryManager()
 
     def clean(self):
-        self.path = self._get_category_path()
+        parents = self._get_parents()
+        self.path = self._get_category_path(parents=parents)
+        self.path_lower = self.get_path_lower()
         self.level = self.path.count(self.DEFAULT_SEPARATOR)
         delimiter = self.DEFAULT_SEPARATOR
+        # The names are compared without case like the collation of the
+        # unique index does.
+        names = [parent.name.lower() for parent in parents]
 
         # Check that the separator is not in the name.
         if delimiter in self.name:
@@ -195,40 +428,70 @@ class Category(TimeModelMixin, UserModelMixin, ValidateOnSaveMixin):
 
         if self.parent:
             # Check that this category is not a parent.
-            parents = Category.objects.get_parents(self.parent, self.owner)
-            parents.append(self.parent)
-
-            for parent in parents:
-                if parent.name == self.name:
-                    raise ValidationError(
-                        {'name': _("A category in this tree with name [{}] "
-                                   "already exists.").format(self.name)})
+            if self.name.lower() in names:
+                raise ValidationError(
+                    {'name': _("A category in this tree with name [{}] "
+                               "already exists.").format(self.name)})
+
+            # Check that this category is not being moved below itself.
+            if self.pk is not None and CategoryClosure.objects.filter(
+                ancestor_id=self.pk, descendant_id=self.parent_id).exists():
+                raise ValidationError(
+                    {'parent': _("A category cannot be moved below one of "
+                                 "its own children.")})
         # Check that a root level name does not already exist for this owner
         # on a create only.
         elif self.pk is None and Category.objects.filter(
-            name=self.name, owner=self.owner, level=0).count():
+            owner_id=self.owner_id, name__iexact=self.name,
+            level=0).exists():
             raise ValidationError(
                 {'name': _("A root level category name [{}] already exists."
                            ).format(self.name)})
 
-    def _get_category_path(self, current=True):
-        parents = Category.objects.get_parents(self, self.owner)
-        if current: parents.append(self)
-        return self.DEFAULT_SEPARATOR.join([parent.name for parent in parents])
+        # Check that a rename or move does not give any of the children the
+        # same name as one of their new parents.
+        if self.pk is not None and CategoryClosure.objects.annotate(
+            name_lower=Lower('descendant__name')).filter(
+            ancestor_id=self.pk, depth__gt=0,
+            name_lower__in=names + [self.name.lower()]).exists():
+            raise ValidationError(
+                {'name': _("A child of category [{}] has the same name as "
+                           "one of its parents.").format(self.name)})
+
+    def _get_parents(self):
+        """
+        The parents are always found through the parent object, the closure
+        rows of this category may not exist yet or be stale during a move.
+        """
+        parents = []
+
+        if self.parent_id:
+            parents = Category.objects.get_parents(self.parent, self.owner)
+            parents.append(self.parent)
+
+        return parents
+
+    def _get_category_path(self, current=True, parents=None):
+        if parents is None: parents = self._get_parents()
+        names = [parent.name for parent in parents]
+        if current: names.append(self.name)
+        return self.DEFAULT_SEPARATOR.join(names)
+
+    def get_path_lower(self):
+        return self.path.lower()[:self.PATH_LOWER_LENGTH]
 
     def get_children(self):
         """
-        Returns a list of Category objects that are children of this category.
+        Returns a tuple of the Category objects that are the direct children
+        of this category in path order.
         """
-        children = Category.objects.get_child_tree_from_list(
-            (self,), with_root=False)
-        return children[0]
+        return tuple(self.children.order_by('path'))
 
 
     def get_children_and_root(self):
         """
-        Return a list of Category objects that are children of this category
-        including this category.
+        Return a tuple of this category followed by all of its descendants
+        at any depth in path order.
         """
         children = Category.objects.get_child_tree_from_list((self,))
         return children[0]
@@ -242,23 +505,146 @@ class Category(TimeModelMixin, UserModelMixin, ValidateOnSaveMixin):
     _owner_producer.short_description = _("Category Owner")
 
     def save(self, *args, **kwargs):
-        super(Category, self).save(*args, **kwargs)
+        with transaction.atomic():
+            stored = []
+
+            if self.pk is not None:
+                stored[:] = Category.objects.filter(pk=self.pk).values_list(
+                    'parent_id', 'path', 'level')
+
+            super(Category, self).save(*args, **kwargs)
 
-        # Fix all children if any.
-        iterator = self.children.iterator()
+            if stored:
+                parent_id, path, level = stored[0]
 
-        try:
-            while True:
-                child = iterator.next()
-                child.save()
-        except StopIteration:
-            pass
+                # Keep the closure table in sync with the parent reference.
+                if parent_id != self.parent_id:
+                    CategoryClosure.objects.move_subtree(self)
+
+                # Fix all children if any.
+                if path != self.path:
+                    Category.objects.update_subtree_paths(self, path, level)
+            else:
+                CategoryClosure.objects.add_node(self)
 
     def __str__(self):
         return "{}".format(self.path)
 
     class Meta:
         unique_together = (('owner', 'parent', 'name',),)
+        index_together = (('owner', 'path_lower',), ('owner', 'name',),)
         verbose_name = _("Category")
         verbose_name_plural = _("Categories")
         ordering = ('path',)
+
+
+#
+# CategoryClosure
+#
+class CategoryClosureManager(models.Manager):
+    BATCH_SIZE = 500
+
+    def add_node(self, category):
+        """
+        Create the closure rows for a new category, one row referencing
+        itself plus one row for each of its ancestors.
+        """
+        links = [self.model(ancestor_id=category.pk,
+                            descendant_id=category.pk, depth=0)]
+
+        if category.parent_id:
+            ancestors = self.filter(
+                descendant_id=category.parent_id).values_list(
+                'ancestor_id', 'depth')
+            links += [self.model(ancestor_id=ancestor_id,
+                                 descendant_id=category.pk, depth=depth + 1)
+                      for ancestor_id, depth in ancestors]
+
+        self.bulk_create(links)
+
+    def move_subtree(self, category):
+        """
+        Relink the subtree rooted at 'category' to its current parent. The
+        rows joining the subtree to its old ancestors are removed then rows
+        joining it to the new ancestors are created. The subtree's internal
+        rows are left untouched.
+        """
+        subtree = list(self.filter(ancestor_id=category.pk).values_list(
+            'descendant_id', 'depth'))
+        subtree_ids = [pk for pk, depth in subtree]
+        old_ancestor_ids = list(self.filter(
+            descendant_id=category.pk, depth__gt=0).values_list(
+            'ancestor_id', flat=True))
+
+        if old_ancestor_ids:
+            for idx in range(0, len(subtree_ids), self.BATCH_SIZE):
+                self.filter(ancestor_id__in=old_ancestor_ids,
+                            descendant_id__in=subtree_ids[
+                                idx:idx + self.BATCH_SIZE]).delete()
+
+        if category.parent_id:
+            ancestors = self.filter(
+                descendant_id=category.parent_id).values_list(
+                'ancestor_id', 'depth')
+            self.bulk_create(
+                [self.model(ancestor_id=ancestor_id, descendant_id=pk,
+                            depth=ancestor_depth + depth + 1)
+                 for ancestor_id, ancestor_depth in ancestors
+                 for pk, depth in subtree], batch_size=self.BATCH_SIZE)
+
+    def rebuild(self, owner=None):
+        """
+        Rebuild the closure rows from the parent references of all the
+        categories or only the categories of 'owner'. This is needed to
+        populate the table for categories that existed before it did.
+        """
+        categories = Category.objects.all()
+        if owner is not None: categories = categories.filter(owner=owner)
+        chains = {}
+        links = []
+
+        with transaction.atomic():
+            self.filter(descendant__in=categories).delete()
+
+            for pk, parent_id in categories.order_by('level').values_list(
+                'pk', 'parent_id').iterator():
+                chains[pk] = chains.get(parent_id, []) + [pk]
+
+                for depth, ancestor_id in enumerate(reversed(chains[pk])):
+                    links.append(self.model(ancestor_id=ancestor_id,
+                                            descendant_id=pk, depth=depth))
+
+                if len(links) >= self.BATCH_SIZE:
+                    self.bulk_create(links)
+                    links[:] = []
+
+            self.bulk_create(links)
+
+        return len(chains)
+
+
+class CategoryClosure(models.Model):
+    """
+    Each row joins a category to one of its ancestors, including a row
+    joining a category to itself with a depth of 0, so that the ancestors
+    or descendants of a category can be found with a single query.
+    """
+    ancestor = models.ForeignKey(
+        Category, verbose_name=_("Ancestor"),
+        related_name='descendant_links')
+    descendant = models.ForeignKey(
+        Category, verbose_name=_("Descendant"),
+        related_name='ancestor_links')
+    depth = models.SmallIntegerField(
+        verbose_name=_("Depth"))
+
+    objects = CategoryClosureManager()
+
+    def __str__(self):
+        return "{} -> {} ({})".format(
+            self.ancestor_id, self.descendant_id, self.depth)
+
+    class Meta:
+        unique_together = (('ancestor', 'descendant',),)
+        verbose_name = _("Category Closure")
+        verbose_name_plural = _("Category Closures")
@@ -0,0 +1,5 @@
+#
+# inventory/common/__init__.py
+#
+
+default_app_config = 'inventory.common.apps.CommonConfig'
@@ -2,10 +2,171 @@
 # inventory/common/api/pagination.py
 #
 
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+import logging
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connections
+from django.db.models.sql.datastructures import EmptyResultSet
+from django.utils.functional import cached_property
+
+from rest_framework.pagination import PageNumberPagination, CursorPagination
+from rest_framework.response import Response
+
+log = logging.getLogger('inventory.common.api.pagination')
+
+
+class ApproximateCountPaginator(DjangoPaginator):
+    """
+    A paginator that avoids counting the full queryset. Unfiltered querysets
+    of large tables are counted from the table statistics and filtered
+    querysets are counted once and cached for a short time. The
+    'approximate' attribute tells if the count may be out of date.
+    """
+    COUNT_KEY = 'api:count:{}'
+    ESTIMATE_SQL = {
+        'mysql': ("SELECT table_rows FROM information_schema.tables "
+                  "WHERE table_schema = DATABASE() AND table_name = %s"),
+        'postgresql': "SELECT reltuples FROM pg_class WHERE relname = %s",
+        }
+
+    def __init__(self, *args, **kwargs):
+        super(ApproximateCountPaginator, self).__init__(*args, **kwargs)
+        self.approximate = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+
+        if not hasattr(queryset, 'query'):
+            return len(queryset)
+
+        if not queryset.query.where and not queryset.query.distinct:
+            estimate = self._estimate(queryset)
+
+            if (estimate is not None and
+                estimate >= settings.API_COUNT_ESTIMATE_THRESHOLD):
+                self.approximate = True
+                return estimate
+
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+
+        key = self.COUNT_KEY.format(hashlib.sha1(
+            repr((queryset.db, sql, params))).hexdigest())
+        count = cache.get(key)
+
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, settings.API_COUNT_CACHE_TIMEOUT)
+        else:
+            self.approximate = True
+
+        return count
+
+    def _estimate(self, queryset):
+        """
+        Return the number of rows in the table of the queryset from the
+        statistics of the database or None if there are none.
+        """
+        connection = connections[queryset.db]
+        sql = self.ESTIMATE_SQL.get(connection.vendor)
+        if not sql: return None
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+
+        return int(row[0]) if row and row[0] is not None else None
+
+
+class SmallCursorSetPagination(CursorPagination):
+    """
+    Keyset pagination, each page is found with an indexed range on the
+    ordering field instead of an OFFSET and no total count is done.
+    """
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = '-id'
 
 
 class SmallResultsSetPagination(PageNumberPagination):
+    """
+    Page number pagination that a client can switch to cursor pagination
+    with '?pagination=cursor'. The cursor is keyed on the 'cursor_ordering'
+    of the view, which defaults to the primary key. Only the first field of
+    the ordering is kept in the cursor, later fields just order the rows
+    that tie on it. Rows with the same first value are skipped with an
+    offset, so the first field should be unique or close to it.
+
+    With '?count=approximate' the count is estimated or cached instead of
+    counted on each request and the response has an 'approximate' flag.
+    """
     page_size = 25
     page_size_query_param = 'page_size'
     max_page_size = 200
+    pagination_query_param = 'pagination'
+    cursor_ordering = 'id'
+    count_query_param = 'count'
+    count_mode = 'exact'
+    _cursor = None
+    _approximate = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            self._cursor = SmallCursorSetPagination()
+            self._cursor.ordering = getattr(
+                view, 'cursor_ordering', self.cursor_ordering)
+            result = self._cursor.paginate_queryset(queryset, request, view)
+            self.display_page_controls = self._cursor.display_page_controls
+        else:
+            self._approximate = self.use_approximate_count(request)
+
+            if self._approximate:
+                self.django_paginator_class = ApproximateCountPaginator
+
+            result = super(SmallResultsSetPagination, self).paginate_queryset(
+                queryset, request, view=view)
+
+        return result
+
+    def get_paginated_response(self, data):
+        if self._cursor:
+            return self._cursor.get_paginated_response(data)
+
+        if self._approximate:
+            return Response(OrderedDict([
+                ('count', self.page.paginator.count),
+                ('approximate', self.page.paginator.approximate),
+                ('next', self.get_next_link()),
+                ('previous', self.get_previous_link()),
+                ('results', data)
+                ]))
+
+        return super(SmallResultsSetPagination, self).get_paginated_response(
+            data)
+
+    def to_html(self):
+        if self._cursor:
+            return self._cursor.to_html()
+
+        return super(SmallResultsSetPagination, self).to_html()
+
+    def use_cursor(self, request):
+        """
+        Cursor pagination is used when asked for or when following the
+        links of a cursor page.
+        """
+        params = request.query_params
+        return (params.get(self.pagination_query_param) == 'cursor' or
+                SmallCursorSetPagination.cursor_query_param in params)
+
+    def use_approximate_count(self, request):
+        return request.query_params.get(
+            self.count_query_param, self.count_mode) == 'approximate'
@@ -26,3 +26,30 @@ class SerializerMixin(object):
         return (request is not None and
                 (request.user.is_superuser or
                  request.user.role == User.ADMINISTRATOR))
+
+
+class DynamicFieldsMixin(object):
+    """
+    Lets a client ask for a sparse fieldset of a top level serializer with
+    '?fields=id,path' and '?exclude=uri' on GET requests. Must come before
+    the serializer class.
+    """
+    FIELDS_PARAM = 'fields'
+    EXCLUDE_PARAM = 'exclude'
+
+    def __init__(self, *args, **kwargs):
+        super(DynamicFieldsMixin, self).__init__(*args, **kwargs)
+        request = self.context.get('request', None)
+
+        if request is not None and request.method == 'GET':
+            params = getattr(request, 'query_params', request.GET)
+            fields = self._split_param(params.get(self.FIELDS_PARAM))
+            exclude = self._split_param(params.get(self.EXCLUDE_PARAM))
+
+            for name in list(self.fields):
+                if (fields and name not in fields) or name in exclude:
+                    self.fields.pop(name)
+
+    def _split_param(self, value):
+        return set([name.strip() for name in (value or '').split(',')
+                    if name.strip()])
@@ -11,8 +11,11 @@ import types
 from collections import OrderedDict
 
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils.translation import ugettext
 
+from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 from rest_framework.reverse import reverse
 
@@ -130,6 +133,24 @@ class BaseTest(APITestCase):
     def _create_grant(self, ):
         pass
 
+    def _assert_query_budget(self, client, uri, budget):
+        """
+        Get the list at 'uri' and assert that no more than 'budget' queries
+        were run, returns the number of queries and the response data.
+        """
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(uri, format='json')
+
+        msg = "Response: {} should be {}, content: {}".format(
+            response.status_code, status.HTTP_200_OK,
+            self._clean_data(response.data))
+        self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
+        count = len(ctx.captured_queries)
+        msg = "Queries: {} should be at most {}, SQL: {}".format(
+            count, budget, [query['sql'] for query in ctx.captured_queries])
+        self.assertTrue(count <= budget, msg)
+        return count, response.data
+
     def _clean_data(self, data):
         if data is not None:
             if isinstance(data, (list, tuple,)):
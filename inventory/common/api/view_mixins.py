@@ -3,11 +3,27 @@
 # inventory/common/api/view_mixins.py
 #
 
+import hashlib
 import logging
+import calendar
 
-from django.core.exceptions import ValidationError as DjangoValidationError
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import (
+    ValidationError as DjangoValidationError, FieldDoesNotExist)
+from django.db.models import Count, Max
+from django.db.models.sql.datastructures import EmptyResultSet
+from django.utils.http import (
+    quote_etag, parse_etags, http_date, parse_http_date_safe)
 
-from rest_framework import serializers
+from rest_framework import serializers, status
+from rest_framework.response import Response
+from rest_framework.relations import (
+    RelatedField, ManyRelatedField, HyperlinkedIdentityField)
+
+from inventory.common.cache import ModelStamp
+
+from .serializer_mixin import DynamicFieldsMixin
 
 log = logging.getLogger('api.common.view_mixin')
 
@@ -36,3 +52,288 @@ class TrapDjangoValidationErrorUpdateMixin(object):
             #log.debug("message_dict: %s", detail.message_dict)
             #log.debug("messages: %s", detail.messages)
             raise serializers.ValidationError(detail.message_dict)
+
+
+class RelatedQuerysetMixin(object):
+    """
+    Adds the select_related and prefetch_related that the relational fields
+    of the serializer need to the queryset, so listing does not query once
+    per row. When the client asked for a sparse fieldset the columns are
+    limited to the ones the remaining fields need with only(). Must come
+    before any mixin that defines get_queryset().
+    """
+    _related_names = {}
+
+    def get_queryset(self):
+        queryset = super(RelatedQuerysetMixin, self).get_queryset()
+
+        if hasattr(queryset, 'select_related'):
+            serializer = self.get_serializer()
+            select, prefetch, only = self.get_related_names(serializer)
+            if select: queryset = queryset.select_related(*select)
+            if prefetch: queryset = queryset.prefetch_related(*prefetch)
+            if only and self._is_sparse(): queryset = queryset.only(*only)
+
+        return queryset
+
+    def get_related_names(self, serializer):
+        """
+        Return the select_related, prefetch_related and only names of the
+        serializer. They are kept for each serializer class with all its
+        fields, sparse fieldsets are worked out on each request.
+        """
+        key = (serializer.__class__, tuple(serializer.fields))
+        names = self._related_names.get(key)
+
+        if names is None:
+            select, prefetch = set(), set()
+            self._find_related_names(serializer, '', False, select, prefetch)
+            only = self._find_only_names(serializer)
+            names = (sorted(select), sorted(prefetch),
+                     sorted(only) if only else None)
+
+            # Sparse fieldsets are chosen by the client so are not kept.
+            if not self._is_sparse(): self._related_names[key] = names
+
+            log.debug("Related names of %s: %s",
+                      serializer.__class__.__name__, names)
+
+        return names
+
+    def _is_sparse(self):
+        params = self.request.query_params
+        return (self.request.method == 'GET' and
+                (DynamicFieldsMixin.FIELDS_PARAM in params or
+                 DynamicFieldsMixin.EXCLUDE_PARAM in params))
+
+    def _find_only_names(self, serializer):
+        """
+        Return the model fields that the serializer fields are read from or
+        None if a field is not read from a model field.
+        """
+        model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+        if model is None: return None
+        names = set([model._meta.pk.name])
+
+        for field in serializer.fields.values():
+            if field.write_only: continue
+
+            if field.source == '*':
+                # The hyperlink to the object itself only needs the pk.
+                if isinstance(field, HyperlinkedIdentityField): continue
+                return None
+
+            related = self._get_model_field(model, field.source_attrs)
+            if related is None: return None
+
+            # Many to many and reverse relations have no column.
+            if related.concrete:
+                names.add(related.name)
+
+        return names
+
+    def _find_related_names(self, serializer, prefix, many, select, prefetch):
+        model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+
+        for field in serializer.fields.values():
+            if field.write_only or field.source == '*': continue
+            name = prefix + '__'.join(field.source_attrs)
+
+            if isinstance(field, ManyRelatedField):
+                prefetch.add(name)
+            elif isinstance(field, serializers.ListSerializer):
+                prefetch.add(name)
+                self._find_related_names(field.child, name + '__', True,
+                                         select, prefetch)
+            elif isinstance(field, serializers.BaseSerializer):
+                (prefetch if many else select).add(name)
+                self._find_related_names(field, name + '__', many,
+                                         select, prefetch)
+            elif isinstance(field, RelatedField):
+                related = self._get_model_field(model, field.source_attrs)
+
+                # Only a foreign key column can be rendered without its
+                # object, reverse one to one relations need a join.
+                if (related is not None and related.is_relation and not (
+                    field.use_pk_only_optimization() and related.concrete)):
+                    (prefetch if many else select).add(name)
+
+    def _get_model_field(self, model, source_attrs):
+        if model is None or len(source_attrs) != 1: return None
+
+        try:
+            field = model._meta.get_field(source_attrs[0])
+        except FieldDoesNotExist:
+            field = None
+
+        return field
+
+
+class ConditionalGetMixin(object):
+    """
+    Answers a GET with 304 Not Modified when the ETag or Last-Modified
+    validators the client sent still match. A detail is validated by the
+    'updated' time of the object, a list by the latest 'updated' time and
+    the number of rows of the filtered queryset, so deleting a row also
+    changes the ETag. Models without the field are served as before.
+
+    Adding or removing a child row does not change the 'updated' time of
+    its parent, so the reverse relations the serializer renders must be
+    named in 'conditional_related_names'. Their latest 'updated' time and
+    row count are added to the validators. Many to many relations have no
+    time to validate with, views rendering them should not use this mixin.
+
+    The aggregates of a list are cached for each filtered queryset and the
+    stamps of its models, which change when a row is saved or deleted, so
+    only the first request after a change reads the whole queryset.
+    """
+    VALIDATORS_KEY = 'api:validators:{}'
+    last_modified_field = 'updated'
+    conditional_related_names = ()
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        if not self._has_last_modified(queryset.model):
+            return super(ConditionalGetMixin, self).list(
+                request, *args, **kwargs)
+
+        values = self._get_list_values(queryset)
+        last_modified = self._get_latest(values)
+        etag = self.get_etag(last_modified, *sorted(values.items()))
+        # A date can not tell that a row was deleted, so lists are only
+        # validated by the ETag.
+        response = self._get_not_modified(request, etag, None)
+
+        if response is None:
+            response = super(ConditionalGetMixin, self).list(
+                request, *args, **kwargs)
+
+        return self._set_validators(response, etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+
+        if not self._has_last_modified(instance.__class__):
+            serializer = self.get_serializer(instance)
+            return Response(serializer.data)
+
+        values = {'last_modified': getattr(
+            instance, self.last_modified_field)}
+
+        for name in self.conditional_related_names:
+            rel = instance._meta.get_field(name)
+            related = rel.related_model.objects.filter(
+                **{rel.field.name: instance}).order_by().aggregate(
+                count=Count('pk'), last_modified=Max(
+                    self.last_modified_field))
+            values[name + '__count'] = related['count']
+            values[name + '__last_modified'] = related['last_modified']
+
+        last_modified = self._get_latest(values)
+        etag = self.get_etag(last_modified, instance.pk,
+                             *sorted(values.items()))
+        # A deleted child can only be seen by the ETag.
+        response = self._get_not_modified(
+            request, etag,
+            None if self.conditional_related_names else last_modified)
+
+        if response is None:
+            serializer = self.get_serializer(instance)
+            response = Response(serializer.data)
+
+        return self._set_validators(response, etag, last_modified)
+
+    def _get_list_values(self, queryset):
+        """
+        Return the aggregates of the list validators from the cache or the
+        database.
+        """
+        # The joins of the related names repeat the rows, so the counts
+        # must be distinct.
+        aggregates = {'count': Count('pk', distinct=True),
+                      'last_modified': Max(self.last_modified_field)}
+        models = [queryset.model]
+
+        for name in self.conditional_related_names:
+            aggregates[name + '__count'] = Count(name, distinct=True)
+            aggregates[name + '__last_modified'] = Max(
+                '{}__{}'.format(name, self.last_modified_field))
+            models.append(queryset.model._meta.get_field(name).related_model)
+
+        queryset = queryset.order_by()
+
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            # Nothing is read from the database for an empty result.
+            return queryset.aggregate(**aggregates)
+
+        key = repr((queryset.db, sql, params, ModelStamp.get_stamps(models)))
+        key = self.VALIDATORS_KEY.format(
+            hashlib.sha1(key.encode('utf-8')).hexdigest())
+        values = cache.get(key)
+
+        if values is None:
+            values = queryset.aggregate(**aggregates)
+            cache.set(key, values, settings.API_CONDITIONAL_CACHE_TIMEOUT)
+
+        return values
+
+    def _get_latest(self, values):
+        times = [value for key, value in values.items()
+                 if key.endswith('last_modified') and value]
+        return max(times) if times else None
+
+    def get_etag(self, last_modified, *values):
+        """
+        Return the unquoted ETag of the request. The full path and the user
+        are included since both change what the response holds.
+        """
+        key = repr((self.request.get_full_path(), self.request.user.pk,
+                    getattr(self.request, 'accepted_media_type', None),
+                    last_modified.isoformat() if last_modified else None,
+                    values))
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def _has_last_modified(self, model):
+        try:
+            model._meta.get_field(self.last_modified_field)
+        except FieldDoesNotExist:
+            result = False
+        else:
+            result = True
+
+        return result
+
+    def _get_not_modified(self, request, etag, last_modified):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if_modified_since = request.META.get('HTTP_IF_MODIFIED_SINCE')
+        not_modified = False
+
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            not_modified = '*' in etags or etag in etags
+        elif if_modified_since and last_modified:
+            since = parse_http_date_safe(if_modified_since)
+            not_modified = (since is not None and
+                            self._timestamp(last_modified) <= since)
+
+        if not_modified:
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+
+        return None
+
+    def _set_validators(self, response, etag, last_modified):
+        if response.status_code in (status.HTTP_200_OK,
+                                    status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = quote_etag(etag)
+
+            if last_modified:
+                response['Last-Modified'] = http_date(
+                    self._timestamp(last_modified))
+
+        return response
+
+    def _timestamp(self, value):
+        return calendar.timegm(value.utctimetuple())
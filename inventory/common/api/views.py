@@ -72,6 +72,10 @@ def api_root(request, format=None):
     categories = items.setdefault('categories', OrderedDict())
     categories['categories'] = reverse(
         'category-list', request=request, format=format)
+    categories['category-tree'] = reverse(
+        'category-tree-list', request=request, format=format)
+    categories['category-autocomplete'] = reverse(
+        'category-autocomplete', request=request, format=format)
     # Maintenance
     maintenance = items.setdefault('maintenance', OrderedDict())
     maintenance['currencies'] = reverse(
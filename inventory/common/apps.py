@@ -0,0 +1,27 @@
+#
+# inventory/common/apps.py
+#
+
+from django.apps import AppConfig, apps
+from django.db.models.signals import post_save, post_delete
+from django.utils.translation import ugettext_lazy as _
+
+
+class CommonConfig(AppConfig):
+    name = 'inventory.common'
+    label = 'common'
+    verbose_name = _("Common")
+
+    def ready(self):
+        from .cache import touch_model
+        from .model_mixins import TimeModelMixin
+
+        # The conditional GET validators of the API lists are keyed on the
+        # stamps of the models with an updated time.
+        for model in apps.get_models():
+            if not issubclass(model, TimeModelMixin): continue
+            uid = 'model_stamp_{}'.format(model._meta.label_lower)
+            post_save.connect(touch_model, sender=model,
+                              dispatch_uid=uid + '_post_save')
+            post_delete.connect(touch_model, sender=model,
+                                dispatch_uid=uid + '_post_delete')
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+#
+# inventory/common/cache.py
+#
+
+import uuid
+import logging
+
+from django.core.cache import cache
+
+log = logging.getLogger('inventory.common.cache')
+
+
+class ModelStamp(object):
+    """
+    Keeps a random stamp per model in the default cache that changes
+    whenever a row of the model is saved or deleted. Values cached from
+    queries on a model are keyed on its stamp, so a change gives a new key
+    instead of needing to find the old ones.
+    """
+    STAMP_KEY = 'models:stamp:{}'
+
+    @classmethod
+    def touch(self, model):
+        """
+        Give the model a new stamp, needed after bulk operations since they
+        do not send the model signals.
+        """
+        cache.set(self._get_key(model), uuid.uuid4().hex, None)
+        log.debug("Touched the stamp of model: %s", model._meta.label_lower)
+
+    @classmethod
+    def get_stamps(self, models):
+        """
+        Return the stamps of the models in the same order, None for a model
+        that has not been touched.
+        """
+        keys = [self._get_key(model) for model in models]
+        values = cache.get_many(keys)
+        return [values.get(key) for key in keys]
+
+    @classmethod
+    def _get_key(self, model):
+        return self.STAMP_KEY.format(model._meta.label_lower)
+
+
+def touch_model(sender, **kwargs):
+    """
+    Receiver for the post_save and post_delete signals of the stamped
+    models.
+    """
+    ModelStamp.touch(sender)
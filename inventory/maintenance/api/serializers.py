@@ -9,7 +9,8 @@ from django.contrib.auth import get_user_model
 
 from rest_framework import serializers
 
-from inventory.common.api.serializer_mixin import SerializerMixin
+from inventory.common.api.serializer_mixin import (
+    SerializerMixin, DynamicFieldsMixin)
 from inventory.accounts.models import User
 
 from ..models import Currency, LocationDefault, LocationFormat, LocationCode
@@ -21,7 +22,8 @@ User = get_user_model()
 #
 # Currency
 #
-class CurrencySerializer(SerializerMixin, serializers.ModelSerializer):
+class CurrencySerializer(DynamicFieldsMixin, SerializerMixin,
+                         serializers.ModelSerializer):
     creator = serializers.HyperlinkedRelatedField(
         view_name='user-detail', read_only=True)
     updater = serializers.HyperlinkedRelatedField(
@@ -51,7 +53,8 @@ class CurrencySerializer(SerializerMixin, serializers.ModelSerializer):
 #
 # Location
 #
-class LocationDefaultSerializer(SerializerMixin, serializers.ModelSerializer):
+class LocationDefaultSerializer(DynamicFieldsMixin, SerializerMixin,
+                                serializers.ModelSerializer):
     owner = serializers.HyperlinkedRelatedField(
         view_name='user-detail', queryset=User.objects.all())
     creator = serializers.HyperlinkedRelatedField(
@@ -89,7 +92,8 @@ class LocationDefaultSerializer(SerializerMixin, serializers.ModelSerializer):
         read_only_fields = ('id', 'creator', 'created', 'updater', 'updated',)
 
 
-class LocationFormatSerializer(SerializerMixin, serializers.ModelSerializer):
+class LocationFormatSerializer(DynamicFieldsMixin, SerializerMixin,
+                               serializers.ModelSerializer):
     location_default = serializers.HyperlinkedRelatedField(
         view_name='location-default-detail',
         queryset=LocationDefault.objects.all())
@@ -131,7 +135,8 @@ class LocationFormatSerializer(SerializerMixin, serializers.ModelSerializer):
                             'updater', 'updated',)
 
 
-class LocationCodeSerializer(SerializerMixin, serializers.ModelSerializer):
+class LocationCodeSerializer(DynamicFieldsMixin, SerializerMixin,
+                             serializers.ModelSerializer):
     char_definition = serializers.HyperlinkedRelatedField(
         view_name='location-format-detail',
         queryset=LocationFormat.objects.all())
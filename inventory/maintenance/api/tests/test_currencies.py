@@ -338,7 +338,26 @@ class TestCurrencies(BaseTest):
         self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
         self.assertEqual(data.get('name'), 'Currency Detail', msg)
 
-    def _create_currency(self):
-        new_data = {'name': 'US Dollar', 'symbol': '$', 'updater': self.user,
+    def test_currency_list_query_budget(self):
+        """
+        Test that the currency list runs the same number of queries for any
+        number of currencies.
+        """
+        #self.skipTest("Temporarily skipped")
+        self._create_currency()
+        uri = reverse('currency-list')
+        count, data = self._assert_query_budget(self.client, uri, 6)
+
+        for num in range(4):
+            self._create_currency(name='Currency {}'.format(num))
+
+        new_count, data = self._assert_query_budget(self.client, uri, 6)
+        msg = "Queries: {} should be {}, content: {}".format(
+            new_count, count, self._clean_data(data))
+        self.assertEqual(data.get('count'), 5, msg)
+        self.assertEqual(new_count, count, msg)
+
+    def _create_currency(self, name='US Dollar', symbol='$'):
+        new_data = {'name': name, 'symbol': symbol, 'updater': self.user,
                     'creator': self.user}
         return Currency.objects.create(**new_data)
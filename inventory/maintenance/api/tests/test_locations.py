@@ -76,6 +76,29 @@ class TestLocationDefault(BaseLocation):
     def __init__(self, name):
         super(TestLocationDefault, self).__init__(name)
 
+    def test_location_default_list_query_budget(self):
+        """
+        Test that the location default list with its formats runs the same
+        number of queries for any number of location defaults.
+        """
+        #self.skipTest("Temporarily skipped")
+        self._create_location_format(self._create_location_default())
+        uri = reverse('location-default-list')
+        count, data = self._assert_query_budget(self.client, uri, 8)
+
+        for num in range(4):
+            ld = self._create_location_default(
+                name='Test Location Default {}'.format(num))
+            self._create_location_format(ld)
+            self._create_location_format(
+                ld, char_definition=r'C\d\d', segment_order=1)
+
+        new_count, data = self._assert_query_budget(self.client, uri, 8)
+        msg = "Queries: {} should be {}, content: {}".format(
+            new_count, count, self._clean_data(data))
+        self.assertEqual(data.get('count'), 5, msg)
+        self.assertEqual(new_count, count, msg)
+
     def test_create_post_location_default(self):
         """
         Test that we can create a new location_default with a POST.
@@ -492,6 +515,39 @@ class TestLocationFormat(BaseLocation):
                          status.HTTP_401_UNAUTHORIZED, msg)
         self.assertTrue('detail' in data, msg)
 
+    def test_get_location_format_list_queries(self):
+        """
+        Test that a non-administrator only gets the location formats of their
+        own location defaults with the same number of queries for any number
+        of formats.
+        """
+        #self.skipTest("Temporarily skipped")
+        username = 'Normal_User'
+        password = '123456'
+        user, client = self._create_normal_user(username, password)
+        ld = self._create_location_default()
+        self._create_location_format(ld)
+        ld.owner = user
+        ld.save()
+        self._create_location_format(self._create_location_default(
+            name="Not Owned"))
+        uri = reverse('location-format-list')
+        count, data = self._assert_query_budget(client, uri, 8)
+        msg = "Queries: {}, content: {}".format(count, self._clean_data(data))
+        self.assertEqual(data.get('count'), 1, msg)
+
+        for order in range(1, 5):
+            lf = self._create_location_format(
+                ld, char_definition=r'C\d\d{}'.format(order),
+                segment_order=order)
+            self._create_location_code(lf)
+
+        new_count, data = self._assert_query_budget(client, uri, 8)
+        msg = "Queries: {} should be {}, content: {}".format(
+            new_count, count, self._clean_data(data))
+        self.assertEqual(data.get('count'), 5, msg)
+        self.assertEqual(new_count, count, msg)
+
     def test_create_location_format_post_token_superuser(self):
         """
         Test LocationFormat with API with token.
@@ -886,6 +942,35 @@ class TestLocationCode(BaseLocation):
                          status.HTTP_401_UNAUTHORIZED, msg)
         self.assertTrue('detail' in data, msg)
 
+    def test_get_location_code_list_queries(self):
+        """
+        Test that a non-administrator only gets the location codes of their
+        own location defaults with the same number of queries for any number
+        of codes.
+        """
+        #self.skipTest("Temporarily skipped")
+        username = 'Normal_User'
+        password = '123456'
+        user, client = self._create_normal_user(username, password)
+        ld = self._create_location_default()
+        lf = self._create_location_format(ld)
+        self._create_location_code(lf)
+        ld.owner = user
+        ld.save()
+        self._create_location_code(self._create_location_format(
+            self._create_location_default(name="Not Owned")))
+        uri = reverse('location-code-list')
+        count, data = self._assert_query_budget(client, uri, 8)
+        msg = "Queries: {}, content: {}".format(count, self._clean_data(data))
+        self.assertEqual(data.get('count'), 1, msg)
+        LocationCode.objects.create_location_codes(
+            ld, [['T{:02d}'.format(num) for num in range(2, 10)]], self.user)
+        new_count, data = self._assert_query_budget(client, uri, 8)
+        msg = "Queries: {} should be {}, content: {}".format(
+            new_count, count, self._clean_data(data))
+        self.assertEqual(data.get('count'), 9, msg)
+        self.assertEqual(new_count, count, msg)
+
     def test_create_location_code_post_token_superuser(self):
         """
         Test LocationCode with API with token.
@@ -22,7 +22,8 @@ from inventory.common.api.permissions import (
     IsReadOnly)
 from inventory.common.api.pagination import SmallResultsSetPagination
 from inventory.common.api.view_mixins import (
-    TrapDjangoValidationErrorCreateMixin, TrapDjangoValidationErrorUpdateMixin)
+    TrapDjangoValidationErrorCreateMixin, TrapDjangoValidationErrorUpdateMixin,
+    RelatedQuerysetMixin, ConditionalGetMixin)
 
 from ..models import (
     Currency, LocationDefault, LocationFormat, LocationCode)
@@ -38,7 +39,8 @@ User = get_user_model()
 #
 # Currency
 #
-class CurrencyList(ListCreateAPIView):
+class CurrencyList(RelatedQuerysetMixin, ConditionalGetMixin,
+                   ListCreateAPIView):
     """
     Currency list endpoint.
     """
@@ -55,7 +57,7 @@ class CurrencyList(ListCreateAPIView):
 currency_list = CurrencyList.as_view()
 
 
-class CurrencyDetail(RetrieveUpdateDestroyAPIView):
+class CurrencyDetail(ConditionalGetMixin, RetrieveUpdateDestroyAPIView):
     """
     Currency detail endpoint.
     """
@@ -77,8 +79,6 @@ currency_detail = CurrencyDetail.as_view()
 class LocationDefaultAuthorizationMixin(object):
 
     def get_queryset(self):
-        result = []
-
         if (self.request.user.is_superuser or
             self.request.user.role == User.ADMINISTRATOR):
             result = LocationDefault.objects.all()
@@ -89,7 +89,8 @@ class LocationDefaultAuthorizationMixin(object):
         return result
 
 
-class LocationDefaultList(LocationDefaultAuthorizationMixin,
+class LocationDefaultList(RelatedQuerysetMixin, ConditionalGetMixin,
+                          LocationDefaultAuthorizationMixin,
                           TrapDjangoValidationErrorCreateMixin,
                           ListCreateAPIView):
     """
@@ -97,6 +98,7 @@ class LocationDefaultList(LocationDefaultAuthorizationMixin,
     """
     queryset = LocationDefault.objects.all()
     serializer_class = LocationDefaultSerializer
+    conditional_related_names = ('locationformat',)
     permission_classes = (
         Or(IsAdminSuperUser, IsAdministrator, IsProjectManager,
            And(IsDefaultUser, IsReadOnly),
@@ -108,7 +110,8 @@ class LocationDefaultList(LocationDefaultAuthorizationMixin,
 location_default_list = LocationDefaultList.as_view()
 
 
-class LocationDefaultDetail(LocationDefaultAuthorizationMixin,
+class LocationDefaultDetail(ConditionalGetMixin,
+                            LocationDefaultAuthorizationMixin,
                             TrapDjangoValidationErrorUpdateMixin,
                             RetrieveUpdateDestroyAPIView):
     """
@@ -116,6 +119,7 @@ class LocationDefaultDetail(LocationDefaultAuthorizationMixin,
     """
     queryset = LocationDefault.objects.all()
     serializer_class = LocationDefaultSerializer
+    conditional_related_names = ('locationformat',)
     permission_classes = (
         Or(IsAdminSuperUser, IsAdministrator, IsProjectManager,
            And(IsDefaultUser, IsReadOnly),
@@ -132,20 +136,18 @@ location_default_detail = LocationDefaultDetail.as_view()
 class LocationFormatAuthorizationMixin(object):
 
     def get_queryset(self):
-        result = []
-
         if (self.request.user.is_superuser or
             self.request.user.role == User.ADMINISTRATOR):
             result = LocationFormat.objects.all()
         else:
-            for default in (self.request.user.
-                            maintenance_locationdefault_owner_related.all()):
-                result += default.locationformat_set.all()
+            result = LocationFormat.objects.filter(
+                location_default__owner=self.request.user)
 
         return result
 
 
-class LocationFormatList(LocationFormatAuthorizationMixin,
+class LocationFormatList(RelatedQuerysetMixin, ConditionalGetMixin,
+                         LocationFormatAuthorizationMixin,
                          TrapDjangoValidationErrorCreateMixin,
                          ListCreateAPIView):
     """
@@ -153,6 +155,7 @@ class LocationFormatList(LocationFormatAuthorizationMixin,
     """
     queryset = LocationFormat.objects.all()
     serializer_class = LocationFormatSerializer
+    conditional_related_names = ('locationcode',)
     permission_classes = (
         Or(IsAdminSuperUser, IsAdministrator, IsProjectManager,
            And(IsDefaultUser, IsReadOnly),
@@ -164,7 +167,8 @@ class LocationFormatList(LocationFormatAuthorizationMixin,
 location_format_list = LocationFormatList.as_view()
 
 
-class LocationFormatDetail(LocationFormatAuthorizationMixin,
+class LocationFormatDetail(ConditionalGetMixin,
+                           LocationFormatAuthorizationMixin,
                            TrapDjangoValidationErrorUpdateMixin,
                            RetrieveUpdateDestroyAPIView):
     """
@@ -172,6 +176,7 @@ class LocationFormatDetail(LocationFormatAuthorizationMixin,
     """
     queryset = LocationFormat.objects.all()
     serializer_class = LocationFormatSerializer
+    conditional_related_names = ('locationcode',)
     permission_classes = (
         Or(IsAdminSuperUser, IsAdministrator, IsProjectManager,
            And(IsDefaultUser, IsReadOnly),
@@ -188,21 +193,18 @@ location_format_detail = LocationFormatDetail.as_view()
 class LocationCodeAuthorizationMixin(object):
 
     def get_queryset(self):
-        result = []
-
         if (self.request.user.is_superuser or
             self.request.user.role == User.ADMINISTRATOR):
             result = LocationCode.objects.all()
         else:
-            for default in (self.request.user.
-                            maintenance_locationdefault_owner_related.all()):
-                for fmt in default.locationformat_set.all():
-                    result += fmt.locationcode_set.all()
+            result = LocationCode.objects.filter(
+                char_definition__location_default__owner=self.request.user)
 
         return result
 
 
-class LocationCodeList(LocationCodeAuthorizationMixin,
+class LocationCodeList(RelatedQuerysetMixin, ConditionalGetMixin,
+                       LocationCodeAuthorizationMixin,
                        TrapDjangoValidationErrorCreateMixin,
                        ListCreateAPIView):
     """
@@ -217,11 +219,14 @@ class LocationCodeList(LocationCodeAuthorizationMixin,
            ),
         )
     pagination_class = SmallResultsSetPagination
+    # The cursor is keyed on path alone, paths only tie across location
+    # formats so the offset on a tie stays small.
+    cursor_ordering = ('path', 'id',)
 
 location_code_list = LocationCodeList.as_view()
 
 
-class LocationCodeDetail(LocationCodeAuthorizationMixin,
+class LocationCodeDetail(ConditionalGetMixin, LocationCodeAuthorizationMixin,
                          TrapDjangoValidationErrorUpdateMixin,
                          RetrieveUpdateDestroyAPIView):
     """
@@ -3,17 +3,28 @@
 # inventory/maintenance/models.py
 #
 
-from django.db import models
+import logging
+import string
+import itertools
+from datetime import datetime
+from dateutil.tz import tzutc
+
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
 from django.core.exceptions import ValidationError
 from django.utils.translation import ugettext_lazy as _
 from django.utils.safestring import mark_safe
 from django.conf import settings
 
+from inventory.common.cache import ModelStamp
 from inventory.common.model_mixins import (
     UserModelMixin, TimeModelMixin, ValidateOnSaveMixin,)
 
 from .validation import FormatValidator
 
+log = logging.getLogger('inventory.maintenance.models')
+
 
 #
 # Currency
@@ -45,6 +56,7 @@ class Currency(TimeModelMixin, UserModelMixin):
 # LocationDefault
 #
 class LocationDefaultManager(models.Manager):
+    BATCH_SIZE = 500
 
     def clone_default_tree(self, default_obj, owner, user):
         """
@@ -86,33 +98,36 @@ class LocationDefaultManager(models.Manager):
         continuing with location format objects, then deleting the location
         default object itself. Since this is a full removal of an entire tree
         it will invalidate any items that used any location code objects.
-        """
-        deleted_nodes = []
-
-        for fmt in default_obj.locationformat_set.all():
-            child_nodes = []
-
-            for code in fmt.locationcode_set.all():
-                child_nodes += self._recurse_children(code)
-
-            fmt_obj = [fmt.char_definition, child_nodes]
-            fmt.delete()
-            deleted_nodes.append(fmt_obj)
 
+        All the location codes are found with one query and deleted deepest
+        level first in batches, so no cascades need to be collected. A list
+        of the default name followed by a [char_definition, [paths]] list for
+        each location format is returned.
+        """
+        formats = list(default_obj.locationformat_set.all())
+        paths = dict([(fmt.pk, []) for fmt in formats])
+        ids = []
+        codes = LocationCode.objects.filter(
+            char_definition__location_default=default_obj).order_by(
+            '-level').values_list('pk', 'char_definition_id', 'path')
+
+        for pk, fmt_id, path in codes:
+            ids.append(pk)
+            paths[fmt_id].append(path)
+
+        with transaction.atomic():
+            for idx in range(0, len(ids), self.BATCH_SIZE):
+                LocationCode.objects.filter(
+                    pk__in=ids[idx:idx + self.BATCH_SIZE]).delete()
+
+            default_obj.locationformat_set.all().delete()
+            default_obj.delete()
+
+        log.debug("Location default: %s, location codes deleted: %s",
+                  default_obj, len(ids))
+        deleted_nodes = [[fmt.char_definition, sorted(paths[fmt.pk])]
+                         for fmt in formats]
         deleted_nodes.insert(0, default_obj.name)
-        default_obj.delete()
-        return deleted_nodes
-
-    def _recurse_children(self, child):
-        deleted_nodes = []
-
-        for c in child.children.all():
-            if c.children.count():
-                deleted_nodes += self._recurse_children(c)
-            else:
-                deleted_nodes.append(c.path)
-                c.delete()
-
         return deleted_nodes
 
 
@@ -230,7 +245,206 @@ class LocationFormat(TimeModelMixin, UserModelMixin, ValidateOnSaveMixin):
 #
 # LocationCode
 #
+def segment_range(start, end):
+    """
+    Generate the segments from 'start' to 'end' inclusive. Digits count from
+    0 to 9 and letters from A to Z or a to z, any other character must be the
+    same in both and is kept as is. ex. ('A98', 'B01') gives A98, A99, B00
+    and B01. The range is checked when this is called, not when the segments
+    are consumed.
+
+    raise ValidationError If 'start' and 'end' cannot be counted between.
+    """
+    if len(start) != len(end):
+        raise ValidationError(
+            {'segment': _("The start '{}' and end '{}' of a segment range "
+                          "must have the same length.").format(start, end)})
+
+    alphabets = []
+
+    for first, last in zip(start, end):
+        for alphabet in (string.digits, string.ascii_uppercase,
+                         string.ascii_lowercase):
+            if first in alphabet and last in alphabet: break
+        else:
+            if first != last:
+                raise ValidationError(
+                    {'segment': _("Cannot count from '{}' to '{}' in the "
+                                  "segment range {} to {}.").format(
+                        first, last, start, end)})
+
+            alphabet = first
+
+        alphabets.append(alphabet)
+
+    return _count_segments(alphabets, start, end)
+
+
+def _count_segments(alphabets, start, end):
+    current = [alphabet.index(c) for alphabet, c in zip(alphabets, start)]
+    stop = [alphabet.index(c) for alphabet, c in zip(alphabets, end)]
+
+    while current <= stop:
+        yield ''.join([alphabet[idx]
+                       for alphabet, idx in zip(alphabets, current)])
+
+        for pos in reversed(range(len(current))):
+            current[pos] += 1
+            if current[pos] < len(alphabets[pos]): break
+            current[pos] = 0
+        else:
+            break
+
+
 class LocationCodeManager(models.Manager):
+    BATCH_SIZE = 1000
+
+    def create_location_codes(self, default_obj, segment_ranges, user,
+                              progress=None):
+        """
+        Bulk create the full hierarchy of location codes for 'default_obj'.
+        The 'segment_ranges' holds an iterable of segments for each location
+        format in segment order, ex. [segment_range('A', 'Z'),
+        segment_range('001', '120')], where every segment of a level becomes
+        a child of every code in the level above it.
+
+        The segments are validated once per format and the codes are inserted
+        in batches with a precomputed path and level. Codes whose path already
+        exists in the format are skipped and used as parents, so running the
+        same ranges twice creates nothing. The parents of each level are read
+        back by path in batches, so memory use does not depend on the number
+        of codes. The 'progress' callable is called with (level, done, total)
+        after each batch. The number of codes created is returned.
+
+        raise ValidationError If a segment, the number of levels or the path
+                              length is invalid.
+        """
+        separator = default_obj.separator
+        formats = list(default_obj.locationformat_set.all())
+        segment_ranges = list(segment_ranges)
+        levels = []
+
+        if not segment_ranges:
+            raise ValidationError(
+                {'segment': _("At least one segment range must be given.")})
+
+        if len(segment_ranges) > len(formats):
+            raise ValidationError(
+                _("There are more segments than defined formats, found: {}, "
+                  "allowed: {}").format(len(segment_ranges), len(formats)))
+
+        for fmt, segments in zip(formats, segment_ranges):
+            segments = FormatValidator(
+                separator, fmt=fmt.char_definition).validate_segments(segments)
+            unique = set(segments)
+
+            if not segments or len(unique) != len(segments):
+                raise ValidationError(
+                    {'segment': _("The segments for format '{}' must not be "
+                                  "empty or repeated.").format(fmt)})
+
+            # Every segment is a child of every segment above it.
+            if any([unique.intersection(level) for level in levels]):
+                raise ValidationError(
+                    _("You cannot have a segment as a child to itself."))
+
+            levels.append(segments)
+
+        max_length = self.model._meta.get_field('path').max_length
+        length = (sum([max([len(seg) for seg in level]) for level in levels])
+                  + len(separator) * (len(levels) - 1))
+
+        if length > max_length:
+            raise ValidationError(
+                {'segment': _("The location code paths would be {} "
+                              "characters, the max length is {}.").format(
+                    length, max_length)})
+
+        size = 1
+        total = 0
+
+        for level in levels:
+            size *= len(level)
+            total += size
+
+        counts = {'created': 0, 'done': 0}
+        now = datetime.now(tzutc())
+        parents = [(None, None)]
+
+        with transaction.atomic():
+            for level, segments in enumerate(levels):
+                fmt = formats[level]
+                batch = []
+
+                for parent_id, parent_path in parents:
+                    for segment in segments:
+                        if parent_path is None:
+                            path = segment
+                        else:
+                            path = parent_path + separator + segment
+
+                        batch.append(self.model(
+                            char_definition=fmt, segment=segment,
+                            parent_id=parent_id, path=path, level=level,
+                            creator=user, updater=user, created=now,
+                            updated=now))
+
+                        if len(batch) >= self.BATCH_SIZE:
+                            self._insert_codes(
+                                fmt, batch, level, counts, total, progress)
+                            batch = []
+
+                if batch:
+                    self._insert_codes(
+                        fmt, batch, level, counts, total, progress)
+
+                parents = self._iter_codes(
+                    fmt, self._iter_paths(levels[:level + 1], separator))
+
+        # The bulk inserts do not send the post_save signal.
+        if counts['created']: ModelStamp.touch(self.model)
+        log.debug("Location default: %s, location codes created: %s",
+                  default_obj, counts['created'])
+        return counts['created']
+
+    def _insert_codes(self, fmt, batch, level, counts, total, progress):
+        existing = set(self.filter(
+            char_definition=fmt, path__in=[code.path for code in batch]
+            ).values_list('path', flat=True))
+        new_codes = [code for code in batch if code.path not in existing]
+        if new_codes: self.bulk_create(new_codes)
+        counts['created'] += len(new_codes)
+        counts['done'] += len(batch)
+        if progress: progress(level, counts['done'], total)
+
+    def _iter_paths(self, levels, separator):
+        """
+        Yield the paths of the last of 'levels' in the order they are
+        inserted.
+        """
+        for segments in itertools.product(*levels):
+            yield separator.join(segments)
+
+    def _iter_codes(self, fmt, paths):
+        """
+        Yield the (pk, path) of the codes of 'fmt' with the given 'paths',
+        reading one batch of paths at a time. The codes are found by their
+        path so rows inserted by other transactions are never picked up.
+        """
+        paths = iter(paths)
+
+        while True:
+            chunk = list(itertools.islice(paths, self.BATCH_SIZE))
+            if not chunk: break
+            pks = {}
+
+            for pk, path in self.filter(char_definition=fmt, path__in=chunk
+                                        ).order_by('pk').values_list(
+                'pk', 'path'):
+                pks.setdefault(path, pk)
+
+            for path in chunk:
+                yield pks[path], path
 
     def get_parents(self, fmt_obj):
         parents = self._recurse_parents(fmt_obj)
@@ -247,6 +461,78 @@ class LocationCodeManager(models.Manager):
 
         return parents
 
+    def get_descendant_ids(self, code):
+        """
+        Get the primary keys of all the descendants of this location code.
+        One query is done per level, the depth of a tree is limited by the
+        number of location formats in its location default.
+        """
+        result = []
+        ids = [code.pk]
+
+        while ids:
+            ids = list(self.filter(parent_id__in=ids).values_list(
+                'pk', flat=True))
+            result += ids
+
+        return result
+
+    def update_subtree_paths(self, code, old_path, old_level):
+        """
+        Rewrite the path and level of all the descendants of 'code' after it
+        has been changed or moved. The old path prefix is replaced with the
+        new one in a single UPDATE, then the descendants are validated in
+        their new place. The number of rows changed is returned.
+
+        raise ValidationError If a descendant is invalid in its new place,
+                              the caller's transaction must be rolled back.
+        """
+        count = 0
+        ids = self.get_descendant_ids(code)
+
+        if ids:
+            count = self.filter(pk__in=ids).update(
+                path=Concat(Value(code.path), Substr('path', len(old_path) + 1),
+                            output_field=models.CharField()),
+                level=F('level') + (code.level - old_level),
+                updated=datetime.now(tzutc()))
+            self._validate_subtree(code, ids)
+            ModelStamp.touch(self.model)
+
+        log.debug("Location code: %s, old path: %s, descendants updated: %s",
+                  code, old_path, count)
+        return count
+
+    def _validate_subtree(self, code, ids):
+        """
+        Validate the descendants 'ids' of 'code' with their rewritten paths.
+        A move can put them deeper than the number of formats or under a
+        parent with the same segment. The segments of each format are
+        validated together.
+        """
+        default = code.char_definition.location_default
+        separator = default.separator
+        max_num_segments = default.locationformat_set.count()
+        segments = {}
+
+        rows = self.filter(pk__in=ids).values_list(
+            'segment', 'path', 'level', 'char_definition__char_definition')
+
+        for segment, path, level, fmt in rows:
+            if level >= max_num_segments:
+                raise ValidationError(
+                    _("There are more segments than defined formats, found: "
+                      "{}, allowed: {}").format(level + 1, max_num_segments))
+
+            if path.split(separator).count(segment) > 1:
+                raise ValidationError(
+                    _("You cannot have a segment as a child to itself."))
+
+            segments.setdefault(fmt, []).append(segment)
+
+        for fmt, values in segments.items():
+            FormatValidator(separator, fmt=fmt).validate_segments(values)
+
     def get_all_root_trees(self, segment, owner):
         result = []
         records = self.filter(
@@ -270,7 +556,7 @@ class LocationCode(TimeModelMixin, UserModelMixin, ValidateOnSaveMixin):
     parent = models.ForeignKey(
         "self", blank=True, null=True, default=0, related_name='children')
     path = models.CharField(
-        max_length=248, editable=False)
+        max_length=248, editable=False, db_index=True)
     level = models.SmallIntegerField(
         verbose_name=_("Level"), editable=False)
 
@@ -331,18 +617,20 @@ class LocationCode(TimeModelMixin, UserModelMixin, ValidateOnSaveMixin):
         self.level = self.path.count(separator)
 
     def save(self, *args, **kwargs):
-        # Fix our self.
-        super(LocationCode, self).save(*args, **kwargs)
+        with transaction.atomic():
+            stored = []
 
-        # Fix all the children if any.
-        iterator = self.children.iterator()
+            if self.pk is not None:
+                stored[:] = LocationCode.objects.filter(
+                    pk=self.pk).values_list('path', 'level')
 
-        try:
-            while True:
-                child = iterator.next()
-                child.save()
-        except StopIteration:
-            pass
+            # Fix our self.
+            super(LocationCode, self).save(*args, **kwargs)
+
+            # Fix all the children if any.
+            if stored and stored[0][0] != self.path:
+                path, level = stored[0]
+                LocationCode.objects.update_subtree_paths(self, path, level)
 
     def __str__(self):
         return self.path
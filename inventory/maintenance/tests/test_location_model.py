@@ -9,7 +9,8 @@ from django.contrib.auth import get_user_model
 from django.test import TestCase
 from django.core.exceptions import ValidationError
 
-from ..models import LocationDefault, LocationFormat, LocationCode
+from ..models import (
+    LocationDefault, LocationFormat, LocationCode, segment_range)
 
 User = get_user_model()
 
@@ -174,7 +175,12 @@ class TestLocationDefaultModel(BaseLocation):
         # Test delete_default_tree
         nodes = LocationDefault.objects.delete_default_tree(
             loc_def, self.user, self.user)
-        #print nodes
+        msg = "Deleted nodes: {}".format(nodes)
+        self.assertEqual(nodes, [
+            loc_def.name,
+            [fmt_obj_0.char_definition, [code_0.path]],
+            [fmt_obj_1.char_definition, [code_1.path, code_1a.path]],
+            [fmt_obj_2.char_definition, [code_2.path, code_2a.path]]], msg)
         # Test for correct number of objects.
         msg = "Location Default: {}".format(loc_def)
         self.assertEqual(LocationDefault.objects.count(), 0, msg)
@@ -461,6 +467,140 @@ class TestLocationCodeModel(BaseLocation):
         msg = "Root trees: {}".format(trees)
         self.assertEqual(len(trees), 2, msg)
 
+    def test_change_segment_updates_children(self):
+        #self.skipTest("Temporarily skipped")
+        # Create 2nd location format object.
+        char_definition = 'C\\d\\d' # Container nn
+        segment_order = 1
+        description = "Test character definition."
+        loc_fmt_1 = self._create_location_format_record(
+            char_definition, segment_order, description, self.loc_def)
+        # Create a two level tree.
+        obj_0 = self._create_location_code_record("T01", self.loc_fmt)
+        obj_1 = self._create_location_code_record("C01", loc_fmt_1,
+                                                  parent=obj_0)
+        # Change the root segment.
+        obj_0.segment = "T02"
+        obj_0.save()
+        obj_1 = LocationCode.objects.get(pk=obj_1.pk)
+        msg = "obj_0: {}, obj_1: {}".format(obj_0, obj_1)
+        self.assertEqual(obj_1.path, "T02:C01", msg)
+        self.assertEqual(obj_1.level, 1, msg)
+        # Rewriting again with the current path should report the one child.
+        count = LocationCode.objects.update_subtree_paths(
+            obj_0, obj_0.path, obj_0.level)
+        msg = "count: {}".format(count)
+        self.assertEqual(count, 1, msg)
+
+    def test_move_validates_children(self):
+        #self.skipTest("Temporarily skipped")
+        char_definition = 'C\\d\\d' # Container nn
+        loc_fmt_1 = self._create_location_format_record(
+            char_definition, 1, "Test character definition.", self.loc_def)
+        obj_0 = self._create_location_code_record("T01", self.loc_fmt)
+        obj_1 = self._create_location_code_record("C01", loc_fmt_1,
+                                                  parent=obj_0)
+        obj_2 = self._create_location_code_record("T02", self.loc_fmt)
+        # The child C01 would be deeper than the two formats.
+        obj_0.parent = obj_2
+
+        with self.assertRaises(ValidationError) as cm:
+            obj_0.save()
+
+        message = " ".join(cm.exception.messages)
+        msg = "message: {}".format(message)
+        self.assertTrue("more segments than defined formats" in message, msg)
+        # The move was rolled back.
+        obj_0 = LocationCode.objects.get(pk=obj_0.pk)
+        obj_1 = LocationCode.objects.get(pk=obj_1.pk)
+        msg = "obj_0: {}, obj_1: {}".format(obj_0, obj_1)
+        self.assertEqual(obj_0.path, "T01", msg)
+        self.assertEqual(obj_1.path, "T01:C01", msg)
+        self.assertEqual(obj_1.level, 1, msg)
+
+    def test_create_location_codes(self):
+        #self.skipTest("Temporarily skipped")
+        char_definition = 'C\\d\\d' # Container nn
+        loc_fmt_1 = self._create_location_format_record(
+            char_definition, 1, "Test character definition.", self.loc_def)
+        calls = []
+        LocationCode.objects.BATCH_SIZE = 5
+
+        try:
+            count = LocationCode.objects.create_location_codes(
+                self.loc_def, [segment_range('T01', 'T03'),
+                               segment_range('C01', 'C04')],
+                self.user, progress=lambda *args: calls.append(args))
+        finally:
+            del LocationCode.objects.BATCH_SIZE
+
+        msg = "count: {}, progress: {}".format(count, calls)
+        self.assertEqual(count, 15, msg)
+        self.assertEqual(calls[-1], (1, 15, 15), msg)
+        self.assertEqual(LocationCode.objects.filter(level=1).count(), 12, msg)
+        code = LocationCode.objects.get(path="T03:C04")
+        msg = "code: {}, parent: {}".format(code, code.parent)
+        self.assertEqual(code.parent.path, "T03", msg)
+        self.assertEqual(code.char_definition, loc_fmt_1, msg)
+        # Existing codes are skipped and used as parents.
+        count = LocationCode.objects.create_location_codes(
+            self.loc_def, [segment_range('T01', 'T04'),
+                           segment_range('C01', 'C04')], self.user)
+        msg = "count: {}".format(count)
+        self.assertEqual(count, 5, msg)
+        self.assertEqual(LocationCode.objects.count(), 20, msg)
+        code = LocationCode.objects.get(path="T04:C01")
+        msg = "code: {}, parent: {}".format(code, code.parent)
+        self.assertEqual(code.parent.path, "T04", msg)
+        count = LocationCode.objects.create_location_codes(
+            self.loc_def, [segment_range('T01', 'T04'),
+                           segment_range('C01', 'C04')], self.user)
+        msg = "count: {}".format(count)
+        self.assertEqual(count, 0, msg)
+        self.assertEqual(LocationCode.objects.count(), 20, msg)
+
+    def test_create_location_codes_invalid(self):
+        #self.skipTest("Temporarily skipped")
+        char_definition = 'T\\d\\d'
+        self._create_location_format_record(
+            char_definition, 1, "Test character definition.", self.loc_def)
+        # The segment T02 would be a child of itself.
+        ranges = ([segment_range('T01', 'T02'), segment_range('T02', 'T03')],
+                  [['T01', 'X01']], [['T01', 'T01']],)
+
+        for segments in ranges:
+            with self.assertRaises(ValidationError):
+                LocationCode.objects.create_location_codes(
+                    self.loc_def, segments, self.user)
+
+        # No segment ranges
+        with self.assertRaises(ValidationError) as cm:
+            LocationCode.objects.create_location_codes(
+                self.loc_def, [], self.user)
+
+        message = " ".join(cm.exception.messages)
+        msg = "message: {}".format(message)
+        self.assertTrue("At least one segment range" in message, msg)
+        msg = "count: {}".format(LocationCode.objects.count())
+        self.assertEqual(LocationCode.objects.count(), 0, msg)
+
+    def test_segment_range_invalid(self):
+        #self.skipTest("Temporarily skipped")
+        # Raised when called, before any segment is consumed.
+        ranges = (('T01', 'T001'), ('T01', 'T0A'), ('T-1', 'T:1'),)
+
+        for start, end in ranges:
+            with self.assertRaises(ValidationError) as cm:
+                segment_range(start, end)
+
+            msg = "start: {}, end: {}, exception: {}".format(
+                start, end, cm.exception)
+            self.assertTrue('segment' in cm.exception.message_dict, msg)
+
+        segments = list(segment_range('A98', 'B01'))
+        msg = "segments: {}".format(segments)
+        self.assertEqual(segments, ['A98', 'A99', 'B00', 'B01'], msg)
+
     def test_invalid_segment(self):
         """
         Test that the segment validates properly.
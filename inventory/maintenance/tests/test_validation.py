@@ -121,3 +121,29 @@ class TestValidation(TestCase):
                 value = FormatValidator(fmt=fmt, delimiter=delim
                                         ).validate_segment(segment)
                 self.assertFalse(value, msg)
+
+    def test_validate_segments(self):
+        #self.skipTest("Temporarily skipped")
+        FormatValidator.SEGMENT_CACHE.clear()
+        validator = FormatValidator(fmt=r'T\d\d', delimiter=':')
+        values = validator.validate_segments(
+            ('T{:02d}'.format(num) for num in range(10)))
+        msg = "Values: {}".format(values)
+        self.assertEqual(len(values), 10, msg)
+        # The compiled regex is reused by new validators.
+        FormatValidator(fmt=r'T\d\d', delimiter=':').validate_segment('T10')
+        cache = FormatValidator.SEGMENT_CACHE
+        msg = "Hits: {}, misses: {}".format(cache.hits, cache.misses)
+        self.assertEqual(cache.misses, 1, msg)
+        self.assertEqual(cache.hits, 1, msg)
+
+    def test_validate_segments_failures(self):
+        #self.skipTest("Temporarily skipped")
+        validator = FormatValidator(fmt=r'T\d\d', delimiter=':')
+
+        with self.assertRaises(ValidationError) as cm:
+            validator.validate_segments(['T01', 'T0', 'X01', None])
+
+        messages = cm.exception.message_dict.get('segment')
+        msg = "Exception: {}".format(cm.exception)
+        self.assertEqual(len(messages), 3, msg)
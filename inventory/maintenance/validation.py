@@ -4,11 +4,61 @@
 #
 
 import re
+import threading
+
+from collections import OrderedDict
 
 from django.core.exceptions import ValidationError
 from django.utils.translation import ugettext_lazy as _
 
 
+class LRUCache(object):
+    """
+    A thread safe least recently used cache shared by all the validators in
+    a process.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, factory):
+        """
+        Return the value of 'key', calling 'factory' to make the value when
+        it is not in the cache.
+        """
+        with self._lock:
+            if key in self._data:
+                self.hits += 1
+                value = self._data.pop(key)
+                self._data[key] = value
+                return value
+
+            self.misses += 1
+
+        value = factory()
+
+        with self._lock:
+            self._data[key] = value
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
 class FormatValidator(object):
     """
     This class parses a format string into rules to validate location code
@@ -19,6 +69,10 @@ class FormatValidator(object):
         r'\a': r'a-zA-Z',
         r'\p': r'!"#$%&\'\(\)*+,./:;<=>?@\[\]^_`{|}~-'
         }
+    # Compiled regexes keyed by (separator, char_definition) for segments and
+    # by separator for splitting char definitions.
+    SEGMENT_CACHE = LRUCache(1024)
+    SPLIT_CACHE = LRUCache(64)
 
     def __init__(self, delimiter, fmt=None):
         """
@@ -74,10 +128,7 @@ class FormatValidator(object):
         rx_obj = None
 
         if value is not None:
-            operators = self._split_char_definition(self._format)
-            regex = ''.join([r'([{}])'.format(self.__FMT_MAP.get(op, op))
-                         for op in operators])
-            rx_obj = re.match(regex, value)
+            rx_obj = self._get_segment_regex().match(value)
 
         if not rx_obj:
             raise ValidationError(
@@ -86,11 +137,44 @@ class FormatValidator(object):
 
         return value
 
+    def validate_segments(self, values):
+        """
+        Validate an iterable of segments against the same format. All the
+        invalid segments are reported in a single ValidationError, otherwise
+        a list of the segments is returned.
+        """
+        rx_obj = self._get_segment_regex()
+        result = []
+        errors = []
+
+        for value in values:
+            if value is None or not rx_obj.match(value):
+                errors.append(_("Invalid segment '{}', does not conform "
+                                "to '{}'.").format(value, self._format))
+            else:
+                result.append(value)
+
+        if errors:
+            raise ValidationError({'segment': errors})
+
+        return result
+
+    def _get_segment_regex(self):
+        def factory():
+            operators = self._split_char_definition(self._format)
+            return re.compile(''.join(
+                [r'([{}])'.format(self.__FMT_MAP.get(op, op))
+                 for op in operators]))
+
+        return self.SEGMENT_CACHE.get((self._delimiter, self._format), factory)
+
     def _split_char_definition(self, fmt):
-        a = self.__FMT_MAP.get(r'\a', '')
-        p = self._remove_delimiter(self.__FMT_MAP.get(r'\p', ''))
-        regex = r'([{}{}])|(\\[dap])'.format(a, p)
-        rx_list = re.findall(regex, fmt)
+        def factory():
+            a = self.__FMT_MAP.get(r'\a', '')
+            p = self._remove_delimiter(self.__FMT_MAP.get(r'\p', ''))
+            return re.compile(r'([{}{}])|(\\[dap])'.format(a, p))
+
+        rx_list = self.SPLIT_CACHE.get(self._delimiter, factory).findall(fmt)
         operators = []
 
         for group in rx_list:
@@ -0,0 +1,5 @@
+#
+# inventory/oauth2/__init__.py
+#
+
+default_app_config = 'inventory.oauth2.apps.OAuth2Config'
@@ -12,7 +12,8 @@ from rest_framework import serializers
 from oauth2_provider.models import (
     Grant, AccessToken, RefreshToken, get_application_model)
 
-from inventory.common.api.serializer_mixin import SerializerMixin
+from inventory.common.api.serializer_mixin import (
+    SerializerMixin, DynamicFieldsMixin)
 
 
 log = logging.getLogger('api.oauth2.serializers')
@@ -23,7 +24,7 @@ Application = get_application_model()
 #
 # ApplicationSerializer
 #
-class ApplicationSerializer(serializers.ModelSerializer):
+class ApplicationSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = serializers.HyperlinkedRelatedField(
         read_only=True, view_name='user-detail')
     accesstoken_set = serializers.HyperlinkedRelatedField(
@@ -63,7 +64,7 @@ class ApplicationSerializer(serializers.ModelSerializer):
 #
 # AccessTokenSerializer
 #
-class AccessTokenSerializer(serializers.ModelSerializer):
+class AccessTokenSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = serializers.HyperlinkedRelatedField(
         read_only=True, view_name='user-detail')
     application = serializers.HyperlinkedRelatedField(
@@ -93,7 +94,7 @@ class AccessTokenSerializer(serializers.ModelSerializer):
 #
 # GrantSerializer
 #
-class GrantSerializer(serializers.ModelSerializer):
+class GrantSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = serializers.HyperlinkedRelatedField(
         read_only=True, view_name='user-detail')
     application = serializers.HyperlinkedRelatedField(
@@ -121,7 +122,7 @@ class GrantSerializer(serializers.ModelSerializer):
 #
 # RefreshTokenSerializer
 #
-class RefreshTokenSerializer(serializers.ModelSerializer):
+class RefreshTokenSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = serializers.HyperlinkedRelatedField(
         read_only=True, view_name='user-detail')
     application = serializers.HyperlinkedRelatedField(
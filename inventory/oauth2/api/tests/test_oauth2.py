@@ -5,11 +5,19 @@
 # Run ./manage.py test -k # Keep the DB, don't rebuild.
 #
 
+from datetime import datetime, timedelta
+from dateutil.tz import tzutc
+
 from rest_framework.reverse import reverse
 from rest_framework import status
 
+from oauth2_provider.models import (
+    AccessToken, Grant, RefreshToken, get_application_model)
+
 from inventory.common.api.tests.base_test import BaseTest
 
+Application = get_application_model()
+
 
 class TestOauth2(BaseTest):
 
@@ -112,6 +120,52 @@ class TestOauth2(BaseTest):
         msg = "Response Data: {}".format(data)
         self.assertEqual(data.get('name'), app_name, msg)
 
+    def test_normal_access_token_cursor(self):
+        """
+        Ensure the Oauth2 access_token list can be paged with a cursor and
+        only has the tokens of the normal user's applications.
+        """
+        #self.skipTest("Temporarily skipped")
+        self._make_app_token(self.user, "SU_TEST_APP_01", self.client,
+                             username=TestOauth2._TEST_USERNAME,
+                             password=TestOauth2._TEST_PASSWORD)
+        username = 'Normal_User'
+        password = '123456'
+        user, client = self._create_normal_user(username, password)
+        app = Application.objects.create(
+            name='SU_TEST_APP_02', user=user, client_type='confidential',
+            authorization_grant_type='password')
+        expires = datetime.now(tzutc()) + timedelta(hours=1)
+        AccessToken.objects.bulk_create(
+            [AccessToken(user=user, application=app, expires=expires,
+                         scope='read write', token='token-{}'.format(num))
+             for num in range(30)])
+        uri = reverse('access-token-list')
+        # The list is paged by number unless a cursor is asked for.
+        response = client.get(uri, format='json')
+        data = response.data
+        msg = "Response: {} should be {}, content: {}".format(
+            response.status_code, status.HTTP_200_OK, self._clean_data(data))
+        self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
+        self.assertEqual(data.get('count'), 30, msg)
+        uri += '?pagination=cursor'
+        tokens = []
+
+        while uri:
+            response = client.get(uri, format='json')
+            data = response.data
+            msg = "Response: {} should be {}, content: {}".format(
+                response.status_code, status.HTTP_200_OK,
+                self._clean_data(data))
+            self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
+            self.assertFalse('count' in data, msg)
+            tokens += [item.get('token') for item in data.get('results')]
+            uri = data.get('next')
+
+        msg = "Tokens: {}".format(tokens)
+        self.assertEqual(len(tokens), 30, msg)
+        self.assertEqual(tokens[0], 'token-29', msg)
+
     def test_normal_application(self):
         """
         Ensure the Oauth2 application list can be accessed by a normal user and
@@ -192,6 +246,82 @@ class TestOauth2(BaseTest):
         self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
         self.assertEqual(data.get('name'), app_name, msg)
 
+    def test_application_list_query_budget(self):
+        """
+        Test that the application list with its tokens and grants runs the
+        same number of queries for any number of applications.
+        """
+        #self.skipTest("Temporarily skipped")
+        self._make_app_token(self.user, "SU_TEST_APP_01", self.client,
+                             username=TestOauth2._TEST_USERNAME,
+                             password=TestOauth2._TEST_PASSWORD)
+        uri = reverse('application-list')
+        count, data = self._assert_query_budget(self.client, uri, 8)
+
+        for num in range(2, 6):
+            self._make_app_token(self.user, "SU_TEST_APP_0{}".format(num),
+                                 self.client,
+                                 username=TestOauth2._TEST_USERNAME,
+                                 password=TestOauth2._TEST_PASSWORD)
+
+        new_count, data = self._assert_query_budget(self.client, uri, 8)
+        msg = "Queries: {} should be {}, content: {}".format(
+            new_count, count, self._clean_data(data))
+        self.assertEqual(data.get('count'), 5, msg)
+        self.assertEqual(new_count, count, msg)
+
+    def test_access_token_list_query_budget(self):
+        """
+        Test that the access token list runs the same number of queries for
+        any number of tokens.
+        """
+        #self.skipTest("Temporarily skipped")
+        self._assert_token_list_budget(reverse('access-token-list'))
+
+    def test_grant_list_query_budget(self):
+        """
+        Test that the grant list runs the same number of queries for any
+        number of grants.
+        """
+        #self.skipTest("Temporarily skipped")
+        self._assert_token_list_budget(reverse('grant-list'))
+
+    def test_refresh_token_list_query_budget(self):
+        """
+        Test that the refresh token list runs the same number of queries for
+        any number of tokens.
+        """
+        #self.skipTest("Temporarily skipped")
+        self._assert_token_list_budget(reverse('refresh-token-list'))
+
+    def _assert_token_list_budget(self, uri):
+        app = Application.objects.create(
+            name='SU_TEST_APP_01', user=self.user, client_type='confidential',
+            authorization_grant_type='password')
+        self._create_tokens(app, range(1))
+        count, data = self._assert_query_budget(self.client, uri, 6)
+        self._create_tokens(app, range(1, 5))
+        new_count, data = self._assert_query_budget(self.client, uri, 6)
+        msg = "Queries: {} should be {}, content: {}".format(
+            new_count, count, self._clean_data(data))
+        self.assertEqual(len(data.get('results')), 5, msg)
+        self.assertEqual(new_count, count, msg)
+
+    def _create_tokens(self, app, nums):
+        expires = datetime.now(tzutc()) + timedelta(hours=1)
+
+        for num in nums:
+            token = AccessToken.objects.create(
+                user=self.user, application=app, expires=expires,
+                scope='read write', token='token-{}'.format(num))
+            RefreshToken.objects.create(
+                user=self.user, application=app, access_token=token,
+                token='refresh-{}'.format(num))
+            Grant.objects.create(
+                user=self.user, application=app, expires=expires,
+                code='code-{}'.format(num), scope='read write',
+                redirect_uri='http://localhost/')
+
     def _get_application(self, client, data):
         uri = data.get('results')[0].get('application')
         response = client.get(uri, format='json')
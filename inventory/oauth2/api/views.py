@@ -19,6 +19,7 @@ from oauth2_provider.ext.rest_framework import (
 from inventory.common.api.permissions import (
     IsAdminSuperUser, IsAdministrator, IsProjectManager, IsAnyUser)
 from inventory.common.api.pagination import SmallResultsSetPagination
+from inventory.common.api.view_mixins import RelatedQuerysetMixin
 
 from .serializers import (
     ApplicationSerializer, AccessTokenSerializer, RefreshTokenSerializer,
@@ -35,8 +36,6 @@ Application = get_application_model()
 class ApplicationAuthorizationMixin(object):
 
     def get_queryset(self):
-        result = []
-
         if self.request.user.is_superuser:
             result = Application.objects.all()
         else:
@@ -45,7 +44,8 @@ class ApplicationAuthorizationMixin(object):
         return result
 
 
-class ApplicationList(ApplicationAuthorizationMixin, ListCreateAPIView):
+class ApplicationList(RelatedQuerysetMixin, ApplicationAuthorizationMixin,
+                      ListCreateAPIView):
     """
     Oauth2 Application list endpoint.
 
@@ -94,21 +94,20 @@ application_detail = ApplicationDetail.as_view()
 class AccessTokenAuthorizationMixin(object):
 
     def get_queryset(self):
-        result = []
-
         if self.request.user.is_superuser:
             result = AccessToken.objects.all()
         else:
-            for app in self.request.user.oauth2_provider_application.all():
-                for token in app.accesstoken_set.all():
-                    result.append(token)
+            result = AccessToken.objects.filter(
+                application__user=self.request.user)
 
         return result
 
 
-class AccessTokenList(AccessTokenAuthorizationMixin, ListCreateAPIView):
+class AccessTokenList(RelatedQuerysetMixin, AccessTokenAuthorizationMixin,
+                      ListCreateAPIView):
     """
-    Oauth2 AccessToken list endpoint.
+    Oauth2 AccessToken list endpoint. The list is paged by number unless
+    '?pagination=cursor' asks for a cursor, which needs no count.
     """
     serializer_class = AccessTokenSerializer
     permission_classes = (
@@ -119,6 +118,8 @@ class AccessTokenList(AccessTokenAuthorizationMixin, ListCreateAPIView):
         )
     required_scopes = ('read', 'write',)
     pagination_class = SmallResultsSetPagination
+    # The newest first, the primary key is unique so the cursor never ties.
+    cursor_ordering = '-id'
 
 access_token_list = AccessTokenList.as_view()
 
@@ -143,21 +144,19 @@ access_token_detail = AccessTokenDetail.as_view()
 class GrantAuthorizationMixin(object):
 
     def get_queryset(self):
-        result = []
-
         if self.request.user.is_superuser:
             result = Grant.objects.all()
         else:
-            for app in self.request.user.oauth2_provider_application.all():
-                for grant in app.grant_set.all():
-                    result.append(grant)
+            result = Grant.objects.filter(application__user=self.request.user)
 
         return result
 
 
-class GrantList(GrantAuthorizationMixin, ListCreateAPIView):
+class GrantList(RelatedQuerysetMixin, GrantAuthorizationMixin,
+                ListCreateAPIView):
     """
-    Oauth2 Grant list endpoint.
+    Oauth2 Grant list endpoint. The list is paged by number unless
+    '?pagination=cursor' asks for a cursor, which needs no count.
     """
     serializer_class = GrantSerializer
     permission_classes = (
@@ -168,6 +167,8 @@ class GrantList(GrantAuthorizationMixin, ListCreateAPIView):
         )
     required_scopes = ('read', 'write',)
     pagination_class = SmallResultsSetPagination
+    # The newest first, the primary key is unique so the cursor never ties.
+    cursor_ordering = '-id'
 
 grant_list = GrantList.as_view()
 
@@ -191,21 +192,20 @@ grant_detail = GrantDetail.as_view()
 class RefreshTokenAuthorizationMixin(object):
 
     def get_queryset(self):
-        result = []
-
         if self.request.user.is_superuser:
             result = RefreshToken.objects.all()
         else:
-            for app in self.request.user.oauth2_provider_application.all():
-                for token in app.refreshtoken_set.all():
-                    result.append(token)
+            result = RefreshToken.objects.filter(
+                application__user=self.request.user)
 
         return result
 
 
-class RefreshTokenList(RefreshTokenAuthorizationMixin, ListCreateAPIView):
+class RefreshTokenList(RelatedQuerysetMixin, RefreshTokenAuthorizationMixin,
+                       ListCreateAPIView):
     """
-    Oauth2 RefreshToken list endpoint.
+    Oauth2 RefreshToken list endpoint. The list is paged by number unless
+    '?pagination=cursor' asks for a cursor, which needs no count.
     """
     serializer_class = RefreshTokenSerializer
     permission_classes = (
@@ -216,6 +216,8 @@ class RefreshTokenList(RefreshTokenAuthorizationMixin, ListCreateAPIView):
         )
     required_scopes = ('read', 'write',)
     pagination_class = SmallResultsSetPagination
+    # The newest first, the primary key is unique so the cursor never ties.
+    cursor_ordering = '-id'
 
 refresh_token_list = RefreshTokenList.as_view()
 
@@ -0,0 +1,26 @@
+#
+# inventory/oauth2/apps.py
+#
+
+from django.apps import AppConfig
+from django.db.models.signals import post_save, post_delete
+from django.utils.translation import ugettext_lazy as _
+
+
+class OAuth2Config(AppConfig):
+    name = 'inventory.oauth2'
+    label = 'oauth2'
+    verbose_name = _("OAuth2")
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+        from oauth2_provider.models import AccessToken
+        from .authentication import invalidate_token, invalidate_user
+        post_save.connect(invalidate_token, sender=AccessToken,
+                          dispatch_uid='oauth2_token_post_save')
+        post_delete.connect(invalidate_token, sender=AccessToken,
+                            dispatch_uid='oauth2_token_post_delete')
+        post_save.connect(invalidate_user, sender=get_user_model(),
+                          dispatch_uid='oauth2_user_post_save')
+        post_delete.connect(invalidate_user, sender=get_user_model(),
+                            dispatch_uid='oauth2_user_post_delete')
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+#
+# inventory/oauth2/authentication.py
+#
+
+import hashlib
+import logging
+from datetime import datetime
+from dateutil.tz import tzutc
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.query_utils import deferred_class_factory
+from django.conf import settings
+
+from oauth2_provider.models import AccessToken
+from oauth2_provider.ext.rest_framework import OAuth2Authentication
+
+log = logging.getLogger('inventory.oauth2.authentication')
+User = get_user_model()
+
+
+class TokenCache(object):
+    """
+    Keeps the user id, scope and expiry of an access token in the default
+    cache. The key is a hash of the token so the token itself is never
+    stored in the cache.
+    """
+    KEY = 'oauth2:token:{}'
+
+    @classmethod
+    def get(self, token):
+        return cache.get(self._key(token))
+
+    @classmethod
+    def set(self, access_token):
+        seconds = (access_token.expires - datetime.now(tzutc())
+                   ).total_seconds()
+        timeout = min(settings.OAUTH2_TOKEN_CACHE_TIMEOUT, int(seconds))
+
+        if timeout > 0:
+            data = {'id': access_token.pk, 'user_id': access_token.user_id,
+                    'application_id': access_token.application_id,
+                    'scope': access_token.scope,
+                    'expires': access_token.expires}
+            cache.set(self._key(access_token.token), data, timeout)
+
+    @classmethod
+    def invalidate(self, token):
+        cache.delete(self._key(token))
+
+    @classmethod
+    def _key(self, token):
+        return self.KEY.format(hashlib.sha1(token.encode('utf-8')).hexdigest())
+
+
+class UserCache(object):
+    """
+    Keeps the fields of the active users of cached tokens that the
+    authentication and the permission classes read in the default cache,
+    so a cached token is authenticated without a query. No other field,
+    the password least of all, is cached, they are deferred on the cached
+    user and read from the database when used. A user is dropped whenever
+    it is saved or deleted, a queryset update() is only seen after
+    OAUTH2_TOKEN_CACHE_TIMEOUT.
+    """
+    KEY = 'oauth2:user:{}'
+    FIELDS = ('username', 'is_active', 'is_staff', 'is_superuser', 'role',)
+
+    @classmethod
+    def get(self, pk):
+        """
+        Return the active user 'pk' or None, the user is read from the
+        database and cached on a miss.
+        """
+        data = cache.get(self.KEY.format(pk))
+
+        if data is None:
+            try:
+                user = User.objects.get(pk=pk, is_active=True)
+            except User.DoesNotExist:
+                user = None
+            else:
+                self.set(user)
+        else:
+            names = self._get_names()
+            model = deferred_class_factory(User, [
+                field.attname for field in User._meta.concrete_fields
+                if field.attname not in names])
+            user = model.from_db(
+                data['db'], names, [data['values'][name] for name in names])
+
+        return user
+
+    @classmethod
+    def set(self, user):
+        if user.is_active:
+            values = dict([(name, getattr(user, name))
+                           for name in self._get_names()])
+            cache.set(self.KEY.format(user.pk),
+                      {'db': user._state.db, 'values': values},
+                      settings.OAUTH2_TOKEN_CACHE_TIMEOUT)
+
+    @classmethod
+    def _get_names(self):
+        return [User._meta.pk.attname] + list(self.FIELDS)
+
+    @classmethod
+    def invalidate(self, pk):
+        cache.delete(self.KEY.format(pk))
+
+
+class CachedOAuth2Authentication(OAuth2Authentication):
+    """
+    OAuth2 authentication that resolves bearer tokens from the TokenCache
+    before falling back to the full oauthlib verification, which reads the
+    token from the database. The user is read from the UserCache, so a
+    cache hit needs no query.
+    """
+
+    def authenticate(self, request):
+        token = self._get_bearer_token(request)
+        result = None
+
+        if token:
+            result = self._authenticate_cached(token)
+
+        if result is None:
+            result = super(CachedOAuth2Authentication, self).authenticate(
+                request)
+
+            if (token and result and result[1] is not None and
+                result[1].user_id is not None):
+                TokenCache.set(result[1])
+                UserCache.set(result[0])
+
+        return result
+
+    def _authenticate_cached(self, token):
+        data = TokenCache.get(token)
+        result = None
+
+        if data and data['expires'] > datetime.now(tzutc()):
+            user = UserCache.get(data['user_id'])
+
+            if user is None:
+                TokenCache.invalidate(token)
+            else:
+                access_token = AccessToken(
+                    pk=data['id'], user_id=data['user_id'],
+                    application_id=data['application_id'], token=token,
+                    scope=data['scope'], expires=data['expires'])
+                access_token.user = user
+                result = (user, access_token)
+
+        return result
+
+    def _get_bearer_token(self, request):
+        auth = request.META.get('HTTP_AUTHORIZATION', '').split()
+
+        if len(auth) == 2 and auth[0].lower() == 'bearer':
+            return auth[1]
+
+        return None
+
+
+def invalidate_token(sender, instance, **kwargs):
+    """
+    Receiver for the post_save and post_delete signals of AccessToken, which
+    covers revoking and deleting tokens.
+    """
+    TokenCache.invalidate(instance.token)
+
+
+def invalidate_user(sender, instance, **kwargs):
+    """
+    Receiver for the post_save and post_delete signals of the user model,
+    which covers deactivating users and changing their role.
+    """
+    UserCache.invalidate(instance.pk)
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+#
+# inventory/oauth2/management/commands/purge_expired_tokens.py
+#
+# Can be scheduled with cron, ex.
+# */15 * * * * cd /path/to/inventory && ./manage.py purge_expired_tokens
+#
+
+from django.core.management.base import BaseCommand
+
+from inventory.oauth2.purge import ExpiredTokenPurge
+
+
+class Command(BaseCommand):
+    help = ("Delete expired oauth2 grants, access tokens and refresh tokens "
+            "in batches.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None, dest='batch_size',
+            help="Rows deleted per batch, defaults to OAUTH2_PURGE_BATCH_SIZE.")
+        parser.add_argument(
+            '--sleep', type=float, default=None, dest='sleep',
+            help="Seconds to sleep between batches, defaults to "
+            "OAUTH2_PURGE_SLEEP.")
+
+    def handle(self, *args, **options):
+        self.verbosity = options.get('verbosity', 1)
+        purge = ExpiredTokenPurge(
+            batch_size=options.get('batch_size'), sleep=options.get('sleep'),
+            report=self.report)
+        counts = purge.run()
+
+        for name in ('grants', 'access tokens', 'refresh tokens',):
+            self.stdout.write("Purged {} {}.".format(counts[name], name))
+
+    def report(self, name, count, total, rate):
+        if self.verbosity > 0:
+            self.stdout.write("Batch of {} {}, total: {}, {:.1f} rows/second"
+                              .format(count, name, total, rate))
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+#
+# inventory/oauth2/purge.py
+#
+
+import logging
+import time
+from datetime import datetime, timedelta
+from dateutil.tz import tzutc
+
+from django.db import transaction
+from django.conf import settings
+
+from oauth2_provider.models import Grant, AccessToken, RefreshToken
+
+log = logging.getLogger('inventory.oauth2.purge')
+
+
+class ExpiredTokenPurge(object):
+    """
+    Deletes expired oauth2 grants, access tokens and refresh tokens in
+    batches. Each batch is its own short DELETE so the tables are never
+    locked for long, the optional sleep between batches lets other writers
+    in.
+
+    An access token with a refresh token can still be renewed after it has
+    expired, so it is only deleted together with its refresh token once it
+    has been expired for OAUTH2_REFRESH_TOKEN_EXPIRE_SECONDS. If the setting
+    is None these tokens are kept.
+    """
+
+    def __init__(self, batch_size=None, sleep=None, report=None):
+        self.batch_size = batch_size or settings.OAUTH2_PURGE_BATCH_SIZE
+        self.sleep = settings.OAUTH2_PURGE_SLEEP if sleep is None else sleep
+        self.report = report or self._log_report
+
+    def run(self, now=None):
+        """
+        Purge all the expired rows, the number of rows deleted for each
+        model is returned.
+        """
+        if now is None: now = datetime.now(tzutc())
+        counts = {}
+        counts['grants'] = self._purge(
+            'grants', Grant.objects.filter(expires__lt=now),
+            self._delete_grants)
+        counts['access tokens'] = self._purge(
+            'access tokens', AccessToken.objects.filter(
+                expires__lt=now, refresh_token__isnull=True),
+            self._delete_access_tokens)
+        seconds = settings.OAUTH2_REFRESH_TOKEN_EXPIRE_SECONDS
+
+        if seconds is None:
+            counts['refresh tokens'] = 0
+        else:
+            counts['refresh tokens'] = self._purge(
+                'refresh tokens', RefreshToken.objects.filter(
+                    access_token__expires__lt=now - timedelta(
+                        seconds=seconds)),
+                self._delete_refresh_tokens)
+
+        return counts
+
+    def _purge(self, name, queryset, delete):
+        queryset = queryset.order_by('pk').values_list('pk', flat=True)
+        total = 0
+
+        while True:
+            start = time.time()
+            ids = list(queryset[:self.batch_size])
+            if not ids: break
+            delete(ids)
+            total += len(ids)
+            elapsed = time.time() - start
+            self.report(name, len(ids), total,
+                        len(ids) / elapsed if elapsed else 0.0)
+            if len(ids) < self.batch_size: break
+            if self.sleep: time.sleep(self.sleep)
+
+        return total
+
+    def _delete_grants(self, ids):
+        Grant.objects.filter(pk__in=ids).delete()
+
+    def _delete_access_tokens(self, ids):
+        AccessToken.objects.filter(pk__in=ids).delete()
+
+    def _delete_refresh_tokens(self, ids):
+        token_ids = list(RefreshToken.objects.filter(pk__in=ids).values_list(
+            'access_token_id', flat=True))
+
+        with transaction.atomic():
+            RefreshToken.objects.filter(pk__in=ids).delete()
+            AccessToken.objects.filter(pk__in=token_ids).delete()
+
+    def _log_report(self, name, count, total, rate):
+        log.info("Purged %s %s, total: %s, %.1f rows/second",
+                 count, name, total, rate)
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+#
+# inventory/oauth2/tests/test_authentication.py
+#
+# Run ./manage.py test -k # Keep the DB, don't rebuild.
+#
+
+from datetime import datetime, timedelta
+from dateutil.tz import tzutc
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from oauth2_provider.models import AccessToken, get_application_model
+
+from ..authentication import TokenCache, UserCache
+
+User = get_user_model()
+Application = get_application_model()
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-oauth2-token',
+        },
+    }
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestCachedOAuth2Authentication(APITestCase):
+    _TEST_USERNAME = 'TestUser'
+    _TEST_PASSWORD = 'TestPassword_007'
+
+    def __init__(self, name):
+        super(TestCachedOAuth2Authentication, self).__init__(name)
+        self.user = None
+        self.token = None
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username=self._TEST_USERNAME, password=self._TEST_PASSWORD)
+        app = Application.objects.create(
+            name="Test App", user=self.user, client_type='confidential',
+            authorization_grant_type='password')
+        self.token = AccessToken.objects.create(
+            user=self.user, application=app, token='test-token',
+            scope='read write',
+            expires=datetime.now(tzutc()) + timedelta(hours=1))
+        TokenCache.invalidate(self.token.token)
+        UserCache.invalidate(self.user.pk)
+
+    def _get(self, uri):
+        client = APIClient()
+        return client.get(uri, format='json', HTTP_AUTHORIZATION='Bearer {}'
+                          .format(self.token.token))
+
+    def test_token_is_cached(self):
+        #self.skipTest("Temporarily skipped")
+        uri = reverse('application-list')
+        response = self._get(uri)
+        msg = "Response: {} should be {}, content: {}".format(
+            response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
+        data = TokenCache.get(self.token.token)
+        msg = "Cached: {}".format(data)
+        self.assertEqual(data.get('user_id'), self.user.pk, msg)
+        self.assertEqual(data.get('scope'), 'read write', msg)
+        # The cached token is still used for the scope checks.
+        response = self._get(uri)
+        msg = "Response: {} should be {}, content: {}".format(
+            response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
+
+    def test_deleted_token_is_invalidated(self):
+        #self.skipTest("Temporarily skipped")
+        uri = reverse('access-token-detail', kwargs={'pk': self.token.pk})
+        self._get(uri)
+        msg = "Cached: {}".format(TokenCache.get(self.token.token))
+        self.assertTrue(TokenCache.get(self.token.token), msg)
+        client = APIClient()
+        response = client.delete(uri, HTTP_AUTHORIZATION='Bearer {}'.format(
+            self.token.token))
+        msg = "Response: {} should be {}, content: {}".format(
+            response.status_code, status.HTTP_204_NO_CONTENT, response.data)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT,
+                         msg)
+        self.assertEqual(TokenCache.get(self.token.token), None, msg)
+        response = self._get(uri)
+        msg = "Response: {} should be {}, content: {}".format(
+            response.status_code, status.HTTP_401_UNAUTHORIZED, response.data)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED,
+                         msg)
+
+    def test_cached_token_needs_no_query(self):
+        #self.skipTest("Temporarily skipped")
+        uri = reverse('application-list')
+
+        with CaptureQueriesContext(connection) as stock:
+            response = self._get(uri)
+
+        msg = "Response: {} should be {}, content: {}".format(
+            response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
+
+        with CaptureQueriesContext(connection) as cached:
+            response = self._get(uri)
+
+        msg = "Response: {} should be {}, content: {}".format(
+            response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
+        # The token and the user are not read again.
+        queries = [query['sql'] for query in cached.captured_queries]
+        msg = "Stock: {}, cached: {}".format(
+            len(stock.captured_queries), queries)
+        self.assertTrue(len(queries) < len(stock.captured_queries), msg)
+        tables = (AccessToken._meta.db_table, User._meta.db_table,)
+        self.assertFalse([sql for sql in queries if any(
+            ['FROM {}'.format(connection.ops.quote_name(table)) in sql
+             for table in tables])], msg)
+
+    def test_cached_user_fields(self):
+        #self.skipTest("Temporarily skipped")
+        self._get(reverse('application-list'))
+        data = cache.get(UserCache.KEY.format(self.user.pk))
+        msg = "Cached: {}".format(data)
+        self.assertEqual(sorted(data['values']), sorted(
+            [User._meta.pk.attname] + list(UserCache.FIELDS)), msg)
+        self.assertFalse('password' in data['values'], msg)
+
+        with self.assertNumQueries(0):
+            user = UserCache.get(self.user.pk)
+            values = [getattr(user, name) for name in UserCache.FIELDS]
+
+        msg = "User: {}, values: {}".format(user, values)
+        self.assertEqual(user, self.user, msg)
+        self.assertEqual(values, [getattr(self.user, name)
+                                  for name in UserCache.FIELDS], msg)
+        # The other fields are read from the database when used.
+        self.assertTrue(user.check_password(self._TEST_PASSWORD), msg)
+
+    def test_saved_user_is_invalidated(self):
+        #self.skipTest("Temporarily skipped")
+        uri = reverse('application-list')
+        self._get(uri)
+        key = UserCache.KEY.format(self.user.pk)
+        msg = "Cached: {}".format(cache.get(key))
+        self.assertTrue(cache.get(key), msg)
+        self.user.first_name = 'Changed'
+        self.user.save()
+        msg = "Cached: {}".format(cache.get(key))
+        self.assertEqual(cache.get(key), None, msg)
+        self._get(uri)
+        user = UserCache.get(self.user.pk)
+        msg = "User: {}, first_name: {}".format(user, user.first_name)
+        self.assertEqual(user, self.user, msg)
+        self.assertEqual(user.first_name, 'Changed', msg)
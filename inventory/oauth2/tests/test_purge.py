@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+#
+# inventory/oauth2/tests/test_purge.py
+#
+# Run ./manage.py test -k # Keep the DB, don't rebuild.
+#
+
+from datetime import datetime, timedelta
+from dateutil.tz import tzutc
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils.six import StringIO
+
+from oauth2_provider.models import (
+    Grant, AccessToken, RefreshToken, get_application_model)
+
+from ..purge import ExpiredTokenPurge
+
+User = get_user_model()
+Application = get_application_model()
+
+
+class TestExpiredTokenPurge(TestCase):
+    _TEST_USERNAME = 'TestUser'
+    _TEST_PASSWORD = 'TestPassword_007'
+
+    def __init__(self, name):
+        super(TestExpiredTokenPurge, self).__init__(name)
+        self.user = None
+        self.app = None
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username=self._TEST_USERNAME, password=self._TEST_PASSWORD)
+        self.app = Application.objects.create(
+            name="Test App", user=self.user, client_type='confidential',
+            authorization_grant_type='password')
+
+    def _create_tokens(self, name, delta, num, refresh=False):
+        expires = datetime.now(tzutc()) + delta
+
+        for idx in range(num):
+            token = AccessToken.objects.create(
+                user=self.user, application=self.app, expires=expires,
+                scope='read write', token='{}-{}'.format(name, idx))
+
+            if refresh:
+                RefreshToken.objects.create(
+                    user=self.user, application=self.app,
+                    token='{}-refresh-{}'.format(name, idx),
+                    access_token=token)
+
+    def test_run(self):
+        #self.skipTest("Temporarily skipped")
+        self._create_tokens('expired', timedelta(hours=-1), 5)
+        self._create_tokens('valid', timedelta(hours=1), 2)
+        self._create_tokens('renewable', timedelta(hours=-1), 2, refresh=True)
+        self._create_tokens('old', timedelta(days=-60), 3, refresh=True)
+        Grant.objects.create(
+            user=self.user, application=self.app, code='grant-0',
+            expires=datetime.now(tzutc()) - timedelta(minutes=1),
+            redirect_uri='http://localhost/', scope='read')
+        batches = []
+        purge = ExpiredTokenPurge(batch_size=2, sleep=0,
+                                  report=lambda *args: batches.append(args))
+        counts = purge.run()
+        msg = "counts: {}, batches: {}".format(counts, batches)
+        self.assertEqual(counts, {'grants': 1, 'access tokens': 5,
+                                  'refresh tokens': 3}, msg)
+        self.assertEqual([batch[1] for batch in batches
+                          if batch[0] == 'access tokens'], [2, 2, 1], msg)
+        self.assertEqual(AccessToken.objects.count(), 4, msg)
+        self.assertEqual(RefreshToken.objects.count(), 2, msg)
+        self.assertEqual(Grant.objects.count(), 0, msg)
+
+    @override_settings(OAUTH2_REFRESH_TOKEN_EXPIRE_SECONDS=None)
+    def test_command(self):
+        #self.skipTest("Temporarily skipped")
+        self._create_tokens('expired', timedelta(hours=-1), 3)
+        self._create_tokens('old', timedelta(days=-60), 1, refresh=True)
+        out = StringIO()
+        call_command('purge_expired_tokens', batch_size=2, sleep=0,
+                     stdout=out)
+        output = out.getvalue()
+        msg = "Output: {}".format(output)
+        self.assertTrue("Purged 3 access tokens." in output, msg)
+        self.assertTrue("Purged 0 refresh tokens." in output, msg)
+        self.assertTrue("rows/second" in output, msg)
+        self.assertEqual(AccessToken.objects.count(), 1, msg)
@@ -9,7 +9,8 @@ from django.contrib.auth import get_user_model
 
 from rest_framework import serializers
 
-from inventory.common.api.serializer_mixin import SerializerMixin
+from inventory.common.api.serializer_mixin import (
+    SerializerMixin, DynamicFieldsMixin)
 from inventory.accounts.models import User
 from inventory.accounts.api.serializers import UserSerializer
 
@@ -20,7 +21,8 @@ log = logging.getLogger('api.projects.serializers')
 User = get_user_model()
 
 
-class ProjectSerializer(SerializerMixin, serializers.ModelSerializer):
+class ProjectSerializer(DynamicFieldsMixin, SerializerMixin,
+                        serializers.ModelSerializer):
     members = serializers.HyperlinkedRelatedField(
         view_name='user-detail', many=True, queryset=User.objects.all(),
         default=None)
@@ -382,8 +382,28 @@ class TestProject(BaseTest):
         self.assertEqual(len(data.get('managers')),
                          len(updated_data.get('managers')), msg)
 
-    def _create_project(self, user):
-        new_data = {'name': 'Project01', 'public': False, 'active': True,
+    def test_project_list_query_budget(self):
+        """
+        Test that the project list with its members and managers runs the
+        same number of queries for any number of projects.
+        """
+        #self.skipTest("Temporarily skipped")
+        self._create_project(self.user)
+        uri = reverse('project-list')
+        count, data = self._assert_query_budget(self.client, uri, 6)
+
+        for num in range(4):
+            user = self._create_user(username='NewUser_{}'.format(num))
+            self._create_project(user, name='Project {}'.format(num))
+
+        new_count, data = self._assert_query_budget(self.client, uri, 6)
+        msg = "Queries: {} should be {}, content: {}".format(
+            new_count, count, self._clean_data(data))
+        self.assertEqual(data.get('count'), 5, msg)
+        self.assertEqual(new_count, count, msg)
+
+    def _create_project(self, user, name='Project01'):
+        new_data = {'name': name, 'public': False, 'active': True,
                     'updater': self.user, 'creator': self.user}
         project = Project.objects.create(**new_data)
         project.process_managers([user,])
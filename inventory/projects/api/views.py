@@ -18,6 +18,7 @@ from oauth2_provider.ext.rest_framework import TokenHasReadWriteScope
 
 from inventory.common.api.permissions import IsAnyUser
 from inventory.common.api.pagination import SmallResultsSetPagination
+from inventory.common.api.view_mixins import RelatedQuerysetMixin
 
 from ..models import Project
 
@@ -34,8 +35,6 @@ User = get_user_model()
 class ProjectAuthorizationMixin(object):
 
     def get_queryset(self):
-        result = []
-
         if (self.request.user.is_superuser or
             self.request.user.role == User.ADMINISTRATOR):
             result = Project.objects.all()
@@ -45,7 +44,8 @@ class ProjectAuthorizationMixin(object):
         return result
 
 
-class ProjectList(ProjectAuthorizationMixin, ListCreateAPIView):
+class ProjectList(RelatedQuerysetMixin, ProjectAuthorizationMixin,
+                  ListCreateAPIView):
     """
     Project list endpoint.
     """
@@ -7,7 +7,8 @@ import logging
 
 from rest_framework import serializers
 
-from inventory.common.api.serializer_mixin import SerializerMixin
+from inventory.common.api.serializer_mixin import (
+    SerializerMixin, DynamicFieldsMixin)
 from ..models import Country, Region
 
 
@@ -17,7 +18,8 @@ log = logging.getLogger('api.regions.serializers')
 #
 # Region
 #
-class RegionSerializer(SerializerMixin, serializers.ModelSerializer):
+class RegionSerializer(DynamicFieldsMixin, SerializerMixin,
+                       serializers.ModelSerializer):
     country = serializers.HyperlinkedRelatedField(
         view_name='country-detail', queryset=Country.objects.all())
     creator = serializers.HyperlinkedRelatedField(
@@ -57,7 +59,8 @@ class RegionSerializer(SerializerMixin, serializers.ModelSerializer):
 #
 # Country
 #
-class CountrySerializer(SerializerMixin, serializers.ModelSerializer):
+class CountrySerializer(DynamicFieldsMixin, SerializerMixin,
+                        serializers.ModelSerializer):
     regions = RegionSerializer(many=True, read_only=True)
     creator = serializers.HyperlinkedRelatedField(
         view_name='user-detail', read_only=True)
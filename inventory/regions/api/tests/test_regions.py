@@ -5,12 +5,23 @@
 # Run ./manage.py test -k # Keep the DB, don't rebuild.
 #
 
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
 from rest_framework.reverse import reverse
 from rest_framework import status
 
 from inventory.common.api.tests.base_test import BaseTest
 from inventory.regions.models import Country, Region
 
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-regions-api',
+        },
+    }
+
 
 class TestRegion(BaseTest):
 
@@ -434,18 +445,147 @@ class TestRegion(BaseTest):
         self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
         self.assertEqual(data.get('name'), 'Region Detail', msg)
 
-    def _create_country(self):
-        new_data = {'country': 'United States',
-                    'country_code_2': 'US',
-                    'country_code_3': 'USA',
+    def test_country_list_query_budget(self):
+        """
+        Test that the country list with its nested regions runs the same
+        number of queries for any number of countries.
+        """
+        #self.skipTest("Temporarily skipped")
+        self._create_region(self._create_country())
+        uri = reverse('country-list')
+        count, data = self._assert_query_budget(self.client, uri, 7)
+
+        for num in range(4):
+            country = self._create_country(
+                country='Country-{}'.format(num),
+                country_code_2='C{}'.format(num),
+                country_code_3='C{:02}'.format(num))
+            self._create_region(country, region_code='R1', region='Region 1')
+            self._create_region(country, region_code='R2', region='Region 2')
+
+        new_count, data = self._assert_query_budget(self.client, uri, 7)
+        msg = "Queries: {} should be {}, content: {}".format(
+            new_count, count, self._clean_data(data))
+        self.assertEqual(data.get('count'), 5, msg)
+        self.assertEqual(new_count, count, msg)
+
+    def test_region_list_query_budget(self):
+        """
+        Test that the region list runs the same number of queries for any
+        number of regions.
+        """
+        #self.skipTest("Temporarily skipped")
+        country = self._create_country()
+        self._create_region(country)
+        uri = reverse('region-list')
+        count, data = self._assert_query_budget(self.client, uri, 6)
+
+        for num in range(4):
+            self._create_region(country, region_code='R{}'.format(num),
+                                region='Region {}'.format(num))
+
+        new_count, data = self._assert_query_budget(self.client, uri, 6)
+        msg = "Queries: {} should be {}, content: {}".format(
+            new_count, count, self._clean_data(data))
+        self.assertEqual(data.get('count'), 5, msg)
+        self.assertEqual(new_count, count, msg)
+
+    def test_get_country_conditional_regions(self):
+        """
+        Test that a new region changes the validators of its country, which
+        is not updated itself.
+        """
+        #self.skipTest("Temporarily skipped")
+        country = self._create_country()
+        self._create_region(country)
+
+        for num, uri in enumerate((
+            reverse('country-list'),
+            reverse('country-detail', kwargs={'pk': country.pk}),)):
+            response = self.client.get(uri, format='json')
+            etag = response.get('ETag')
+            msg = "Response: {} should be {}, ETag: {}".format(
+                response.status_code, status.HTTP_200_OK, etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
+            self.assertTrue(etag, msg)
+            response = self.client.get(uri, format='json',
+                                       HTTP_IF_NONE_MATCH=etag)
+            msg = "Response: {} should be {}".format(
+                response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(response.status_code,
+                             status.HTTP_304_NOT_MODIFIED, msg)
+            # A new child region
+            region = self._create_region(
+                country, region_code='R{}'.format(num),
+                region='Region {}'.format(num))
+            response = self.client.get(uri, format='json',
+                                       HTTP_IF_NONE_MATCH=etag)
+            msg = "Response: {} should be {}, ETag: {}".format(
+                response.status_code, status.HTTP_200_OK, etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
+            self.assertNotEqual(response.get('ETag'), etag, msg)
+            # A deleted child region
+            etag = response.get('ETag')
+            region.delete()
+            response = self.client.get(uri, format='json',
+                                       HTTP_IF_NONE_MATCH=etag)
+            msg = "Response: {} should be {}, ETag: {}".format(
+                response.status_code, status.HTTP_200_OK, etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_get_country_list_cached_validators(self):
+        """
+        Test that the aggregates of the list validators are only read again
+        after a country or region changed.
+        """
+        #self.skipTest("Temporarily skipped")
+        country = self._create_country()
+        uri = reverse('country-list')
+        etag, aggregated = self._get_list_validators(uri)
+        msg = "ETag: {}, aggregated: {}".format(etag, aggregated)
+        self.assertTrue(aggregated, msg)
+        new_etag, aggregated = self._get_list_validators(uri)
+        msg = "ETag: {}, new ETag: {}, aggregated: {}".format(
+            etag, new_etag, aggregated)
+        self.assertFalse(aggregated, msg)
+        self.assertEqual(new_etag, etag, msg)
+        # A new child region
+        self._create_region(country)
+        new_etag, aggregated = self._get_list_validators(uri)
+        msg = "ETag: {}, new ETag: {}, aggregated: {}".format(
+            etag, new_etag, aggregated)
+        self.assertTrue(aggregated, msg)
+        self.assertNotEqual(new_etag, etag, msg)
+
+    def _get_list_validators(self, uri):
+        """
+        Return the ETag of the list and if its aggregates were read from
+        the database.
+        """
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(uri, format='json')
+
+        msg = "Response: {} should be {}".format(
+            response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
+        aggregated = any(['COUNT(DISTINCT' in query['sql'].upper()
+                          for query in ctx.captured_queries])
+        return response.get('ETag'), aggregated
+
+    def _create_country(self, country='United States', country_code_2='US',
+                        country_code_3='USA'):
+        new_data = {'country': country,
+                    'country_code_2': country_code_2,
+                    'country_code_3': country_code_3,
                     'country_number_code': 840,
                     'updater': self.user, 'creator': self.user}
         return Country.objects.create(**new_data)
 
-    def _create_region(self, country):
+    def _create_region(self, country, region_code='NY', region='New York'):
         new_data = {'country': country,
-                    'region_code': 'NY',
-                    'region': 'New York',
+                    'region_code': region_code,
+                    'region': region,
                     'primary_level': 'State',
                     'updater': self.user, 'creator': self.user}
         return Region.objects.create(**new_data)
@@ -15,6 +15,8 @@ from oauth2_provider.ext.rest_framework import TokenHasReadWriteScope
 from inventory.common.api.permissions import (
     IsAdminSuperUser, IsAdministrator, IsProjectManager, IsAnyUser)
 from inventory.common.api.pagination import SmallResultsSetPagination
+from inventory.common.api.view_mixins import (
+    RelatedQuerysetMixin, ConditionalGetMixin)
 from inventory.regions.models import Country, Region
 
 from .serializers import RegionSerializer, CountrySerializer
@@ -26,12 +28,14 @@ log = logging.getLogger('api.regions.views')
 #
 # Country
 #
-class CountryList(ListCreateAPIView):
+class CountryList(RelatedQuerysetMixin, ConditionalGetMixin,
+                  ListCreateAPIView):
     """
     Country list endpoint.
     """
     queryset = Country.objects.all()
     serializer_class = CountrySerializer
+    conditional_related_names = ('regions',)
     permission_classes = (
         Or(IsAnyUser),# IsAdminSuperUser, IsAdministrator, IsProjectManager,),
         And(Or(TokenHasReadWriteScope, IsAuthenticated,),),
@@ -41,12 +45,13 @@ class CountryList(ListCreateAPIView):
 country_list = CountryList.as_view()
 
 
-class CountryDetail(RetrieveUpdateDestroyAPIView):
+class CountryDetail(ConditionalGetMixin, RetrieveUpdateDestroyAPIView):
     """
     Country detail endpoint.
     """
     queryset = Country.objects.all()
     serializer_class = CountrySerializer
+    conditional_related_names = ('regions',)
     permission_classes = (
         Or(IsAnyUser),#IsAdminSuperUser, IsAdministrator, IsProjectManager,),
         And(Or(TokenHasReadWriteScope, IsAuthenticated,),),
@@ -58,7 +63,7 @@ country_detail = CountryDetail.as_view()
 #
 # Region
 #
-class RegionList(ListCreateAPIView):
+class RegionList(RelatedQuerysetMixin, ConditionalGetMixin, ListCreateAPIView):
     """
     Region list endpoint.
     """
@@ -73,7 +78,7 @@ class RegionList(ListCreateAPIView):
 region_list = RegionList.as_view()
 
 
-class RegionDetail(RetrieveUpdateDestroyAPIView):
+class RegionDetail(ConditionalGetMixin, RetrieveUpdateDestroyAPIView):
     """
     Region detail endpoint.
     """
@@ -145,6 +145,43 @@ CACHES = {
 
 SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
 
+# Number of seconds a per owner category tree stays in the cache, the trees
+# are also invalidated whenever a category is saved or deleted.
+CATEGORY_TREE_CACHE_TIMEOUT = 60 * 60
+
+# Number of seconds the distinct values of a search form choice field stay
+# in the cache, the values are also invalidated when their models change.
+SEARCH_CHOICES_CACHE_TIMEOUT = 60 * 60
+
+# Number of records on each page of the search results of the reports.
+SEARCH_RESULTS_PAGE_SIZE = 50
+
+# Number of records read with each query when search results are exported.
+SEARCH_EXPORT_CHUNK_SIZE = 2000
+
+# The default and maximum number of results of the item text search.
+ITEM_TEXT_SEARCH_LIMIT = 25
+ITEM_TEXT_SEARCH_MAX_LIMIT = 100
+
+# Number of seconds a rendered item report stays in the cache, the reports
+# are keyed on the item modification time so changes to an item are seen
+# at once, renamed categories and location codes after the timeout.
+ITEM_RECORD_CACHE_TIMEOUT = 60 * 15
+
+# Approximate counts of API lists: tables with at least this many rows are
+# counted from the database statistics when unfiltered, filtered lists are
+# counted once and cached for the number of seconds given.
+API_COUNT_ESTIMATE_THRESHOLD = 10000
+API_COUNT_CACHE_TIMEOUT = 30
+
+# Number of seconds the conditional GET validators of an API list stay in
+# the cache, they are also replaced whenever one of their models changes.
+API_CONDITIONAL_CACHE_TIMEOUT = 60 * 15
+
+# The default and maximum number of results of the category autocomplete.
+CATEGORY_AUTOCOMPLETE_LIMIT = 10
+CATEGORY_AUTOCOMPLETE_MAX_LIMIT = 50
+
 ROOT_URLCONF = 'inventory.urls'
 
 TEST_RUNNER = 'django.test.runner.DiscoverRunner'
@@ -216,6 +253,18 @@ OAUTH2_PROVIDER = {
         }
     }
 
+# Expired oauth2 rows are deleted by the purge_expired_tokens command in
+# batches of this size with a sleep in seconds between batches. Access tokens
+# with a refresh token are kept until they have been expired this many
+# seconds, None keeps them forever.
+OAUTH2_PURGE_BATCH_SIZE = 1000
+OAUTH2_PURGE_SLEEP = 0.1
+OAUTH2_REFRESH_TOKEN_EXPIRE_SECONDS = 60 * 60 * 24 * 30
+
+# Number of seconds a verified access token is kept in the cache, tokens are
+# also removed when they are changed or deleted.
+OAUTH2_TOKEN_CACHE_TIMEOUT = 60
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -234,7 +283,7 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.BasicAuthentication',
         'rest_framework.authentication.SessionAuthentication',
-        'oauth2_provider.ext.rest_framework.OAuth2Authentication',
+        'inventory.oauth2.authentication.CachedOAuth2Authentication',
         ),
     'TEST_REQUEST_DEFAULT_FORMAT': 'json',
     'TEST_REQUEST_RENDERER_CLASSES': (
@@ -7,7 +7,8 @@ import logging
 
 from rest_framework import serializers
 
-from inventory.common.api.serializer_mixin import SerializerMixin
+from inventory.common.api.serializer_mixin import (
+    SerializerMixin, DynamicFieldsMixin)
 from inventory.accounts.api.serializers import UserSerializer
 from inventory.suppliers.models import Supplier
 from inventory.regions.models import Region, Country
@@ -16,7 +17,8 @@ from inventory.regions.models import Region, Country
 log = logging.getLogger('api.suppliers.serializers')
 
 
-class SupplierSerializer(SerializerMixin, serializers.ModelSerializer):
+class SupplierSerializer(DynamicFieldsMixin, SerializerMixin,
+                         serializers.ModelSerializer):
     region = serializers.HyperlinkedRelatedField(
         view_name='region-detail', queryset=Region.objects.all())
     country = serializers.HyperlinkedRelatedField(
@@ -256,8 +256,27 @@ class TestSuppliers(BaseTest):
         self.assertEqual(response.status_code, status.HTTP_200_OK, msg)
         self.assertEqual(data.get('name'), 'Supplier Detail', msg)
 
-    def _create_supplier(self):
-        new_data = {'name': 'Company01', 'address_01': '000 Someplace Road',
+    def test_supplier_list_query_budget(self):
+        """
+        Test that the supplier list runs the same number of queries for any
+        number of suppliers.
+        """
+        #self.skipTest("Temporarily skipped")
+        self._create_supplier()
+        uri = reverse('supplier-list')
+        count, data = self._assert_query_budget(self.client, uri, 6)
+
+        for num in range(4):
+            self._create_supplier(name='Company {}'.format(num))
+
+        new_count, data = self._assert_query_budget(self.client, uri, 6)
+        msg = "Queries: {} should be {}, content: {}".format(
+            new_count, count, self._clean_data(data))
+        self.assertEqual(data.get('count'), 5, msg)
+        self.assertEqual(new_count, count, msg)
+
+    def _create_supplier(self, name='Company01'):
+        new_data = {'name': name, 'address_01': '000 Someplace Road',
                     'city': 'Anywhere', 'region': self.region,
                     'postal_code': '55144-1000', 'country': self.country,
                     'phone': '1-888-364-3577', 'stype': 1,
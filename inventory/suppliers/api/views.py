@@ -16,6 +16,8 @@ from oauth2_provider.ext.rest_framework import TokenHasReadWriteScope
 from inventory.common.api.permissions import (
     IsAdminSuperUser, IsAdministrator, IsProjectManager, IsAnyUser)
 from inventory.common.api.pagination import SmallResultsSetPagination
+from inventory.common.api.view_mixins import (
+    RelatedQuerysetMixin, ConditionalGetMixin)
 from inventory.suppliers.models import Supplier
 
 from .serializers import SupplierSerializer
@@ -27,7 +29,8 @@ log = logging.getLogger('api.suppliers.views')
 #
 # Supplier
 #
-class SupplierList(ListCreateAPIView):
+class SupplierList(RelatedQuerysetMixin, ConditionalGetMixin,
+                   ListCreateAPIView):
     """
     Supplier list endpoint.
     """
@@ -45,7 +48,7 @@ class SupplierList(ListCreateAPIView):
 supplier_list = SupplierList.as_view()
 
 
-class SupplierDetail(RetrieveUpdateDestroyAPIView):
+class SupplierDetail(ConditionalGetMixin, RetrieveUpdateDestroyAPIView):
     """
     Supplier detail endpoint.
     """